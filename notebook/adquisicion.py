@@ -0,0 +1,488 @@
+# ====================
+# BIBLIOTECAS ESTÁNDAR
+# ====================
+import glob
+import json
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+
+# ====================
+# MANEJO DE DATOS
+# ====================
+import numpy as np
+
+# ====================
+# COMUNICACIÓN SERIAL
+# ====================
+import serial
+
+# ====================
+# ALMACÉN DE DATOS
+# ====================
+from almacen import reemplazo_atomico
+
+
+class BufferCircular:
+    """Buffer circular sin bloqueos para un productor y un consumidor"""
+
+    def __init__(self, capacidad, dtype=np.uint16):
+        self.capacidad = capacidad
+        self._valores = np.zeros(capacidad, dtype=dtype)
+        self._tiempos = np.zeros(capacidad, dtype=np.int64)  # time.perf_counter_ns()
+        # Contadores monótonos: solo el productor escribe _escritura y solo el
+        # consumidor escribe _lectura, por lo que no se necesita ningún lock.
+        self._escritura = 0
+        self._lectura = 0
+        self.descartadas = 0
+
+    def __len__(self):
+        return self._escritura - self._lectura
+
+    def escribir(self, valores, tiempos):
+        """Agrega un bloque de muestras; descarta lo que no cabe"""
+        n = len(valores)
+        libres = self.capacidad - (self._escritura - self._lectura)
+        if n > libres:
+            self.descartadas += n - libres
+            n = libres
+        if n <= 0:
+            return 0
+
+        inicio = self._escritura % self.capacidad
+        primera = min(n, self.capacidad - inicio)
+        self._valores[inicio:inicio + primera] = valores[:primera]
+        self._tiempos[inicio:inicio + primera] = tiempos[:primera]
+        if primera < n:
+            self._valores[:n - primera] = valores[primera:n]
+            self._tiempos[:n - primera] = tiempos[primera:n]
+
+        # Publicar las muestras solo después de copiarlas
+        self._escritura += n
+        return n
+
+    def leer(self):
+        """Extrae todas las muestras disponibles como copias"""
+        disponibles = self._escritura - self._lectura
+        if disponibles <= 0:
+            return self._valores[:0].copy(), self._tiempos[:0].copy()
+
+        inicio = self._lectura % self.capacidad
+        fin = inicio + disponibles
+        if fin <= self.capacidad:
+            valores = self._valores[inicio:fin].copy()
+            tiempos = self._tiempos[inicio:fin].copy()
+        else:
+            resto = fin - self.capacidad
+            valores = np.concatenate((self._valores[inicio:], self._valores[:resto]))
+            tiempos = np.concatenate((self._tiempos[inicio:], self._tiempos[:resto]))
+
+        self._lectura += disponibles
+        return valores, tiempos
+
+
+# ====================
+# PROTOCOLO BINARIO
+# ====================
+# Cada trama tiene tamaño fijo (little-endian):
+#   cabecera  uint16  0x5AA5 (bytes A5 5A)
+#   secuencia uint16  contador de tramas, da la vuelta en 65535
+#   muestras  uint16 x MUESTRAS_POR_TRAMA  lecturas del ADC
+#   checksum  uint8   suma de los bytes de secuencia y muestras, módulo 256
+CABECERA_TRAMA = b"\xA5\x5A"
+_CABECERA_U16 = 0x5AA5
+MUESTRAS_POR_TRAMA = 8
+DTYPE_TRAMA = np.dtype([
+    ("cabecera", "<u2"),
+    ("secuencia", "<u2"),
+    ("muestras", "<u2", (MUESTRAS_POR_TRAMA,)),
+    ("checksum", "u1"),
+])
+TAMANO_TRAMA = DTYPE_TRAMA.itemsize
+BAUDIOS_DISPONIBLES = [9600, 115200, 230400, 500000, 1000000]
+
+
+def codificar_tramas(muestras, secuencia_inicial=0):
+    """Empaqueta muestras del ADC en tramas binarias (referencia para el firmware)"""
+    muestras = np.asarray(muestras, dtype=np.uint16)
+    n = len(muestras) // MUESTRAS_POR_TRAMA
+    tramas = np.zeros(n, dtype=DTYPE_TRAMA)
+    tramas["cabecera"] = _CABECERA_U16
+    tramas["secuencia"] = (secuencia_inicial + np.arange(n)) & 0xFFFF
+    tramas["muestras"] = muestras[:n * MUESTRAS_POR_TRAMA].reshape(n, MUESTRAS_POR_TRAMA)
+    crudo = tramas.view(np.uint8).reshape(n, TAMANO_TRAMA)
+    tramas["checksum"] = crudo[:, 2:-1].sum(axis=1) & 0xFF
+    return tramas.tobytes()
+
+
+class DecodificadorBinario:
+    """Decodifica tramas binarias en bloque y detecta tramas perdidas o corruptas"""
+
+    def __init__(self):
+        self._pendiente = bytearray()
+        self._ultima_secuencia = None
+        self.tramas = 0
+        self.tramas_perdidas = 0
+        self.tramas_corruptas = 0
+        self.bytes_descartados = 0
+
+    def alimentar(self, datos):
+        self._pendiente += datos
+        bloques = []
+        while True:
+            inicio = self._pendiente.find(CABECERA_TRAMA)
+            if inicio < 0:
+                # Conservar el último byte por si es la mitad de una cabecera
+                sobrante = max(len(self._pendiente) - 1, 0)
+                self.bytes_descartados += sobrante
+                del self._pendiente[:sobrante]
+                break
+            if inicio > 0:
+                self.bytes_descartados += inicio
+                del self._pendiente[:inicio]
+
+            n = len(self._pendiente) // TAMANO_TRAMA
+            if n == 0:
+                break
+
+            # Copia de las tramas completas para poder recortar el bytearray después
+            lote = np.frombuffer(bytes(self._pendiente[:n * TAMANO_TRAMA]), dtype=DTYPE_TRAMA)
+
+            # Las tramas alineadas terminan en la primera cabecera inválida
+            desalineadas = np.flatnonzero(lote["cabecera"] != _CABECERA_U16)
+            k = desalineadas[0] if len(desalineadas) else n
+            lote = lote[:k]
+
+            crudo = lote.view(np.uint8).reshape(k, TAMANO_TRAMA)
+            validas = (crudo[:, 2:-1].sum(axis=1) & 0xFF) == lote["checksum"]
+            self.tramas_corruptas += int(k - np.count_nonzero(validas))
+            lote = lote[validas]
+
+            if len(lote):
+                secuencias = lote["secuencia"].astype(np.int64)
+                if self._ultima_secuencia is not None:
+                    secuencias = np.concatenate(([self._ultima_secuencia], secuencias))
+                saltos = (np.diff(secuencias) - 1) & 0xFFFF
+                self.tramas_perdidas += int(saltos.sum())
+                self._ultima_secuencia = int(secuencias[-1])
+                self.tramas += len(lote)
+                bloques.append(lote["muestras"].ravel())
+
+            if k < n:
+                # Saltar la cabecera falsa y volver a sincronizar
+                del self._pendiente[:k * TAMANO_TRAMA + 1]
+                self.bytes_descartados += 1
+            else:
+                del self._pendiente[:k * TAMANO_TRAMA]
+                break
+
+        if not bloques:
+            return np.empty(0, dtype=np.uint16)
+        return np.concatenate(bloques)
+
+
+class DecodificadorTexto:
+    """Convierte bloques de bytes con una muestra por línea en valores numéricos"""
+
+    def __init__(self):
+        self._pendiente = b""
+        self.lineas_invalidas = 0
+
+    def alimentar(self, datos):
+        lineas = (self._pendiente + datos).split(b"\n")
+        # La última línea puede estar incompleta; se conserva para el siguiente bloque
+        self._pendiente = lineas.pop()
+        lineas = [linea.strip() for linea in lineas]
+        lineas = [linea for linea in lineas if linea]
+        if not lineas:
+            return np.empty(0, dtype=np.uint16)
+        try:
+            valores = np.array(lineas).astype(np.float64)
+        except ValueError:
+            valores = []
+            for linea in lineas:
+                try:
+                    valores.append(float(linea))
+                except ValueError:
+                    self.lineas_invalidas += 1
+            valores = np.array(valores, dtype=np.float64)
+        # Las lecturas del ADC son enteras; se guardan como uint16
+        return np.clip(np.rint(valores), 0, np.iinfo(np.uint16).max).astype(np.uint16)
+
+
+class BufferCaptura:
+    """Arreglos preasignados de una grabación; los metadatos se guardan una sola vez"""
+
+    def __init__(self, capacidad, metadatos, inicio_ns, inicio_fecha):
+        self.crudo = np.empty(capacidad, dtype=np.uint16)
+        self.tiempos_ns = np.empty(capacidad, dtype=np.int64)
+        self.metadatos = dict(metadatos)
+        self.inicio_ns = inicio_ns
+        self.inicio_fecha = inicio_fecha
+        self.n = 0
+
+    def __len__(self):
+        return self.n
+
+    @property
+    def capacidad(self):
+        return len(self.crudo)
+
+    @property
+    def nbytes(self):
+        return self.crudo.nbytes + self.tiempos_ns.nbytes
+
+    def agregar(self, valores, tiempos_ns):
+        """Copia un bloque al final de los arreglos; devuelve las muestras guardadas"""
+        k = min(len(valores), self.capacidad - self.n)
+        self.crudo[self.n:self.n + k] = valores[:k]
+        self.tiempos_ns[self.n:self.n + k] = tiempos_ns[:k]
+        self.n += k
+        return k
+
+    def tiempos_s(self):
+        """Tiempo transcurrido desde el inicio de la captura, en segundos"""
+        return (self.tiempos_ns[:self.n] - self.inicio_ns) / 1e9
+
+    def a_dataframe(self):
+        """Materializa la grabación con las columnas del formato Excel"""
+        return _dataframe_grabacion(self.crudo[:self.n], self.tiempos_ns[:self.n],
+                                    self.metadatos, self.inicio_ns, self.inicio_fecha)
+
+
+def _dataframe_grabacion(crudo, tiempos_ns, metadatos, inicio_ns, inicio_fecha):
+    """Construye el DataFrame de una grabación a partir de sus arreglos"""
+    import pandas as pd
+
+    fechas = pd.Timestamp(inicio_fecha) + pd.to_timedelta(tiempos_ns - inicio_ns, unit="ns")
+    return pd.DataFrame({
+        "Fecha y hora": fechas.strftime("%m/%d/%Y, %H:%M:%S"),
+        "Tiempo (s)": np.round((tiempos_ns - inicio_ns) / 1e9, 2),
+        "Muestra": np.arange(1, len(crudo) + 1),
+        "Valor lectura": crudo,
+        "Sujeto": metadatos.get("Sujeto"),
+        "Movimiento_ID": metadatos.get("Movimiento_ID"),
+    })
+
+
+# ====================
+# GRABACIÓN EN DISCO
+# ====================
+# Cada grabación es un directorio con bloques bloque_NNNNNN.npy de tamaño fijo
+# (arreglo estructurado crudo/tiempo_ns) y un manifest.json. Los bloques y el
+# manifiesto se escriben en un archivo temporal y se renombran, de modo que una
+# caída solo puede perder el bloque que aún estaba en memoria.
+DTYPE_BLOQUE = np.dtype([("crudo", "<u2"), ("tiempo_ns", "<i8")])
+NOMBRE_MANIFIESTO = "manifest.json"
+
+
+class EscritorGrabacion:
+    """Hilo escritor que guarda la captura en bloques .npy con un manifiesto JSON"""
+
+    def __init__(self, directorio, metadatos, muestras_por_bloque=8192):
+        self.directorio = directorio
+        self.muestras_por_bloque = muestras_por_bloque
+        self.manifiesto = {
+            "version": 1,
+            "metadatos": dict(metadatos),
+            "muestras_por_bloque": muestras_por_bloque,
+            "bloques": [],
+            "muestras": 0,
+            "finalizada": False,
+            "abortada": False,
+        }
+        self.error = None
+        self._cola = queue.Queue()
+        self._valores = []
+        self._tiempos = []
+        self._pendientes = 0
+        self._hilo = None
+
+    def abrir(self, inicio_ns, inicio_fecha):
+        """Crea el directorio y lanza el hilo escritor"""
+        os.makedirs(self.directorio, exist_ok=True)
+        self.manifiesto["inicio_ns"] = int(inicio_ns)
+        self.manifiesto["inicio_fecha"] = inicio_fecha.isoformat()
+        self._escribir_manifiesto()
+        self._hilo = threading.Thread(target=self._bucle, name="escritor-grabacion", daemon=True)
+        self._hilo.start()
+
+    def agregar(self, valores, tiempos_ns):
+        """Encola un bloque de muestras (no bloquea al hilo de adquisición)"""
+        self._cola.put((valores, tiempos_ns))
+
+    def cerrar(self, abortada=False):
+        """Vacía lo pendiente, marca la grabación como terminada y espera al hilo"""
+        self.manifiesto["abortada"] = abortada
+        self._cola.put(None)
+        if self._hilo is not None:
+            self._hilo.join()
+
+    def _bucle(self):
+        try:
+            while True:
+                item = self._cola.get()
+                if item is None:
+                    break
+                valores, tiempos = item
+                self._valores.append(valores)
+                self._tiempos.append(tiempos)
+                self._pendientes += len(valores)
+                while self._pendientes >= self.muestras_por_bloque:
+                    self._escribir_bloque(self.muestras_por_bloque)
+            if self._pendientes:
+                self._escribir_bloque(self._pendientes)
+            self.manifiesto["finalizada"] = True
+            self._escribir_manifiesto()
+        except Exception as e:
+            self.error = e
+
+    def _escribir_bloque(self, n):
+        valores = np.concatenate(self._valores)
+        tiempos = np.concatenate(self._tiempos)
+        bloque = np.empty(n, dtype=DTYPE_BLOQUE)
+        bloque["crudo"] = valores[:n]
+        bloque["tiempo_ns"] = tiempos[:n]
+        self._valores = [valores[n:]]
+        self._tiempos = [tiempos[n:]]
+        self._pendientes -= n
+
+        nombre = f"bloque_{len(self.manifiesto['bloques']):06d}.npy"
+        reemplazo_atomico(os.path.join(self.directorio, nombre), lambda f: np.save(f, bloque))
+        self.manifiesto["bloques"].append({"archivo": nombre, "muestras": int(n)})
+        self.manifiesto["muestras"] += int(n)
+        self._escribir_manifiesto()
+
+    def _escribir_manifiesto(self):
+        contenido = json.dumps(self.manifiesto, indent=2, ensure_ascii=False).encode("utf-8")
+        reemplazo_atomico(os.path.join(self.directorio, NOMBRE_MANIFIESTO), lambda f: f.write(contenido))
+
+
+def cargar_grabacion(ruta):
+    """Carga una grabación en disco (directorio o manifest.json) como DataFrame"""
+    directorio = os.path.dirname(ruta) if os.path.isfile(ruta) else ruta
+    with open(os.path.join(directorio, NOMBRE_MANIFIESTO), encoding="utf-8") as f:
+        manifiesto = json.load(f)
+
+    # Los bloques solo aparecen con su nombre final cuando están completos, así
+    # que también se recuperan los escritos justo antes de una caída
+    archivos = sorted(glob.glob(os.path.join(directorio, "bloque_*.npy")))
+    if archivos:
+        bloques = np.concatenate([np.load(archivo) for archivo in archivos])
+    else:
+        bloques = np.empty(0, dtype=DTYPE_BLOQUE)
+
+    return _dataframe_grabacion(
+        bloques["crudo"], bloques["tiempo_ns"], manifiesto["metadatos"],
+        manifiesto["inicio_ns"], datetime.fromisoformat(manifiesto["inicio_fecha"]),
+    )
+
+
+class MotorAdquisicion:
+    """Hilo dedicado que vacía el puerto serial en un buffer circular"""
+
+    def __init__(self, port, speed, limite=None, capacidad=2 ** 18, protocolo="texto"):
+        self.port = port
+        self.speed = speed
+        self.limite = limite  # Número de muestras a capturar (None = continuo)
+        self.protocolo = protocolo
+        self.buffer = BufferCircular(capacidad)
+        if protocolo == "binario":
+            self.decodificador = DecodificadorBinario()
+        elif protocolo == "texto":
+            self.decodificador = DecodificadorTexto()
+        else:
+            raise ValueError(f"Protocolo desconocido: {protocolo}")
+        self.escritor = None  # EscritorGrabacion opcional para guardar en disco
+        self.muestras = 0
+        self.error = None
+        self.abortado = False
+        self._detener = threading.Event()
+        self._hilo = None
+        self._ser = None
+        self.inicio_ns = None
+        self.inicio_fecha = None
+        self._t_ultima = None
+
+    @property
+    def activo(self):
+        return self._hilo is not None and self._hilo.is_alive()
+
+    def iniciar(self):
+        """Abre el puerto en el hilo llamador (para reportar errores) y lanza la lectura
+
+        port puede ser un puerto físico (COM3, /dev/ttyACM0), la pty de un
+        simulador (/dev/pts/N) o una URL de pyserial (socket://host:puerto, loop://).
+        """
+        self._ser = serial.serial_for_url(self.port, self.speed, timeout=0.1)
+        self._ser.reset_input_buffer()
+        self._detener.clear()
+        self.inicio_fecha = datetime.now()
+        self.inicio_ns = self._t_ultima = time.perf_counter_ns()
+        if self.escritor is not None:
+            try:
+                self.escritor.abrir(self.inicio_ns, self.inicio_fecha)
+            except Exception:
+                self._ser.close()
+                raise
+        self._hilo = threading.Thread(target=self._bucle, name="adquisicion-serial", daemon=True)
+        self._hilo.start()
+
+    def detener(self):
+        """Termina la captura conservando las muestras leídas"""
+        self._detener.set()
+
+    def abortar(self):
+        """Termina la captura y marca los datos como descartados"""
+        self.abortado = True
+        self._detener.set()
+
+    def esperar(self, timeout=None):
+        if self._hilo is not None:
+            self._hilo.join(timeout)
+
+    def tasa_muestreo(self):
+        """Tasa sostenida de muestras por segundo desde el inicio de la captura"""
+        if self.inicio_ns is None or self._t_ultima <= self.inicio_ns:
+            return 0.0
+        return self.muestras * 1e9 / (self._t_ultima - self.inicio_ns)
+
+    def _bucle(self):
+        ser = self._ser
+        try:
+            while not self._detener.is_set():
+                datos = ser.read(ser.in_waiting or 1)
+                if not datos:
+                    continue
+                ahora = time.perf_counter_ns()
+                valores = self.decodificador.alimentar(datos)
+                if len(valores) == 0:
+                    continue
+
+                if self.limite is not None:
+                    valores = valores[:self.limite - self.muestras]
+
+                # Repartir el intervalo desde el bloque anterior entre las muestras nuevas
+                n = len(valores)
+                tiempos = self._t_ultima + (ahora - self._t_ultima) * np.arange(1, n + 1, dtype=np.int64) // n
+                self._t_ultima = ahora
+                # Si el consumidor se atrasa y el buffer se llena, lo descartado no se
+                # graba ni se cuenta: disco, memoria y self.muestras quedan iguales
+                aceptadas = self.buffer.escribir(valores, tiempos)
+                valores, tiempos = valores[:aceptadas], tiempos[:aceptadas]
+                if self.escritor is not None:
+                    self.escritor.agregar(valores, tiempos)
+                self.muestras += aceptadas
+
+                if self.limite is not None and self.muestras >= self.limite:
+                    break
+        except Exception as e:
+            self.error = e
+        finally:
+            ser.close()
+            if self.escritor is not None:
+                self.escritor.cerrar(abortada=self.abortado)
+                if self.error is None:
+                    self.error = self.escritor.error
@@ -0,0 +1,192 @@
+# ====================
+# BIBLIOTECAS ESTÁNDAR
+# ====================
+import argparse
+import json
+import os
+import re
+import unicodedata
+
+# ====================
+# MANEJO DE DATOS
+# ====================
+import numpy as np
+
+# ====================
+# INSTRUMENTACIÓN
+# ====================
+from instrumentacion import etapa
+
+
+# Un almacén es un directorio <nombre>.emg con:
+#   indice.json         registros (sujeto, movimiento, muestras) y columnas guardadas
+#   <columna>.npz       una columna comprimida, con un miembro por registro
+# np.load abre los .npz de forma perezosa, así que leer una columna solo
+# descomprime los registros pedidos y escribir una columna no toca las demás.
+EXTENSION_ALMACEN = ".emg"
+NOMBRE_INDICE = "indice.json"
+COLUMNAS_REGISTRO = ["Sujeto", "Movimiento_ID"]
+
+
+def _nombre_archivo(columna):
+    """Nombre de archivo seguro para una columna ('Señal Filtrada' -> 'senal_filtrada.npz')"""
+    ascii_ = unicodedata.normalize("NFKD", columna).encode("ascii", "ignore").decode("ascii")
+    return re.sub(r"[^0-9a-zA-Z]+", "_", ascii_).strip("_").lower() + ".npz"
+
+
+def _a_json(valor):
+    """Convierte escalares de NumPy a tipos nativos para el índice"""
+    return valor.item() if isinstance(valor, np.generic) else valor
+
+
+def reemplazo_atomico(ruta, escribir):
+    """Escribe con escribir(f) en un temporal, lo sincroniza a disco y lo renombra sobre ruta
+
+    Sin el fsync un corte de energía tras os.replace puede dejar el archivo vacío.
+    """
+    temporal = ruta + ".tmp"
+    with open(temporal, "wb") as f:
+        escribir(f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporal, ruta)
+
+
+def ruta_almacen_para(ruta_excel):
+    """Ruta del almacén asociado a un archivo Excel"""
+    return os.path.splitext(ruta_excel)[0] + EXTENSION_ALMACEN
+
+
+class AlmacenEMG:
+    """Almacén columnar comprimido de grabaciones EMG con índice por registro"""
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+        with open(os.path.join(ruta, NOMBRE_INDICE), encoding="utf-8") as f:
+            self.indice = json.load(f)
+
+    @property
+    def registros(self):
+        return self.indice["registros"]
+
+    @property
+    def columnas(self):
+        return list(self.indice["columnas"])
+
+    def parametros(self, columna):
+        """Parámetros con los que se calculó una columna derivada (o None)"""
+        info = self.indice["columnas"].get(columna)
+        return info.get("parametros") if info else None
+
+    @classmethod
+    def crear(cls, ruta, df, origen=None):
+        """Crea el almacén a partir de un DataFrame con columnas Sujeto y Movimiento_ID"""
+        os.makedirs(ruta, exist_ok=True)
+
+        # Las filas sin sujeto o sin movimiento no pertenecen a ningún registro: se
+        # descartan, pero se informa cuántas y queda constancia en el índice
+        sin_registro = int(df[COLUMNAS_REGISTRO].isna().any(axis=1).sum())
+        if sin_registro:
+            print(f"⚠️  {sin_registro} filas sin Sujeto o Movimiento_ID se descartan al crear {ruta}")
+
+        # Registros en orden de primera aparición; dentro de cada uno se respeta el orden de filas
+        grupos = df.groupby(COLUMNAS_REGISTRO, sort=False).indices
+        registros = []
+        for i, ((sujeto, movimiento), filas) in enumerate(grupos.items()):
+            registros.append({
+                "clave": f"r{i:05d}",
+                "sujeto": _a_json(sujeto),
+                "movimiento_id": _a_json(movimiento),
+                "muestras": int(len(filas)),
+            })
+
+        indice = {"version": 1, "origen": origen, "registros": registros, "columnas": {},
+                  "filas_descartadas": sin_registro}
+        reemplazo_atomico(os.path.join(ruta, NOMBRE_INDICE),
+                          lambda f: f.write(json.dumps(indice, indent=2, ensure_ascii=False).encode("utf-8")))
+        almacen = cls(ruta)
+
+        filas_por_registro = list(grupos.values())
+        for columna in df.columns:
+            if columna in COLUMNAS_REGISTRO:
+                continue
+            valores = df[columna].to_numpy()
+            if valores.dtype == object:
+                valores = valores.astype(str)
+            almacen.escribir_columna(columna, [valores[filas] for filas in filas_por_registro])
+        return almacen
+
+    def leer_columna(self, columna, claves=None):
+        """Devuelve {clave: arreglo} solo para los registros pedidos"""
+        info = self.indice["columnas"][columna]
+        if claves is None:
+            claves = [r["clave"] for r in self.registros]
+        with np.load(os.path.join(self.ruta, info["archivo"])) as npz:
+            return {clave: npz[clave] for clave in claves}
+
+    def escribir_columna(self, columna, valores, parametros=None):
+        """Guarda una columna completa (lista de arreglos en el orden de los registros)"""
+        archivo = _nombre_archivo(columna)
+        miembros = {r["clave"]: np.asarray(v) for r, v in zip(self.registros, valores)}
+        reemplazo_atomico(os.path.join(self.ruta, archivo), lambda f: np.savez_compressed(f, **miembros))
+
+        self.indice["columnas"][columna] = {"archivo": archivo, "parametros": parametros}
+        reemplazo_atomico(os.path.join(self.ruta, NOMBRE_INDICE),
+                          lambda f: f.write(json.dumps(self.indice, indent=2, ensure_ascii=False).encode("utf-8")))
+
+    def leer_dataframe(self, columnas=None):
+        """Reconstruye el DataFrame con las columnas pedidas más Sujeto y Movimiento_ID"""
+        if columnas is None:
+            columnas = self.columnas
+        muestras = [r["muestras"] for r in self.registros]
+        datos = {
+            "Sujeto": np.repeat(np.array([r["sujeto"] for r in self.registros], dtype=object), muestras),
+            "Movimiento_ID": np.repeat([r["movimiento_id"] for r in self.registros], muestras),
+        }
+        for columna in columnas:
+            partes = self.leer_columna(columna)
+            datos[columna] = np.concatenate(list(partes.values())) if partes else np.empty(0)
+        import pandas as pd
+
+        return pd.DataFrame(datos)
+
+
+def convertir_excel(ruta_excel, ruta_almacen=None):
+    """Conversión única de un archivo Excel al almacén columnar"""
+    if ruta_almacen is None:
+        ruta_almacen = ruta_almacen_para(ruta_excel)
+    import pandas as pd
+
+    with etapa('carga.lectura_excel'):
+        df = pd.read_excel(ruta_excel)
+    faltantes = [c for c in COLUMNAS_REGISTRO + ["Valor lectura"] if c not in df.columns]
+    if faltantes:
+        raise ValueError(f"El archivo no contiene las columnas necesarias: {faltantes}")
+    return AlmacenEMG.crear(ruta_almacen, df, origen=os.path.abspath(ruta_excel))
+
+
+def abrir_almacen(ruta):
+    """Abre un almacén a partir de su directorio, su indice.json o el Excel de origen"""
+    if os.path.basename(ruta) == NOMBRE_INDICE:
+        return AlmacenEMG(os.path.dirname(ruta))
+    if os.path.isdir(ruta):
+        return AlmacenEMG(ruta)
+
+    # Archivo Excel: reutilizar el almacén si está al día, si no convertir una vez
+    destino = ruta_almacen_para(ruta)
+    indice = os.path.join(destino, NOMBRE_INDICE)
+    if os.path.exists(indice) and os.path.getmtime(indice) >= os.path.getmtime(ruta):
+        return AlmacenEMG(destino)
+    return convertir_excel(ruta, destino)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Almacén columnar de señales EMG")
+    subparsers = parser.add_subparsers(dest="comando", required=True)
+    convertir = subparsers.add_parser("convertir", help="Convierte archivos Excel al almacén columnar")
+    convertir.add_argument("excel", nargs="+", help="Archivos .xlsx a convertir")
+    args = parser.parse_args()
+
+    for ruta in args.excel:
+        almacen = convertir_excel(ruta)
+        print(f"{ruta} -> {almacen.ruta} ({len(almacen.registros)} registros)")
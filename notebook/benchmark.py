@@ -0,0 +1,212 @@
+# ====================
+# BIBLIOTECAS ESTÁNDAR
+# ====================
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+# ====================
+# MANEJO DE DATOS
+# ====================
+import numpy as np
+
+# ====================
+# PIPELINE
+# ====================
+from almacen import AlmacenEMG
+from caracteristicas import SEGMENTACION, caracteristicas_lote, crear_dataset_ml, segmentar
+from modelos import dividir_datos, entrenar_arbol
+from pipeline import cargar_datos, filtrar_datos
+from sintetico import generar_dataset
+
+
+# Mide cada etapa del pipeline sobre datos sintéticos de varios tamaños, guarda los
+# tiempos como línea base en JSON y compara contra una línea base anterior:
+#   python -m benchmark run --out base.json
+#   python -m benchmark run --out nuevo.json --comparar base.json --umbral 0.2
+VERSION_BENCHMARK = 1
+# Tamaños de dataset: sujetos y muestras por registro (dos movimientos por sujeto)
+TAMANOS = {
+    'pequeno': {'sujetos': 4, 'muestras': 5000},
+    'mediano': {'sujetos': 12, 'muestras': 20000},
+    'grande': {'sujetos': 24, 'muestras': 60000},
+}
+# Búsqueda de la etapa de entrenamiento: aleatoria con presupuesto fijo para que el
+# tiempo dependa del tamaño de los datos y no del número de puntos de la grilla
+BUSQUEDA_BENCHMARK = {'modo': 'aleatoria', 'max_ajustes': 51, 'max_segundos': None, 'n_jobs': 1}
+UMBRAL_REGRESION = 0.20  # Aumento relativo del tiempo mínimo que se marca como regresión
+
+
+def _medir(funcion, repeticiones):
+    """Tiempos (s) de `repeticiones` ejecuciones de funcion(); devuelve también el último resultado"""
+    tiempos = []
+    resultado = None
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    return tiempos, resultado
+
+
+def medir_tamano(sujetos, muestras, repeticiones=3, semilla=0, directorio=None):
+    """Tiempos de cada etapa del pipeline para un dataset sintético
+
+    Las etapas siguen el orden de la aplicación y cada una usa la salida de la
+    anterior: carga del almacén, filtrado, extracción de características por
+    ventanas, dataset de ML completo (sin caché) y búsqueda del árbol.
+    """
+    df = generar_dataset(sujetos, muestras, semilla=semilla)
+    directorio = directorio or tempfile.mkdtemp(prefix="benchmark_emg_")
+    ruta = os.path.join(directorio, f"sintetico_{sujetos}x{muestras}.emg")
+    shutil.rmtree(ruta, ignore_errors=True)
+    AlmacenEMG.crear(ruta, df, origen="sintetico")
+
+    etapas = {}
+    etapas['carga'], (df, almacen) = _medir(lambda: cargar_datos(ruta), repeticiones)
+    # Sin almacén para que cada repetición filtre de verdad (y no lea la columna guardada)
+    etapas['filtrado'], (df, indice, _) = _medir(
+        lambda: filtrar_datos(df.copy(), None, avisar=lambda texto: None), repeticiones
+    )
+
+    filtrada = df['Señal Filtrada'].to_numpy()
+    ventanas = [segmentar(filtrada[rebanada], SEGMENTACION['longitud'], SEGMENTACION['solapamiento'])
+                for _, _, rebanada in indice]
+    etapas['extraccion'], _ = _medir(lambda: [caracteristicas_lote(v) for v in ventanas if len(v)], repeticiones)
+    etapas['dataset'], df_ml = _medir(lambda: crear_dataset_ml(df, indice), repeticiones)
+
+    X_train, X_test, y_train, y_test, suj_train, *_ = dividir_datos(df_ml, test_size=0.3, random_state=42)
+    etapas['busqueda'], _ = _medir(
+        lambda: entrenar_arbol(X_train, y_train, config_busqueda=BUSQUEDA_BENCHMARK, grupos=suj_train), repeticiones
+    )
+
+    return {
+        'sujetos': sujetos,
+        'muestras': muestras,
+        'filas': int(len(df)),
+        'ventanas': int(len(df_ml)),
+        'etapas': {nombre: {'min_s': min(t), 'mediana_s': statistics.median(t), 'repeticiones': len(t)}
+                   for nombre, t in etapas.items()},
+    }
+
+
+def ejecutar_benchmark(tamanos=None, repeticiones=3, semilla=0):
+    """Mide todos los tamaños pedidos y devuelve el documento de línea base"""
+    import scipy
+    import sklearn
+
+    tamanos = tamanos or list(TAMANOS)
+    directorio = tempfile.mkdtemp(prefix="benchmark_emg_")
+    resultados = {}
+    try:
+        for nombre in tamanos:
+            config = TAMANOS[nombre]
+            print(f"⏱️  {nombre}: {config['sujetos']} sujetos × {config['muestras']} muestras...")
+            resultados[nombre] = medir_tamano(config['sujetos'], config['muestras'], repeticiones, semilla, directorio)
+            for etapa, tiempo in resultados[nombre]['etapas'].items():
+                print(f"   {etapa:<12} {tiempo['min_s'] * 1e3:10.1f} ms")
+    finally:
+        shutil.rmtree(directorio, ignore_errors=True)
+
+    return {
+        'version': VERSION_BENCHMARK,
+        'fecha': datetime.now().isoformat(timespec='seconds'),
+        'entorno': {
+            'python': platform.python_version(),
+            'plataforma': platform.platform(),
+            'procesador': platform.processor() or platform.machine(),
+            'nucleos': os.cpu_count(),
+            'numpy': np.__version__,
+            'scipy': scipy.__version__,
+            'sklearn': sklearn.__version__,
+        },
+        'busqueda': BUSQUEDA_BENCHMARK,
+        'resultados': resultados,
+    }
+
+
+def comparar(base, actual, umbral=UMBRAL_REGRESION):
+    """Filas (tamaño, etapa, base_s, actual_s, cambio) y la lista de regresiones
+
+    Se compara el tiempo mínimo de cada etapa, el menos sensible al ruido del
+    sistema; cambio = actual / base - 1. Solo se comparan etapas presentes en ambos.
+    """
+    filas = []
+    regresiones = []
+    for tamano, resultado in actual['resultados'].items():
+        anterior = base['resultados'].get(tamano)
+        if anterior is None:
+            continue
+        for etapa, tiempo in resultado['etapas'].items():
+            if etapa not in anterior['etapas']:
+                continue
+            base_s = anterior['etapas'][etapa]['min_s']
+            actual_s = tiempo['min_s']
+            cambio = actual_s / base_s - 1 if base_s > 0 else 0.0
+            fila = (tamano, etapa, base_s, actual_s, cambio)
+            filas.append(fila)
+            if cambio > umbral:
+                regresiones.append(fila)
+    return filas, regresiones
+
+
+def imprimir_comparacion(filas, regresiones, umbral):
+    print(f"{'tamaño':<10} {'etapa':<12} {'base ms':>10} {'actual ms':>10} {'cambio':>8}")
+    for tamano, etapa, base_s, actual_s, cambio in filas:
+        marca = " ⚠️" if cambio > umbral else ""
+        print(f"{tamano:<10} {etapa:<12} {base_s * 1e3:10.1f} {actual_s * 1e3:10.1f} {cambio:+8.1%}{marca}")
+    if regresiones:
+        print(f"❌ {len(regresiones)} regresiones por encima de {umbral:.0%}")
+    else:
+        print(f"✅ Sin regresiones por encima de {umbral:.0%}")
+
+
+def _leer_json(ruta):
+    with open(ruta, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark del pipeline EMG con datos sintéticos")
+    subparsers = parser.add_subparsers(dest="comando", required=True)
+
+    run = subparsers.add_parser("run", help="Mide las etapas y guarda la línea base en JSON")
+    run.add_argument("--out", required=True, help="Archivo JSON de resultados")
+    run.add_argument("--tamanos", nargs="+", choices=list(TAMANOS), default=None, help="Tamaños a medir")
+    run.add_argument("--repeticiones", type=int, default=3, help="Repeticiones por etapa (se usa el mínimo)")
+    run.add_argument("--semilla", type=int, default=0)
+    run.add_argument("--comparar", default=None, help="Línea base JSON contra la que comparar")
+    run.add_argument("--umbral", type=float, default=UMBRAL_REGRESION, help="Aumento relativo tolerado")
+
+    comp = subparsers.add_parser("comparar", help="Compara dos archivos de resultados")
+    comp.add_argument("base", help="Línea base JSON")
+    comp.add_argument("actual", help="Resultados JSON a evaluar")
+    comp.add_argument("--umbral", type=float, default=UMBRAL_REGRESION, help="Aumento relativo tolerado")
+    args = parser.parse_args(argv)
+
+    if args.comando == "run":
+        actual = ejecutar_benchmark(args.tamanos, args.repeticiones, args.semilla)
+        temporal = args.out + ".tmp"
+        with open(temporal, "w", encoding="utf-8") as f:
+            json.dump(actual, f, indent=2, ensure_ascii=False)
+        os.replace(temporal, args.out)
+        print(f"📝 Resultados guardados en: {args.out}")
+        if args.comparar is None:
+            return 0
+        base = _leer_json(args.comparar)
+    else:
+        base, actual = _leer_json(args.base), _leer_json(args.actual)
+
+    filas, regresiones = comparar(base, actual, args.umbral)
+    imprimir_comparacion(filas, regresiones, args.umbral)
+    return 1 if regresiones else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,436 @@
+# ====================
+# BIBLIOTECAS ESTÁNDAR
+# ====================
+import hashlib
+import json
+import os
+import re
+
+# ====================
+# MANEJO DE DATOS
+# ====================
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# ====================
+# INSTRUMENTACIÓN
+# ====================
+from instrumentacion import etapa
+
+# pywt, scipy.signal y pandas se importan dentro de las funciones que los usan para
+# que importar este módulo (la interfaz lo hace al arrancar) sea inmediato
+
+
+# Segmentación para el dataset de ML: la misma ventana que usa la clasificación en vivo.
+# Con 'longitud' = None cada registro completo es una sola fila, como antes
+SEGMENTACION = {
+    'longitud': 1000,  # Muestras por ventana (2 s a 500 Hz)
+    'solapamiento': 0.5,  # Fracción de la ventana compartida con la siguiente
+}
+
+NIVELES_WAVELET = 4
+BINS_ENTROPIA = 50
+FS_CARACTERISTICAS = 1000  # Frecuencia usada por las características espectrales (valor histórico)
+
+
+def suavizar_wavelet(signal, wavelet='db4', level=NIVELES_WAVELET):
+    """Aplica suavizado wavelet a la señal"""
+    import pywt
+
+    coeffs = pywt.wavedec(signal, wavelet, level=level)
+    coeffs_suavizados = [coeffs[0]] + [np.zeros_like(c) for c in coeffs[1:]]
+    return pywt.waverec(coeffs_suavizados, wavelet)[:len(signal)]
+
+
+def suavizar_wavelet_lote(senales, wavelet='db4', level=NIVELES_WAVELET):
+    """suavizar_wavelet aplicado a cada fila de una matriz (n_ventanas, longitud)"""
+    import pywt
+
+    with etapa('caracteristicas.suavizado_wavelet'):
+        coeffs = pywt.wavedec(senales, wavelet, level=level, axis=-1)
+        coeffs_suavizados = [coeffs[0]] + [np.zeros_like(c) for c in coeffs[1:]]
+        return pywt.waverec(coeffs_suavizados, wavelet, axis=-1)[:, :senales.shape[-1]]
+
+
+class GrafoCaracteristicas:
+    """Registro de características e intermedios con sus dependencias
+
+    Cada intermedio (FFT, envolvente, coeficientes wavelet...) y cada grupo de
+    características declara de qué depende. calcular() resuelve solo lo necesario
+    para las columnas pedidas y cada intermedio se calcula una vez por lote.
+    """
+
+    def __init__(self):
+        self._intermedios = {}  # nombre -> (función, dependencias)
+        self._productores = {}  # columna -> (columnas del grupo, función, dependencias)
+
+    def intermedio(self, nombre, *dependencias):
+        """Decorador: registra un resultado compartido calculado a partir de sus dependencias"""
+        def registrar(funcion):
+            self._intermedios[nombre] = (funcion, dependencias)
+            return funcion
+        return registrar
+
+    def caracteristicas(self, columnas, *dependencias):
+        """Decorador: registra una función que devuelve una columna por cada nombre de `columnas`"""
+        columnas = list(columnas)
+
+        def registrar(funcion):
+            for columna in columnas:
+                self._productores[columna] = (columnas, funcion, dependencias)
+            return funcion
+        return registrar
+
+    @property
+    def disponibles(self):
+        return list(self._productores)
+
+    def calcular(self, senales, columnas):
+        """Matriz (n_señales, len(columnas)) calculando solo lo que piden las columnas"""
+        faltantes = [c for c in columnas if c not in self._productores]
+        if faltantes:
+            raise ValueError(f"Características no registradas: {faltantes}")
+
+        valores = {'senal': np.asarray(senales, dtype=np.float64)}
+
+        def resolver(nombre):
+            if nombre not in valores:
+                funcion, dependencias = self._intermedios[nombre]
+                argumentos = [resolver(d) for d in dependencias]
+                with etapa(f'caracteristicas.{nombre}'):
+                    valores[nombre] = funcion(*argumentos)
+            return valores[nombre]
+
+        resultado = {}
+        for columna in columnas:
+            if columna in resultado:
+                continue
+            grupo, funcion, dependencias = self._productores[columna]
+            with np.errstate(divide='ignore', invalid='ignore'):
+                salidas = funcion(*[resolver(d) for d in dependencias])
+            resultado.update(zip(grupo, salidas))
+        return np.column_stack([resultado[c] for c in columnas])
+
+
+GRAFO = GrafoCaracteristicas()
+
+
+# ====================
+# INTERMEDIOS COMPARTIDOS
+# ====================
+@GRAFO.intermedio('centrada', 'senal')
+def _centrada(senal):
+    return senal - senal.mean(axis=-1, keepdims=True)
+
+
+@GRAFO.intermedio('momentos', 'centrada')
+def _momentos(d):
+    """Momentos centrales m2, m3 y m4 en una sola pasada"""
+    d2 = d * d
+    return d2.mean(axis=-1), (d2 * d).mean(axis=-1), (d2 * d2).mean(axis=-1)
+
+
+@GRAFO.intermedio('espectro', 'senal')
+def _espectro(senal):
+    """(frecuencias, magnitudes) de la FFT completa de cada fila"""
+    freqs = np.fft.fftfreq(senal.shape[-1], 1 / FS_CARACTERISTICAS)
+    return freqs, np.abs(np.fft.fft(senal, axis=-1))
+
+
+@GRAFO.intermedio('envolvente', 'senal')
+def _envolvente(senal):
+    from scipy.signal import hilbert
+
+    return np.abs(hilbert(senal, axis=-1))
+
+
+@GRAFO.intermedio('wavelet', 'senal')
+def _coeficientes_wavelet(senal):
+    import pywt
+
+    return pywt.wavedec(senal, 'db4', level=NIVELES_WAVELET, axis=-1)
+
+
+@GRAFO.intermedio('histograma', 'senal')
+def _histograma(senal, bins=BINS_ENTROPIA):
+    """Conteos de np.histogram(fila, bins) para cada fila, sin recorrer filas en Python"""
+    n = senal.shape[0]
+    minimo = senal.min(axis=-1, keepdims=True)
+    maximo = senal.max(axis=-1, keepdims=True)
+    # Igual que np.histogram: filas constantes usan el rango (v - 0.5, v + 0.5)
+    constante = minimo == maximo
+    minimo = np.where(constante, minimo - 0.5, minimo)
+    maximo = np.where(constante, maximo + 0.5, maximo)
+
+    bordes = np.linspace(minimo[:, 0], maximo[:, 0], bins + 1, axis=-1)
+    indices = ((senal - minimo) * (bins / (maximo - minimo))).astype(np.intp)
+    indices[indices == bins] = bins - 1
+    # Corrección de redondeo en los bordes, como en np.histogram
+    indices -= senal < np.take_along_axis(bordes, indices, axis=-1)
+    indices += (senal >= np.take_along_axis(bordes, indices + 1, axis=-1)) & (indices != bins - 1)
+    return np.bincount((indices + bins * np.arange(n)[:, None]).ravel(), minlength=n * bins).reshape(n, bins)
+
+
+# ====================
+# CARACTERÍSTICAS
+# ====================
+@GRAFO.caracteristicas(['rms'], 'senal')
+def _rms(senal):
+    return [np.sqrt(np.mean(np.square(senal), axis=-1))]
+
+
+@GRAFO.caracteristicas(['varianza', 'skewness', 'kurtosis'], 'momentos')
+def _estadisticos(momentos):
+    m2, m3, m4 = momentos
+    return [m2, m3 / m2 ** 1.5, m4 / m2 ** 2]
+
+
+@GRAFO.caracteristicas(['mean_abs'], 'senal')
+def _media_absoluta(senal):
+    return [np.mean(np.abs(senal), axis=-1)]
+
+
+@GRAFO.caracteristicas(['banda_baja', 'banda_media', 'banda_alta'], 'espectro')
+def _potencia_bandas(espectro):
+    freqs, magnitudes = espectro
+    bandas = [(20, 80), (80, 150), (150, 250)]
+    return [magnitudes[:, (freqs >= bajo) & (freqs <= alto)].sum(axis=-1) for bajo, alto in bandas]
+
+
+@GRAFO.caracteristicas(['freq_mediana'], 'espectro')
+def _frecuencia_mediana(espectro):
+    freqs, magnitudes = espectro
+    umbral = magnitudes.max(axis=-1, keepdims=True) * 0.1
+    return [np.nanmedian(np.where(magnitudes > umbral, freqs, np.nan), axis=-1)]
+
+
+@GRAFO.caracteristicas(['rms_envolvente', 'var_envolvente'], 'envolvente')
+def _estadisticos_envolvente(envolvente):
+    return [np.sqrt(np.mean(envolvente ** 2, axis=-1)), np.var(envolvente, axis=-1)]
+
+
+@GRAFO.caracteristicas(['entropia'], 'histograma')
+def _entropia(conteos):
+    p = conteos / conteos.sum(axis=-1, keepdims=True)
+    return [-np.sum(np.where(p > 0, p * np.log(np.where(p > 0, p, 1)), 0), axis=-1)]
+
+
+@GRAFO.caracteristicas([f'wavelet_{i}' for i in range(3 * (NIVELES_WAVELET + 1))], 'wavelet')
+def _caracteristicas_wavelet(coeffs):
+    """Energía relativa, desviación y media absoluta de cada nivel"""
+    energias = np.stack([np.sum(c ** 2, axis=-1) for c in coeffs], axis=-1)
+    energia_total = energias.sum(axis=-1, keepdims=True)
+    relativas = np.divide(energias, energia_total, out=np.zeros_like(energias), where=energia_total > 0)
+    columnas = []
+    for i, c in enumerate(coeffs):
+        columnas.extend([relativas[:, i], np.std(c, axis=-1), np.mean(np.abs(c), axis=-1)])
+    return columnas
+
+
+# Conjunto activo: solo estas columnas se calculan para el modelo. Las demás
+# características registradas (rms, bandas, envolvente...) se activan agregándolas aquí
+COLUMNAS_CARACTERISTICAS = ['skewness', 'kurtosis', 'entropia'] + [
+    f'wavelet_{i}' for i in range(3 * (NIVELES_WAVELET + 1))
+]
+
+
+def extraer_caracteristicas_lote(senales, columnas=COLUMNAS_CARACTERISTICAS):
+    """Matriz de características (n_ventanas, len(columnas)) de una matriz de señales"""
+    return GRAFO.calcular(np.atleast_2d(senales), columnas)
+
+
+def extraer_caracteristicas_avanzadas(senal, columnas=COLUMNAS_CARACTERISTICAS):
+    """Extrae características avanzadas para ML (una señal, resultado como diccionario)"""
+    return dict(zip(columnas, extraer_caracteristicas_lote(senal, columnas)[0]))
+
+
+def caracteristicas_lote(senales, columnas=COLUMNAS_CARACTERISTICAS):
+    """Suavizado wavelet + características para una matriz de señales filtradas"""
+    return extraer_caracteristicas_lote(suavizar_wavelet_lote(np.asarray(senales, dtype=np.float64)), columnas)
+
+
+def vector_caracteristicas(senal, columnas):
+    """Características de una señal filtrada en el orden de columnas del modelo"""
+    return caracteristicas_lote(np.asarray(senal)[None, :], columnas)[0]
+
+
+def segmentar(senal, longitud, solapamiento=0.5):
+    """Ventanas (n_ventanas, longitud) de la señal como vista sin copia"""
+    if longitud <= 0:
+        raise ValueError("La longitud de ventana debe ser mayor que cero.")
+    if not 0 <= solapamiento < 1:
+        raise ValueError("El solapamiento debe estar en [0, 1).")
+    senal = np.asarray(senal)
+    if len(senal) < longitud:
+        return np.empty((0, longitud), dtype=senal.dtype)
+    paso = max(1, int(round(longitud * (1 - solapamiento))))
+    return sliding_window_view(senal, longitud)[::paso]
+
+
+def configuracion_caracteristicas(columnas=COLUMNAS_CARACTERISTICAS, longitud=None, solapamiento=0.0):
+    """Todo lo que determina la matriz de características de una señal (forma parte de la clave de caché)"""
+    return {
+        'version': 1,
+        'wavelet': 'db4',
+        'nivel': NIVELES_WAVELET,
+        'fs': FS_CARACTERISTICAS,
+        'bins': BINS_ENTROPIA,
+        'columnas': list(columnas),
+        'longitud': longitud,
+        'solapamiento': solapamiento,
+    }
+
+
+class CacheCaracteristicas:
+    """Caché en disco de matrices de características direccionada por contenido
+
+    La clave es un hash de las muestras filtradas de la señal más la configuración
+    de características, así que un registro sin cambios nunca se recalcula y uno
+    nuevo solo calcula lo suyo. Cada entrada es un .npy; al leerla se actualiza su
+    fecha de modificación y, si el total supera max_bytes, se eliminan las entradas
+    usadas hace más tiempo (LRU).
+    """
+
+    def __init__(self, directorio, max_bytes=256 * 2 ** 20):
+        self.directorio = directorio
+        self.max_bytes = max_bytes
+        self.aciertos = 0
+        self.fallos = 0
+        self._tamano = None  # Se calcula al primer guardado
+
+    @staticmethod
+    def clave(senal, configuracion):
+        h = hashlib.blake2b(digest_size=20)
+        h.update(json.dumps(configuracion, sort_keys=True).encode("utf-8"))
+        senal = np.ascontiguousarray(senal)
+        h.update(f"{senal.dtype.str}{senal.shape}".encode("ascii"))
+        h.update(memoryview(senal).cast("B"))
+        return h.hexdigest()
+
+    def _ruta(self, clave):
+        return os.path.join(self.directorio, clave + ".npy")
+
+    def obtener(self, clave):
+        """Matriz guardada para la clave o None"""
+        ruta = self._ruta(clave)
+        try:
+            matriz = np.load(ruta)
+            os.utime(ruta)  # Marca de uso para el desalojo LRU
+        except (OSError, ValueError):
+            self.fallos += 1
+            return None
+        self.aciertos += 1
+        return matriz
+
+    def guardar(self, clave, matriz):
+        os.makedirs(self.directorio, exist_ok=True)
+        if self._tamano is None:
+            self._tamano = sum(e.stat().st_size for e in self._entradas())
+        ruta = self._ruta(clave)
+        try:
+            anterior = os.path.getsize(ruta)  # Al sobrescribir una clave su tamaño deja de contar
+        except OSError:
+            anterior = 0
+        temporal = ruta + ".tmp"
+        with open(temporal, "wb") as f:
+            np.save(f, matriz)
+        os.replace(temporal, ruta)
+        self._tamano += os.path.getsize(ruta) - anterior
+        if self._tamano > self.max_bytes:
+            self._desalojar()
+
+    def obtener_o_calcular(self, senal, configuracion, calcular):
+        """Devuelve la matriz de la caché o la calcula con calcular() y la guarda"""
+        clave = self.clave(senal, configuracion)
+        matriz = self.obtener(clave)
+        if matriz is None:
+            matriz = calcular()
+            self.guardar(clave, matriz)
+        return matriz
+
+    def _entradas(self):
+        return [e for e in os.scandir(self.directorio) if e.name.endswith(".npy")]
+
+    def _desalojar(self):
+        """Elimina las entradas menos usadas hasta quedar por debajo del límite"""
+        entradas = sorted(self._entradas(), key=lambda e: e.stat().st_mtime)
+        self._tamano = sum(e.stat().st_size for e in entradas)
+        for entrada in entradas:
+            if self._tamano <= self.max_bytes:
+                break
+            tamano = entrada.stat().st_size
+            try:
+                os.remove(entrada.path)
+            except OSError:
+                continue
+            self._tamano -= tamano
+
+    def reiniciar_estadisticas(self):
+        self.aciertos = 0
+        self.fallos = 0
+
+
+# ====================
+# DATASET DE ML
+# ====================
+MOVIMIENTOS_ML = {13: 'Flexion', 14: 'Extension'}
+
+
+def limpiar_id_sujeto(sujeto_id):
+    """Limpia y normaliza el ID del sujeto"""
+    if isinstance(sujeto_id, str):
+        match = re.search(r'\d+', str(sujeto_id))
+        if match:
+            return int(match.group())
+        else:
+            return sujeto_id
+    return sujeto_id
+
+
+def crear_dataset_ml(df, indice, longitud=SEGMENTACION['longitud'], solapamiento=SEGMENTACION['solapamiento'],
+                     cache=None, columnas=COLUMNAS_CARACTERISTICAS):
+    """Crea dataset para machine learning usando todos los sujetos disponibles
+
+    Con longitud = None cada registro es una fila; si no, cada registro se corta
+    en ventanas (vistas sin copia) y cada ventana es una fila con su etiqueta.
+    Con una caché, solo se calculan las características de señales nuevas.
+    """
+    import pandas as pd
+
+    bloques = []
+    etiquetas = []
+    filtrada = df['Señal Filtrada'].to_numpy()
+    configuracion = configuracion_caracteristicas(columnas, longitud, solapamiento)
+
+    # Procesar todos los sujetos disponibles para movimientos 13 y 14
+    for movimiento_id in MOVIMIENTOS_ML:  # Flexión y Extensión
+        # Agrupar por ID limpio; los registros se recorren en orden de aparición
+        senales_por_sujeto = {}
+        for sujeto_original, rebanada in indice.registros_de_movimiento(movimiento_id):
+            senales_por_sujeto.setdefault(limpiar_id_sujeto(sujeto_original), []).append(filtrada[rebanada])
+
+        for sujeto, partes in senales_por_sujeto.items():
+            if longitud is None:
+                senal = partes[0] if len(partes) == 1 else np.concatenate(partes)
+                senales = [senal] if len(senal) else []
+            else:
+                # Las ventanas no cruzan el límite entre registros repetidos del sujeto
+                senales = [parte for parte in partes if len(parte) >= longitud]
+
+            # Características de todas las ventanas del registro en bloque
+            for senal in senales:
+                def calcular(senal=senal):
+                    matriz = senal[None, :] if longitud is None else segmentar(senal, longitud, solapamiento)
+                    return caracteristicas_lote(matriz, columnas)
+
+                with etapa('caracteristicas.extraccion'):
+                    matriz = calcular() if cache is None else cache.obtener_o_calcular(senal, configuracion, calcular)
+                bloques.append(matriz)
+                etiquetas.append((sujeto, movimiento_id, len(matriz)))
+
+    df_ml = pd.DataFrame(np.vstack(bloques) if bloques else np.empty((0, len(columnas))), columns=list(columnas))
+    repeticiones = [n for _, _, n in etiquetas]
+    df_ml['Sujeto'] = np.repeat(np.array([s for s, _, _ in etiquetas], dtype=object), repeticiones)
+    df_ml['Movimiento_ID'] = np.repeat([m for _, m, _ in etiquetas], repeticiones).astype(int)
+    df_ml['Clase'] = np.where(df_ml['Movimiento_ID'] == 13, MOVIMIENTOS_ML[13], MOVIMIENTOS_ML[14])
+    return df_ml
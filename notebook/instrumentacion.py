@@ -0,0 +1,159 @@
+# ====================
+# BIBLIOTECAS ESTÁNDAR
+# ====================
+import csv
+import json
+import os
+import threading
+import time
+import tracemalloc
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+
+
+# Registro de tiempos y memoria por etapa con nombre ('filtrado.pasabanda',
+# 'busqueda.DecisionTreeClassifier', ...). Cada etapa mide tiempo de pared, tiempo
+# de CPU del proceso y el pico de memoria asignada (tracemalloc) sobre la memoria
+# que había al entrar. Las etapas pueden anidarse: el pico de una etapa incluye el
+# de sus etapas internas.
+#
+# 'activa': con False, etapa() no mide nada.
+# 'memoria': medir el pico con tracemalloc. Encarece cada asignación de Python
+# (entrenar una red neuronal es ~3 veces más lento), así que está desactivado por
+# defecto y el rastreo solo corre mientras hay una etapa abierta.
+INSTRUMENTACION = {
+    'activa': True,
+    'memoria': False,
+    'historial': 2000,  # Mediciones individuales que se conservan para exportar
+}
+COLUMNAS_RESUMEN = ['etapa', 'llamadas', 'pared_s', 'cpu_s', 'pared_max_s', 'pico_mb']
+
+
+class RegistroEtapas:
+    """Acumula por etapa el número de llamadas, tiempos de pared y CPU y el pico de memoria"""
+
+    def __init__(self, memoria=None, historial=None):
+        self.memoria = memoria  # None = según INSTRUMENTACION['memoria'] en cada etapa
+        self._totales = {}  # nombre -> dict con los acumulados, en orden de primera aparición
+        self._mediciones = deque(maxlen=historial or INSTRUMENTACION['historial'])
+        self._lock = threading.Lock()
+        self._local = threading.local()  # Pila de etapas abiertas de cada hilo
+
+    @contextmanager
+    def etapa(self, nombre):
+        """Mide el bloque `with` y lo acumula bajo `nombre`"""
+        if not INSTRUMENTACION['activa']:
+            yield
+            return
+
+        pila = getattr(self._local, 'pila', None)
+        if pila is None:
+            pila = self._local.pila = []
+        memoria = INSTRUMENTACION['memoria'] if self.memoria is None else self.memoria
+        inicio_traza = memoria and not tracemalloc.is_tracing()
+        if inicio_traza:
+            tracemalloc.start()
+        if memoria:
+            actual, pico = tracemalloc.get_traced_memory()
+            if pila:
+                # reset_peak borra el pico de la etapa externa: se conserva en su marco
+                pila[-1]['pico'] = max(pila[-1]['pico'], pico)
+            tracemalloc.reset_peak()
+        else:
+            actual = 0
+        marco = {'base': actual, 'pico': actual}
+        pila.append(marco)
+
+        inicio_pared = time.perf_counter()
+        inicio_cpu = time.process_time()
+        try:
+            yield
+        finally:
+            pared = time.perf_counter() - inicio_pared
+            cpu = time.process_time() - inicio_cpu
+            pila.pop()
+            pico = 0
+            if memoria and tracemalloc.is_tracing():
+                pico_absoluto = max(marco['pico'], tracemalloc.get_traced_memory()[1])
+                pico = pico_absoluto - marco['base']
+                if pila:
+                    pila[-1]['pico'] = max(pila[-1]['pico'], pico_absoluto)
+                if inicio_traza:
+                    tracemalloc.stop()
+            self.agregar(nombre, pared, cpu, pico)
+
+    def agregar(self, nombre, pared, cpu, pico_bytes=0, llamadas=1, pared_max=None):
+        """Suma una medición (o un acumulado de otro proceso) a la etapa `nombre`"""
+        with self._lock:
+            total = self._totales.setdefault(
+                nombre, {'llamadas': 0, 'pared_s': 0.0, 'cpu_s': 0.0, 'pared_max_s': 0.0, 'pico_bytes': 0}
+            )
+            total['llamadas'] += llamadas
+            total['pared_s'] += pared
+            total['cpu_s'] += cpu
+            total['pared_max_s'] = max(total['pared_max_s'], pared if pared_max is None else pared_max)
+            total['pico_bytes'] = max(total['pico_bytes'], pico_bytes)
+            if llamadas == 1:
+                self._mediciones.append({
+                    'etapa': nombre,
+                    'fin': datetime.now().isoformat(timespec='milliseconds'),
+                    'pared_s': pared,
+                    'cpu_s': cpu,
+                    'pico_mb': pico_bytes / 2 ** 20,
+                })
+
+    def resumen(self):
+        """Una fila por etapa con las columnas de COLUMNAS_RESUMEN"""
+        with self._lock:
+            return [
+                {
+                    'etapa': nombre,
+                    'llamadas': t['llamadas'],
+                    'pared_s': t['pared_s'],
+                    'cpu_s': t['cpu_s'],
+                    'pared_max_s': t['pared_max_s'],
+                    'pico_mb': t['pico_bytes'] / 2 ** 20,
+                }
+                for nombre, t in self._totales.items()
+            ]
+
+    def fusionar(self, resumen, prefijo=""):
+        """Incorpora el resumen de otro registro (por ejemplo, de un proceso del pool)"""
+        for fila in resumen:
+            self.agregar(prefijo + fila['etapa'], fila['pared_s'], fila['cpu_s'], int(fila['pico_mb'] * 2 ** 20),
+                         llamadas=fila['llamadas'], pared_max=fila['pared_max_s'])
+
+    def reiniciar(self):
+        with self._lock:
+            self._totales.clear()
+            self._mediciones.clear()
+
+    def exportar_json(self, ruta):
+        datos = {
+            'creado': datetime.now().isoformat(timespec='seconds'),
+            'memoria': INSTRUMENTACION['memoria'] if self.memoria is None else self.memoria,
+            'resumen': self.resumen(),
+            'mediciones': list(self._mediciones),
+        }
+        temporal = ruta + '.tmp'
+        with open(temporal, 'w', encoding='utf-8') as f:
+            json.dump(datos, f, indent=2, ensure_ascii=False)
+        os.replace(temporal, ruta)
+
+    def exportar_csv(self, ruta):
+        temporal = ruta + '.tmp'
+        with open(temporal, 'w', encoding='utf-8', newline='') as f:
+            escritor = csv.DictWriter(f, fieldnames=COLUMNAS_RESUMEN)
+            escritor.writeheader()
+            escritor.writerows(self.resumen())
+        os.replace(temporal, ruta)
+
+
+# Registro global del proceso: las funciones del pipeline miden con etapa(...)
+REGISTRO = RegistroEtapas()
+
+
+def etapa(nombre):
+    """Context manager que mide un bloque en el registro global"""
+    return REGISTRO.etapa(nombre)
@@ -5,7 +5,10 @@ import os
 import time
 import gc
 import multiprocessing
-from datetime import datetime
+
+# Inicio del desglose de arranque: antes de tkinter, PIL, pandas y los módulos del
+# proyecto, así el costo de los imports es la primera línea del desglose
+_INICIO_ARRANQUE = time.perf_counter()
 
 # ====================
 # INTERFAZ GRÁFICA
@@ -17,49 +20,67 @@ from PIL import Image, ImageTk, ImageOps
 # ====================
 # MANEJO DE DATOS
 # ====================
-import pandas as pd
 import numpy as np
 
 # ====================
-# VISUALIZACIÓN
+# VISUALIZACIÓN, PROCESAMIENTO Y MACHINE LEARNING
 # ====================
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-import seaborn as sns
+# pandas, matplotlib, seaborn, scipy y sklearn se importan dentro del primer botón
+# que los necesita; importarlos aquí retrasaba varios segundos la ventana principal.
 
 # ====================
-# PROCESAMIENTO DE SEÑALES
+# COMUNICACIÓN SERIAL
 # ====================
-import scipy.signal as signal
-from scipy.fft import fft
-from scipy.signal import iirnotch, lfilter, butter, filtfilt, hilbert
-from scipy.ndimage import gaussian_filter1d
-from scipy.stats import entropy
-import pywt
+from adquisicion import (
+    MotorAdquisicion,
+    BufferCaptura,
+    EscritorGrabacion,
+    cargar_grabacion,
+    BAUDIOS_DISPONIBLES,
+    NOMBRE_MANIFIESTO,
+)
 
 # ====================
-# MACHINE LEARNING
+# ALMACÉN Y PROCESAMIENTO
 # ====================
-from sklearn.preprocessing import StandardScaler, LabelEncoder
-from sklearn.model_selection import train_test_split, GridSearchCV
-from sklearn.metrics import (
-    classification_report, 
-    confusion_matrix, 
-    make_scorer,
-    accuracy_score, 
-    precision_score, 
-    recall_score, 
-    f1_score
+from almacen import NOMBRE_INDICE
+from procesamiento import (
+    PARAMETROS_FILTRO,
+    FiltroStreaming,
 )
-from sklearn.svm import SVC
-from sklearn.neural_network import MLPClassifier
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.tree import DecisionTreeClassifier, plot_tree
 
 # ====================
-# COMUNICACIÓN SERIAL
+# CARACTERÍSTICAS Y MODELOS
 # ====================
-import serial
+from caracteristicas import (
+    CacheCaracteristicas,
+    crear_dataset_ml,
+)
+from modelos import (
+    ClasificadorEnVivo,
+    PARAMETROS_VIVO,
+    guardar_modelo,
+    cargar_modelo,
+    huella_dataset,
+    huella_matriz,
+    AlmacenBusqueda,
+    MODOS_BUSQUEDA,
+    opciones_busqueda,
+    modelos_comparacion,
+    ComparacionEnSegundoPlano,
+    CONFIG_BUSQUEDA,
+    dividir_datos,
+    entrenar_arbol,
+)
+from pipeline import cargar_datos, desfase_vivo, filtrar_datos
+
+# ====================
+# INSTRUMENTACIÓN
+# ====================
+from instrumentacion import INSTRUMENTACION, REGISTRO, etapa
+
+# Fin de los imports (el detalle por módulo se ve con python -X importtime interfaz.py)
+_FIN_IMPORTS = time.perf_counter()
 
 
 class SerialReader:
@@ -67,89 +88,396 @@ class SerialReader:
         self.port = port
         self.speed = speed
         self.columns = ["Fecha y hora", "Tiempo (s)", "Muestra", "Valor lectura", "Sujeto", "Movimiento_ID"]
-        self.records_to_read = 100
-        self.data = pd.DataFrame(columns=self.columns)
+        self.records_to_read = 100  # None = captura continua hasta detenerla
+        self.recording_dir = None  # Directorio para guardar la captura en disco
+        self.frame_interval_ms = 33  # Sondeo del buffer a ~30 cuadros por segundo
+        self.buffer = None  # BufferCaptura de la última grabación
+        self._data = None
+        self.root = None
         self.ax = None
         self.canvas = None
+        self.protocol = "texto"  # "texto" (una muestra por línea) o "binario" (tramas)
         self.text_widget = None  # Widget para mostrar los datos
-        
+        self.status_label = None  # Etiqueta para la tasa de muestreo
+        self.plot_window_s = 5.0  # Segundos visibles en la vista en vivo
+        self.scope = None
+        self.live_filter = None  # FiltroStreaming aplicado a la vista en vivo (opcional)
+        self.classifier = None  # ClasificadorEnVivo (opcional)
+        self.class_label = None  # Etiqueta con la clase actual
+        self.on_finish = None  # Callback al terminar la captura
+        self.engine = None
+
+    def set_root(self, root):
+        self.root = root
+
     def set_text_widget(self, text_widget):
         self.text_widget = text_widget
 
+    def set_status_label(self, status_label):
+        self.status_label = status_label
+
     def set_records_number(self, count):
         self.records_to_read = count
+
+    def set_protocol(self, protocol):
+        self.protocol = protocol
+
+    def set_recording_dir(self, recording_dir):
+        self.recording_dir = recording_dir
         
     def set_plot_widgets(self, ax, canvas):
         self.ax = ax
         self.canvas = canvas
 
+    def set_live_filter(self, live_filter):
+        self.live_filter = live_filter
+
+    def set_live_classifier(self, classifier, class_label):
+        self.classifier = classifier
+        self.class_label = class_label
+
+    @property
+    def capturing(self):
+        return self.engine is not None and self.engine.activo
+
+    @property
+    def data(self):
+        """DataFrame de la última captura, construido solo cuando se solicita"""
+        if self._data is None:
+            import pandas as pd
+
+            if self.engine is None or self.engine.abortado:
+                self._data = pd.DataFrame(columns=self.columns)
+            elif self.buffer is not None:
+                self._data = self.buffer.a_dataframe()[self.columns]
+            elif self.recording_dir is not None:
+                self._data = cargar_grabacion(self.recording_dir)[self.columns]
+            else:
+                self._data = pd.DataFrame(columns=self.columns)
+        return self._data
+
     def read_from_port(self, subject_id, movement_type):
-        """Lectura de datos seriales con visualización en tiempo real"""
-        try:
-            movement_id = 13 if movement_type == "Flexion" else 14
-            ser = serial.Serial(self.port, self.speed, timeout=0.1)
-            
-            # Configurar widget de texto si existe
+        """Inicia la captura en un hilo de adquisición y sondea el buffer desde Tk"""
+        movement_id = 13 if movement_type == "Flexion" else 14
+        self._subject_id = subject_id
+        self._movement_type = movement_type
+        self._received = 0
+        self._fs_checked = False
+        self._data = None
+
+        # Configurar widget de texto si existe
+        if self.text_widget:
+            self.text_widget.delete('1.0', tk.END)
+            self.text_widget.insert(tk.END, f"Iniciando captura...\nSujeto: {subject_id}\nMovimiento: {movement_type}\n")
+            self.text_widget.insert(tk.END, "-"*40 + "\n")
+
+        metadata = {"Sujeto": subject_id, "Movimiento_ID": movement_id, "Movimiento": movement_type,
+                    "Puerto": self.port, "Baudios": self.speed, "Protocolo": self.protocol}
+        self.engine = MotorAdquisicion(self.port, self.speed, limite=self.records_to_read, protocolo=self.protocol)
+        if self.recording_dir:
+            self.engine.escritor = EscritorGrabacion(self.recording_dir, metadata)
+        self.engine.iniciar()
+
+        # En captura continua solo se conserva en memoria la vista en vivo;
+        # los datos completos quedan en disco
+        self.buffer = None
+        if self.records_to_read is not None:
+            self.buffer = BufferCaptura(self.records_to_read, metadata,
+                                        self.engine.inicio_ns, self.engine.inicio_fecha)
+        if self.live_filter:
+            self.live_filter.reiniciar()
+        if self.classifier:
+            self.classifier.reiniciar()
+        if self.ax and self.canvas:
+            # La señal filtrada queda centrada en cero; la cruda en el rango del ADC
+            y_range = (-256, 256) if self.live_filter else (0, 1023)
+            self.scope = LiveScope(self.ax, self.canvas, window_s=self.plot_window_s, y_range=y_range)
+            self.scope.ax.set_title(f'Sujeto: {subject_id} | Movimiento: {movement_type} (en vivo)')
+        self.root.after(self.frame_interval_ms, self._poll)
+
+    def stop(self):
+        """Detiene la captura conservando lo leído hasta el momento"""
+        if self.engine:
+            self.engine.detener()
+
+    def abort(self):
+        """Cancela la captura y descarta los datos"""
+        if self.engine:
+            self.engine.abortar()
+
+    def _poll(self):
+        """Vacía el buffer circular y actualiza la interfaz una vez por cuadro"""
+        engine = self.engine
+        running = engine.activo
+        values, times = engine.buffer.leer()
+
+        if len(values) and not engine.abortado:
+            first = self._received + 1
+            self._received += len(values)
+            if self.buffer is not None:
+                self.buffer.agregar(values, times)
+            if self.classifier:
+                if not self._fs_checked and engine.muestras and times[-1] - engine.inicio_ns > 2e9:
+                    # Tras 2 s la tasa medida es estable: el filtro se diseña para la tasa real
+                    self._fs_checked = True
+                    if self.classifier.ajustar_frecuencia(engine.tasa_muestreo()) and self.text_widget:
+                        self.text_widget.insert(
+                            tk.END, f"Filtro en vivo rediseñado para {self.classifier.parametros_filtro['fs']} Hz"
+                                    f" (tasa medida {self.classifier.fs_medida:.1f} muestras/s)\n")
+                self.classifier.agregar(values, times)
+            if self.scope:
+                shown = self.live_filter.procesar(values) if self.live_filter else values
+                self.scope.push(shown, times)
+
+            # Mostrar en widget de texto (una sola inserción por cuadro)
             if self.text_widget:
-                self.text_widget.delete('1.0', tk.END)
-                self.text_widget.insert(tk.END, f"Iniciando captura...\nSujeto: {subject_id}\nMovimiento: {movement_type}\n")
-                self.text_widget.insert(tk.END, "-"*40 + "\n")
-            
-            buffer_data = []
-            start_time = time.time()
-            
-            for sample_num in range(1, self.records_to_read + 1):
-                line = ser.readline().decode(errors='ignore').strip()
-                if line:
-                    now = datetime.now().strftime("%m/%d/%Y, %H:%M:%S")
-                    elapsed = round(time.time() - start_time, 2)
-                    buffer_data.append([now, elapsed, sample_num, float(line), subject_id, movement_id])
-                    
-                    # Mostrar en widget de texto
-                    if self.text_widget:
-                        self.text_widget.insert(tk.END, f"Muestra {sample_num:3d}: {float(line):>8.2f} | T: {elapsed:5.2f}s\n")
-                        self.text_widget.see(tk.END)  # Auto-scroll
-                        self.text_widget.update()  # Actualizar en tiempo real
-            
-            # Guardar datos y mostrar resultados
-            self.data = pd.DataFrame(buffer_data, columns=self.columns)
-            
-            if self.text_widget and len(buffer_data) > 0:
+                elapsed = (times - engine.inicio_ns) / 1e9
+                lines = "".join(
+                    f"Muestra {n:3d}: {v:>8.2f} | T: {t:5.2f}s\n"
+                    for n, v, t in zip(range(first, first + len(values)), values.tolist(), elapsed.tolist())
+                )
+                self.text_widget.insert(tk.END, lines)
+                self.text_widget.see(tk.END)  # Auto-scroll
+
+        if self.scope and not engine.abortado:
+            self.scope.update()
+
+        if self.status_label:
+            self.status_label.config(text=self._status_text())
+        if self.class_label and self.classifier:
+            self.class_label.config(text=self._class_text())
+
+        if running or len(engine.buffer):
+            self.root.after(self.frame_interval_ms, self._poll)
+        else:
+            self._finish()
+
+    def _status_text(self):
+        engine = self.engine
+        text = (f"Muestras: {engine.muestras} | Tasa: {engine.tasa_muestreo():.1f} muestras/s"
+                f" | Descartadas: {engine.buffer.descartadas}")
+        if self.protocol == "binario":
+            decoder = engine.decodificador
+            text += f" | Tramas perdidas: {decoder.tramas_perdidas} | Corruptas: {decoder.tramas_corruptas}"
+        if self.live_filter and self.live_filter.bloques:
+            text += (f"\nFiltro en vivo: {self.live_filter.latencia_media_ms:.2f} ms/bloque"
+                     f" (máx {self.live_filter.latencia_maxima_ms:.2f} ms, excedidos: {self.live_filter.excedidos})")
+        return text
+
+    def _class_text(self):
+        classifier = self.classifier
+        if classifier.clase is None:
+            return "Clase: esperando ventana completa..."
+        return (f"Clase: {classifier.clase} | {classifier.decisiones_por_segundo:.1f} decisiones/s"
+                f" | Latencia: {classifier.latencia_media_ms:.1f} ms (máx {classifier.latencia_maxima_ms:.1f},"
+                f" sobre {classifier.presupuesto_ms:.0f} ms: {classifier.excedidos})")
+
+    def _finish(self):
+        """Arma el DataFrame final y muestra los resultados de la captura"""
+        engine = self.engine
+        if self.scope:
+            self.scope.close()
+            self.scope = None
+        try:
+            if engine.error is not None:
+                raise engine.error
+
+            if engine.abortado:
+                if self.text_widget:
+                    self.text_widget.insert(tk.END, "-"*40 + "\n")
+                    self.text_widget.insert(tk.END, "Captura abortada: datos descartados\n")
+                return
+
+            if self.text_widget and engine.muestras > 0:
                 self.text_widget.insert(tk.END, "-"*40 + "\n")
-                self.text_widget.insert(tk.END, f"Captura completada: {len(buffer_data)} muestras\n")
-            
-            self._show_plot(subject_id, movement_type)
-            messagebox.showinfo("Éxito", f"Datos capturados: {len(self.data)} muestras")
-            
+                self.text_widget.insert(tk.END, f"Captura completada: {engine.muestras} muestras\n")
+                self.text_widget.insert(tk.END, f"Tasa sostenida: {engine.tasa_muestreo():.1f} muestras/s\n")
+                if engine.buffer.descartadas:
+                    self.text_widget.insert(
+                        tk.END,
+                        f"ADVERTENCIA: {engine.buffer.descartadas} muestras descartadas por buffer lleno"
+                        f" (la captura tiene huecos)\n"
+                    )
+                if self.protocol == "binario":
+                    decoder = engine.decodificador
+                    self.text_widget.insert(
+                        tk.END,
+                        f"Tramas recibidas: {decoder.tramas} | Perdidas: {decoder.tramas_perdidas}"
+                        f" | Corruptas: {decoder.tramas_corruptas}\n"
+                    )
+
+                if self.recording_dir:
+                    self.text_widget.insert(tk.END, f"Grabación guardada en: {self.recording_dir}\n")
+
+            self._show_plot(self._subject_id, self._movement_type)
+            messagebox.showinfo("Éxito", f"Datos capturados: {engine.muestras} muestras")
+
         except Exception as e:
             error_msg = f"Error en lectura: {str(e)}"
             if self.text_widget:
                 self.text_widget.insert(tk.END, "\nERROR: " + error_msg + "\n")
             messagebox.showerror("Error", error_msg)
         finally:
-            if 'ser' in locals():
-                ser.close()
+            if self.on_finish:
+                self.on_finish()
 
     def _show_plot(self, subject_id, movement_type):
         """Visualización de los datos capturados"""
-        if self.ax and self.canvas and not self.data.empty:
+        if self.ax and self.canvas and self.buffer is not None and len(self.buffer) > 0:
             self.ax.clear()
             
             # Excluir los primeros 50 datos si hay suficientes muestras
-            data_to_plot = self.data.iloc[1000:] if len(self.data) > 1000 else self.data
+            n = len(self.buffer)
+            start = 1000 if n > 1000 else 0
             
-            self.ax.plot(data_to_plot['Muestra'], data_to_plot['Valor lectura'], 'b-')
+            self.ax.plot(np.arange(start + 1, n + 1), self.buffer.crudo[start:n], 'b-')
             self.ax.set_title(f'Sujeto: {subject_id} | Movimiento: {movement_type}')
             self.ax.set_xlabel('Muestra')
             self.ax.set_ylabel('Valor Lectura')
             self.ax.grid(True)
             self.canvas.draw()
 
+class LiveScope:
+    """Vista en vivo de los últimos segundos de la señal (blitting + decimación min/max)"""
+
+    def __init__(self, ax, canvas, window_s=5.0, capacity=2 ** 17, y_range=(0, 1023)):
+        self.ax = ax
+        self.canvas = canvas
+        self.window_s = window_s
+        self.capacity = capacity
+        # Buffer espejado: cada muestra se escribe en i y en i + capacity para
+        # que las últimas `capacity` muestras siempre formen una vista contigua
+        self._values = np.zeros(2 * capacity, dtype=np.float32)
+        self._times = np.zeros(2 * capacity, dtype=np.int64)
+        self._count = 0
+        self._background = None
+
+        self.ax.clear()
+        self.ax.set_xlim(-window_s, 0)
+        self.ax.set_ylim(*y_range)
+        self.ax.set_xlabel('Tiempo relativo (s)')
+        self.ax.set_ylabel('Valor Lectura')
+        self.ax.grid(True)
+        (self.line,) = self.ax.plot([], [], 'b-', linewidth=0.8, animated=True)
+
+        self._blit = getattr(self.canvas, 'supports_blit', True)
+        self._draw_cid = self.canvas.mpl_connect('draw_event', self._on_draw)
+        self.canvas.draw()
+
+    def _on_draw(self, event):
+        """Guarda el fondo estático (ejes, rejilla) tras cada redibujado completo"""
+        self._background = self.canvas.copy_from_bbox(self.ax.bbox)
+        self.ax.draw_artist(self.line)
+
+    def push(self, values, times_ns):
+        """Agrega muestras nuevas al buffer de visualización"""
+        values = values[-self.capacity:]
+        times_ns = times_ns[-self.capacity:]
+        pos = np.arange(self._count, self._count + len(values)) % self.capacity
+        self._values[pos] = values
+        self._values[pos + self.capacity] = values
+        self._times[pos] = times_ns
+        self._times[pos + self.capacity] = times_ns
+        self._count += len(values)
+
+    def _visible(self):
+        """Vista (sin copia) de las muestras dentro de la ventana de tiempo"""
+        if self._count <= self.capacity:
+            start, stop = 0, self._count
+        else:
+            start = self._count % self.capacity
+            stop = start + self.capacity
+        times = self._times[start:stop]
+        values = self._values[start:stop]
+        if len(times) == 0:
+            return times, values
+        first = np.searchsorted(times, times[-1] - int(self.window_s * 1e9))
+        return times[first:], values[first:]
+
+    @staticmethod
+    def decimate(x, y, width):
+        """Reduce la señal a un par (mínimo, máximo) por columna de píxeles"""
+        n = len(y)
+        if width <= 0 or n <= 2 * width:
+            return x, y
+        k = n // width
+        m = k * width
+        xs = x[n - m:].reshape(width, k)
+        ys = y[n - m:].reshape(width, k)
+        xd = np.column_stack((xs[:, 0], xs[:, -1])).ravel()
+        yd = np.column_stack((ys.min(axis=1), ys.max(axis=1))).ravel()
+        return xd, yd
+
+    def update(self):
+        """Redibuja solo la línea; el costo no depende de la tasa de muestreo"""
+        times, values = self._visible()
+        if len(times) == 0:
+            return
+        x = (times - times[-1]) / 1e9
+        x, y = self.decimate(x, values, int(self.ax.bbox.width))
+        self.line.set_data(x, y)
+
+        # Ampliar la escala vertical solo si la señal se sale del rango (redibujado completo)
+        y_min, y_max = self.ax.get_ylim()
+        low, high = float(y.min()), float(y.max())
+        if low < y_min or high > y_max:
+            margin = 0.05 * max(high - low, 1.0)
+            self.ax.set_ylim(min(low, y_min) - margin, max(high, y_max) + margin)
+            self.canvas.draw()
+            return
+
+        if self._blit and self._background is not None:
+            self.canvas.restore_region(self._background)
+            self.ax.draw_artist(self.line)
+            self.canvas.blit(self.ax.bbox)
+        else:
+            self.canvas.draw_idle()
+
+    def close(self):
+        self.canvas.mpl_disconnect(self._draw_cid)
+        self.line.set_animated(False)
+        self.canvas.draw_idle()
+
+
 # Constantes
 ROOT_PATH = r"C:\Users\Work\Desktop\aplicacion"
 ASSETS_PATH = os.path.join(ROOT_PATH, "assets")
+GRABACIONES_PATH = os.path.join(ROOT_PATH, "grabaciones")
+CACHE_CARACTERISTICAS_PATH = os.path.join(ROOT_PATH, "cache_caracteristicas")
+CACHE_UI_PATH = os.path.join(ROOT_PATH, "cache_ui")  # Fondo e iconos ya escalados
+MODELO_PATH = os.path.join(ROOT_PATH, "modelos", "modelo_emg.joblib")
+BUSQUEDAS_PATH = os.path.join(ROOT_PATH, "modelos", "busquedas.sqlite")
 COLOR_PRINCIPAL = '#2c3e50'
 
+
+def imagen_escalada(ruta, tamano, preparar):
+    """PhotoImage de `ruta` preparada para `tamano`, leída de la caché de mapas de bits si existe
+
+    La clave es el nombre del archivo, su fecha de modificación y el tamaño destino:
+    cambiar la imagen o la resolución de pantalla genera una entrada nueva. Las
+    imágenes opacas se guardan como PPM, que Tk carga sin decodificar PNG ni
+    pasar por PIL; las que tienen transparencia, como PNG.
+    """
+    clave = f"{os.path.splitext(os.path.basename(ruta))[0]}_{tamano[0]}x{tamano[1]}_{os.stat(ruta).st_mtime_ns:x}"
+    for extension in ('.ppm', '.png'):
+        cacheada = os.path.join(CACHE_UI_PATH, clave + extension)
+        if os.path.exists(cacheada):
+            return tk.PhotoImage(file=cacheada)
+
+    imagen = preparar(Image.open(ruta))
+    opaca = imagen.mode == 'RGB' or (imagen.mode == 'RGBA' and imagen.getextrema()[3][0] == 255)
+    extension, formato = ('.ppm', 'PPM') if opaca else ('.png', 'PNG')
+    try:
+        os.makedirs(CACHE_UI_PATH, exist_ok=True)
+        destino = os.path.join(CACHE_UI_PATH, clave + extension)
+        temporal = destino + '.tmp'
+        (imagen.convert('RGB') if opaca else imagen).save(temporal, format=formato)
+        os.replace(temporal, destino)
+    except OSError as e:
+        print(f"No se pudo guardar {clave} en la caché de imágenes: {e}")
+    return ImageTk.PhotoImage(imagen)
+
+
 class InterfazApp:
     def __init__(self, root):
         self.root = root
@@ -164,11 +492,26 @@ class InterfazApp:
         if os.path.exists(ASSETS_PATH):
             print("Archivos en assets/:", os.listdir(ASSETS_PATH))
         
-        # Configuración inicial
-        self._setup_background()
-        self._setup_main_frame()
-        self._setup_button_icons()
-        self._setup_ui_components()
+        # Caché en disco de características (se reutiliza entre ejecuciones de "Prueba")
+        self.cache_caracteristicas = CacheCaracteristicas(CACHE_CARACTERISTICAS_PATH)
+
+        # Configuración inicial, midiendo cada paso para el desglose de arranque
+        self.tiempos_arranque = {'imports': _FIN_IMPORTS - _INICIO_ARRANQUE}
+        for nombre, paso in (('fondo', self._setup_background), ('marco', self._setup_main_frame),
+                             ('iconos', self._setup_button_icons), ('componentes', self._setup_ui_components)):
+            inicio = time.perf_counter()
+            paso()
+            self.tiempos_arranque[nombre] = time.perf_counter() - inicio
+
+        # Cuando la ventana ya está visible: informar el arranque y cargar el último modelo
+        self.root.after_idle(self._ventana_visible)
+
+    def _ventana_visible(self):
+        """Imprime el desglose de tiempos hasta la primera ventana y sigue con las tareas diferidas"""
+        self.tiempos_arranque['primera ventana'] = time.perf_counter() - _INICIO_ARRANQUE
+        print("⏱️  Arranque: " + " | ".join(f"{nombre} {t:.3f} s" for nombre, t in self.tiempos_arranque.items()))
+        # El modelo guardado trae joblib y sklearn: se carga después de pintar la ventana
+        self.root.after(10, self._cargar_modelo_guardado)
         
     def _setup_background(self):
         """Configura el fondo con manejo robusto de errores"""
@@ -176,11 +519,11 @@ class InterfazApp:
             bg_path = os.path.join(ROOT_PATH, f"fondo.png")
             if not os.path.exists(bg_path):
                 bg_path = os.path.join(ASSETS_PATH, "fondo.jpg")
-            bg_img = Image.open(bg_path)
-            bg_img = bg_img.resize((self.root.winfo_screenwidth(), 
-                                  self.root.winfo_screenheight()),
-                                  Image.Resampling.LANCZOS)
-            self.bg_photo = ImageTk.PhotoImage(bg_img)
+            # Escalar a la pantalla solo la primera vez; luego se lee de la caché
+            pantalla = (self.root.winfo_screenwidth(), self.root.winfo_screenheight())
+            self.bg_photo = imagen_escalada(
+                bg_path, pantalla, lambda img: img.resize(pantalla, Image.Resampling.LANCZOS)
+            )
             bg_label = tk.Label(self.root, image=self.bg_photo)
             bg_label.place(x=0, y=0, relwidth=1, relheight=1)
             bg_label.lower()
@@ -205,9 +548,7 @@ class InterfazApp:
         # Cargar imágenes desde ROOT_PATH
         Mov_path = os.path.join(ROOT_PATH, "imagen.png")
 
-        Mov_img = Image.open(Mov_path).resize((400, 250))  # nuevo tamaño
-
-        self.flexion_photo = ImageTk.PhotoImage(Mov_img)
+        self.flexion_photo = imagen_escalada(Mov_path, (400, 250), lambda img: img.resize((400, 250)))  # nuevo tamaño
 
         # Marcos para cada imagen
         Mov_frame = tk.Frame(img_frame, bg='#cce6ff')
@@ -239,22 +580,11 @@ class InterfazApp:
                 img_path = os.path.join(ROOT_PATH, f"{file_name}{ext}")
                 if os.path.exists(img_path):
                     try:
-                        img = Image.open(img_path).convert("RGBA")
-
-                        # Crear un lienzo transparente del tamaño final
-                        canvas = Image.new("RGBA", icon_size, (0, 0, 0, 0))
-
-                        # Redimensionar sin deformar (manteniendo aspecto)
-                        img.thumbnail(icon_size, Image.Resampling.LANCZOS)
-
-                        # Calcular posición para centrar la imagen
-                        offset = ((icon_size[0] - img.width) // 2, (icon_size[1] - img.height) // 2)
-                        canvas.paste(img, offset)
-
-                        icon = ImageTk.PhotoImage(canvas)
+                        # El ícono ajustado se guarda en la caché y en los siguientes arranques solo se lee
+                        icon = imagen_escalada(img_path, icon_size, lambda img: self._ajustar_icono(img, icon_size))
                         self.icons[code_name] = icon
 
-                        print(f"Icono cargado y ajustado: {file_name}{ext}, original: {img.size}, final: {canvas.size}")
+                        print(f"Icono cargado: {file_name}{ext}, final: {icon.width()}x{icon.height()}")
                         icon_loaded = True
                         break
                     except Exception as e:
@@ -263,6 +593,113 @@ class InterfazApp:
                 print(f"¡Icono {file_name} no encontrado!")
                 self.icons[code_name] = None
 
+    @staticmethod
+    def _ajustar_icono(img, icon_size):
+        """Redimensiona un ícono sin deformarlo y lo centra en un lienzo transparente"""
+        img = img.convert("RGBA")
+
+        # Crear un lienzo transparente del tamaño final
+        canvas = Image.new("RGBA", icon_size, (0, 0, 0, 0))
+
+        # Redimensionar sin deformar (manteniendo aspecto)
+        img.thumbnail(icon_size, Image.Resampling.LANCZOS)
+
+        # Calcular posición para centrar la imagen
+        offset = ((icon_size[0] - img.width) // 2, (icon_size[1] - img.height) // 2)
+        canvas.paste(img, offset)
+        return canvas
+
+
+    def _cargar_modelo_guardado(self):
+        """Carga el artefacto del último entrenamiento para clasificar sin reentrenar"""
+        if not os.path.exists(MODELO_PATH):
+            return
+        inicio = time.perf_counter()
+        try:
+            artefacto = cargar_modelo(MODELO_PATH)
+        except Exception as e:
+            self.area_mensajes.insert(tk.END, f"No se pudo cargar el modelo guardado: {e}\n")
+            return
+        self.model = artefacto['modelo']
+        self.scaler = artefacto['scaler']
+        self.feature_columns = artefacto['columnas']
+        self.modelo_info = artefacto
+        self.area_mensajes.insert(
+            tk.END,
+            f"Modelo cargado ({artefacto['creado']}, {len(self.feature_columns)} características)"
+            f" en {time.perf_counter() - inicio:.2f} s; listo para clasificar en vivo.\n"
+        )
+
+    def _almacen_busqueda(self):
+        """Almacén de resultados de búsqueda de hiperparámetros (se abre al primer uso)"""
+        if getattr(self, 'almacen_busqueda', None) is None:
+            self.almacen_busqueda = AlmacenBusqueda(BUSQUEDAS_PATH)
+        return self.almacen_busqueda
+
+    def _elegir_modo_busqueda(self):
+        """Diálogo para elegir la estrategia de búsqueda; devuelve la configuración o None si se cancela"""
+        config = dict(getattr(self, 'config_busqueda', CONFIG_BUSQUEDA))
+
+        dialogo = tk.Toplevel(self.root)
+        dialogo.title("Modo de búsqueda")
+        dialogo.configure(bg="#e6e6e6")
+        dialogo.resizable(False, False)
+        dialogo.transient(self.root)
+        dialogo.grab_set()
+
+        nombres = {descripcion: modo for modo, descripcion in MODOS_BUSQUEDA.items()}
+        tk.Label(dialogo, text="Estrategia:", bg="#e6e6e6").grid(row=0, column=0, sticky="w", padx=10, pady=5)
+        combo_modo = ttk.Combobox(dialogo, values=list(nombres), state="readonly", width=30)
+        combo_modo.set(MODOS_BUSQUEDA[config['modo']])
+        combo_modo.grid(row=0, column=1, padx=10, pady=5)
+
+        tk.Label(dialogo, text="Máx. ajustes por modelo:", bg="#e6e6e6").grid(row=1, column=0, sticky="w", padx=10)
+        entry_ajustes = tk.Entry(dialogo, width=10)
+        entry_ajustes.insert(0, "" if config['max_ajustes'] is None else str(config['max_ajustes']))
+        entry_ajustes.grid(row=1, column=1, sticky="w", padx=10, pady=5)
+
+        tk.Label(dialogo, text="Máx. segundos (solo aleatoria):", bg="#e6e6e6").grid(row=2, column=0, sticky="w", padx=10)
+        entry_segundos = tk.Entry(dialogo, width=10)
+        entry_segundos.insert(0, "" if config['max_segundos'] is None else str(config['max_segundos']))
+        entry_segundos.grid(row=2, column=1, sticky="w", padx=10, pady=5)
+
+        var_early = tk.BooleanVar(value=config['early_stopping_mlp'])
+        tk.Checkbutton(dialogo, text="Early stopping en la red neuronal", variable=var_early,
+                       bg="#e6e6e6").grid(row=3, column=0, columnspan=2, sticky="w", padx=10, pady=5)
+
+        elegido = {}
+
+        def aceptar():
+            try:
+                ajustes = entry_ajustes.get().strip()
+                segundos = entry_segundos.get().strip()
+                config.update({
+                    'modo': nombres[combo_modo.get()],
+                    'max_ajustes': int(ajustes) if ajustes else None,
+                    'max_segundos': float(segundos) if segundos else None,
+                    'early_stopping_mlp': var_early.get(),
+                })
+            except ValueError:
+                messagebox.showerror("Error", "Los límites deben ser números (o quedar vacíos).", parent=dialogo)
+                return
+            try:
+                opciones_busqueda(config)
+            except ValueError as e:
+                messagebox.showerror("Error", str(e), parent=dialogo)
+                return
+            elegido.update(config)
+            dialogo.destroy()
+
+        frame_botones = tk.Frame(dialogo, bg="#e6e6e6")
+        frame_botones.grid(row=4, column=0, columnspan=2, pady=10)
+        tk.Button(frame_botones, text="Aceptar", command=aceptar, bg="#2ecc71", fg="white").pack(side=tk.LEFT, padx=5)
+        tk.Button(frame_botones, text="Cancelar", command=dialogo.destroy).pack(side=tk.LEFT, padx=5)
+
+        self.root.wait_window(dialogo)
+        if not elegido:
+            return None
+        self.config_busqueda = elegido
+        return elegido
 
     def _setup_ui_components(self):
         """Configura todos los componentes de la interfaz"""
@@ -291,6 +728,12 @@ class InterfazApp:
             btn.grid(row=0, column=i, padx=10, pady=5, sticky="nsew")
             self.frame_botones.grid_columnconfigure(i, weight=1)
 
+        # El rendimiento por etapa se consulta sin cargar ni entrenar (p. ej. tras una carga lenta)
+        tk.Button(self.frame_botones, text="Rendimiento", command=self.mostrar_rendimiento,
+                  font=("Arial", 10, "bold"), bg="#7f8c8d", fg="white", relief='flat',
+                  activebackground=self._darken_color("#7f8c8d")).grid(
+            row=1, column=len(button_configs) - 1, padx=10, pady=(0, 5), sticky="ew")
+
     def _create_button(self, config):
         """Versión robusta para creación de botones"""
         icon_img = self.icons.get(config['icon'])
@@ -359,91 +802,36 @@ class InterfazApp:
     def cargar_archivo(self):
         self.area_mensajes.delete(1.0, tk.END)
         # Nombre del archivo a cargar
-        archivo = filedialog.askopenfilename(
-            title="Seleccionar archivo Excel",
-            filetypes=[("Archivos Excel", "*.xlsx *.xls")]
+        archivos = filedialog.askopenfilenames(
+            title="Seleccionar archivo Excel, almacén o grabaciones",
+            filetypes=[("Archivos Excel", "*.xlsx *.xls"), ("Almacén EMG", NOMBRE_INDICE), ("Grabaciones", NOMBRE_MANIFIESTO)]
         )
+        if not archivos:
+            return
+        archivo = archivos[0]
         try:
-            # Cargar el archivo Excel
-            self.df = pd.read_excel(archivo)
+            # Excel, almacén columnar o grabaciones de la ventana de captura
+            with etapa('carga'):
+                self.df, almacen = cargar_datos(list(archivos))
             self.file_name = archivo
 
-            # Verificar que las columnas necesarias existen
-            if 'Valor lectura' not in self.df.columns or 'Sujeto' not in self.df.columns or 'Movimiento_ID' not in self.df.columns:
-                raise ValueError("El archivo no contiene las columnas necesarias: 'Valor lectura', 'Sujeto' o 'Movimiento_ID'.")
-
-            # Parámetros del filtro
-            fs = 500  # Frecuencia de muestreo (200 Hz)
-            Ts = 1 / fs  # Periodo de muestreo
-            low_cutoff = 20  # Frecuencia de corte inferior (Hz)
-            high_cutoff = 200  # Frecuencia de corte superior (Hz)
-            Q = 20.0  # Factor de calidad del notch
-            
-            
-            # Función para identificar frecuencias de ruido
-            def identificar_ruidos(senal, num_ruidos=4):
-                N = len(senal)
-                yf = fft(senal)
-                xf = np.linspace(0.0, fs / 2, N // 2)
-                magnitudes = 2.0 / N * np.abs(yf[0:N // 2])
-                indices_ruido = np.argsort(magnitudes)[-num_ruidos:]
-                return xf[indices_ruido]
-
-            # Función para aplicar el filtro notch
-            def aplicar_filtro_notch(senal, f0, Q):
-                b, a = iirnotch(f0, Q, fs)
-                return lfilter(b, a, senal)
-
-            # Función para diseñar el filtro pasabanda
-            def butter_bandpass(lowcut, highcut, fs, order=5):
-                nyquist = 0.5 * fs
-                low = lowcut / nyquist
-                high = highcut / nyquist
-                b, a = butter(order, [low, high], btype='band')
-                return b, a
-
-            # Función para aplicar el filtro pasabanda
-            def butter_bandpass_filter(data, lowcut, highcut, fs, order=5):
-                b, a = butter_bandpass(lowcut, highcut, fs, order=order)
-                return filtfilt(b, a, data)
-
-
-            self.df['Señal Filtrada'] = np.nan
-
-            # Filtrar por sujeto y tipo de movimiento
-            sujetos = self.df['Sujeto'].unique()
-            movimientos = self.df['Movimiento_ID'].unique()
-
-            for sujeto in sujetos:
-                for movimiento in movimientos:
-                    # Seleccionar los datos del sujeto y movimiento actual
-                    df_sujeto_movimiento = self.df[(self.df['Sujeto'] == sujeto) & (self.df['Movimiento_ID'] == movimiento)]
-                    # Verificar si la señal tiene suficientes muestras
-                    if len(df_sujeto_movimiento) < 34:
-                        self.area_mensajes.insert(
-                            tk.END, 
-                            f"Sujeto {sujeto}, Movimiento {movimiento}: señal demasiado corta ({len(df_sujeto_movimiento)} muestras), se omite el filtrado.\n"
-                        )
-                        continue  # Saltar esta señal
-
-                    # Aplicar el filtro pasabanda
-                    senal_filtrada = butter_bandpass_filter(df_sujeto_movimiento['Valor lectura'].values, low_cutoff, high_cutoff, fs)
-
-                    # Identificar y aplicar filtros notch
-                    frecs_ruido = identificar_ruidos(senal_filtrada, num_ruidos=4)
-                    for f0 in frecs_ruido:
-                        senal_filtrada = aplicar_filtro_notch(senal_filtrada, f0, Q)
-
-                    # Asignar la señal filtrada a la columna correspondiente
-                    self.df.loc[(self.df['Sujeto'] == sujeto) & (self.df['Movimiento_ID'] == movimiento), 'Señal Filtrada'] = senal_filtrada
-            
-
-            # Guardar el DataFrame con la señal filtrada en el mismo archivo Excel
-            with pd.ExcelWriter(archivo, engine='openpyxl', mode='a', if_sheet_exists='replace') as writer:
-                self.df.to_excel(writer, index=False)
+            # Filtrar (o leer del almacén la señal ya filtrada con los mismos parámetros)
+            with etapa('filtrado'):
+                self.df, self.indice, _ = filtrar_datos(
+                    self.df, almacen, PARAMETROS_FILTRO,
+                    avisar=lambda texto: self.area_mensajes.insert(tk.END, texto + "\n")
+                )
 
             # Mostrar mensaje de éxito
-            self.area_mensajes.insert(tk.END, f"Archivo cargado: {archivo}\n")
+            for a in archivos:
+                self.area_mensajes.insert(tk.END, f"Archivo cargado: {a}\n")
+            huella_modelo = getattr(self, 'modelo_info', {}).get('huella_dataset')
+            if huella_modelo is not None:
+                mismos = huella_modelo == huella_dataset(self.df)
+                self.area_mensajes.insert(
+                    tk.END, "El modelo cargado se entrenó con estos mismos datos.\n" if mismos else
+                    "El modelo cargado se entrenó con otros datos; 'Prueba' lo reentrena con estos.\n"
+                )
             messagebox.showinfo("Éxito", "Archivo cargado y señal filtrada correctamente.")
 
             # Mostrar las primeras filas del DataFrame con la nueva columna
@@ -460,6 +848,9 @@ class InterfazApp:
         self.abrir_ventana_captura()
     
     def abrir_ventana_captura(self):
+        import matplotlib.pyplot as plt
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+
         # Crear una nueva ventana
         ventana_captura = tk.Toplevel(self.root)
         ventana_captura.title("Captura de Datos")
@@ -487,10 +878,60 @@ class InterfazApp:
         self.entry_movement_type.grid(row=2, column=1, padx=5, pady=5, sticky="w")
         self.entry_movement_type.current(0)  # Selección por defecto
 
-        # Botón para iniciar la captura
-        boton_iniciar = tk.Button(frame_controles, text="Iniciar Captura", command=self.iniciar_captura, 
+        tk.Label(frame_controles, text="Protocolo:", font=("Arial", 12)).grid(row=0, column=2, padx=5, pady=5, sticky="e")
+        self.entry_protocolo = ttk.Combobox(frame_controles, values=["Texto", "Binario"], font=("Arial", 12), state="readonly")
+        self.entry_protocolo.grid(row=0, column=3, padx=5, pady=5, sticky="w")
+        self.entry_protocolo.current(0)
+
+        tk.Label(frame_controles, text="Baudios:", font=("Arial", 12)).grid(row=1, column=2, padx=5, pady=5, sticky="e")
+        self.entry_baudios = ttk.Combobox(frame_controles, values=BAUDIOS_DISPONIBLES, font=("Arial", 12))
+        self.entry_baudios.grid(row=1, column=3, padx=5, pady=5, sticky="w")
+        self.entry_baudios.current(0)
+
+        tk.Label(frame_controles, text="Muestras (0 = continuo):", font=("Arial", 12)).grid(row=2, column=2, padx=5, pady=5, sticky="e")
+        self.entry_muestras = tk.Entry(frame_controles, font=("Arial", 12))
+        self.entry_muestras.grid(row=2, column=3, padx=5, pady=5, sticky="w")
+        self.entry_muestras.insert(0, "6015")
+
+        self.var_guardar_disco = tk.BooleanVar(value=True)
+        tk.Checkbutton(frame_controles, text="Guardar en disco", variable=self.var_guardar_disco,
+                       font=("Arial", 12)).grid(row=3, column=2, columnspan=2, padx=5, pady=5, sticky="w")
+
+        self.var_filtro_vivo = tk.BooleanVar(value=False)
+        tk.Checkbutton(frame_controles, text="Filtrar en vivo", variable=self.var_filtro_vivo,
+                       font=("Arial", 12)).grid(row=3, column=0, padx=5, pady=5, sticky="w")
+
+        # La clasificación en vivo usa el modelo y el escalador entrenados en "Prueba"
+        self.var_clasificar_vivo = tk.BooleanVar(value=False)
+        tk.Checkbutton(frame_controles, text="Clasificar en vivo", variable=self.var_clasificar_vivo,
+                       font=("Arial", 12)).grid(row=3, column=1, padx=5, pady=5, sticky="w")
+
+        # Botones para iniciar, detener y abortar la captura
+        frame_botones_captura = tk.Frame(frame_controles)
+        frame_botones_captura.grid(row=4, column=0, columnspan=4, pady=10)
+
+        self.boton_iniciar = tk.Button(frame_botones_captura, text="Iniciar Captura", command=self.iniciar_captura, 
                                 width=20, font=("Arial", 12), bg="#6699cc", fg="white")
-        boton_iniciar.grid(row=3, column=0, columnspan=2, pady=10)
+        self.boton_iniciar.pack(side=tk.LEFT, padx=5)
+
+        self.boton_detener = tk.Button(frame_botones_captura, text="Detener", command=self.detener_captura,
+                                width=12, font=("Arial", 12), bg="#e67e22", fg="white", state=tk.DISABLED)
+        self.boton_detener.pack(side=tk.LEFT, padx=5)
+
+        self.boton_abortar = tk.Button(frame_botones_captura, text="Abortar", command=self.abortar_captura,
+                                width=12, font=("Arial", 12), bg="#c0392b", fg="white", state=tk.DISABLED)
+        self.boton_abortar.pack(side=tk.LEFT, padx=5)
+
+        # Estado de la adquisición (muestras y tasa sostenida)
+        self.label_estado_captura = tk.Label(frame_controles, text="Sin captura en curso", font=("Consolas", 10))
+        self.label_estado_captura.grid(row=5, column=0, columnspan=4, pady=(0, 5))
+
+        # Clase actual de la clasificación en vivo
+        self.label_clase_vivo = tk.Label(frame_controles, text="", font=("Arial", 14, "bold"), fg="#2c3e50")
+        self.label_clase_vivo.grid(row=6, column=0, columnspan=4, pady=(0, 5))
+
+        self.reader = None
+        ventana_captura.protocol("WM_DELETE_WINDOW", lambda: self.cerrar_ventana_captura(ventana_captura))
 
         # Frame para gráfica
         frame_grafica = tk.Frame(ventana_captura)
@@ -524,11 +965,29 @@ class InterfazApp:
         port = self.entry_puerto.get()
         subject_id = self.entry_subject_id.get()
         movement_type = self.entry_movement_type.get()
+        protocol = self.entry_protocolo.get().lower()
 
         if not port or not subject_id or not movement_type:
             messagebox.showwarning("Advertencia", "Complete todos los campos")
             return
 
+        try:
+            speed = int(self.entry_baudios.get())
+            records = int(self.entry_muestras.get())
+        except ValueError:
+            messagebox.showwarning("Advertencia", "La velocidad en baudios y el número de muestras deben ser enteros")
+            return
+
+        save_to_disk = self.var_guardar_disco.get()
+        if records <= 0 and not save_to_disk:
+            messagebox.showwarning("Advertencia", "La captura continua requiere guardar en disco")
+            return
+
+        classify = self.var_clasificar_vivo.get()
+        if classify and not (hasattr(self, 'model') and hasattr(self, 'scaler')):
+            messagebox.showwarning("Advertencia", "Primero entrena un modelo con 'Prueba' para clasificar en vivo")
+            return
+
         # Limpiar widgets antes de nueva captura
         self.ax.clear()
         self.canvas.draw()
@@ -536,16 +995,71 @@ class InterfazApp:
         
         # Configurar y ejecutar captura
         try:
-            reader = SerialReader(port, 9600)
-            reader.set_records_number(6015)  # Ajusta según necesidad
+            reader = SerialReader(port, speed)
+            reader.set_root(self.root)
+            reader.set_records_number(records if records > 0 else None)
+            reader.set_protocol(protocol)
+            if save_to_disk:
+                stamp = time.strftime("%Y%m%d_%H%M%S")
+                reader.set_recording_dir(os.path.join(GRABACIONES_PATH, f"{subject_id}_{movement_type}_{stamp}"))
             reader.set_plot_widgets(self.ax, self.canvas)
+            if self.var_filtro_vivo.get():
+                reader.set_live_filter(FiltroStreaming())
+            self.label_clase_vivo.config(text="")
+            if classify:
+                # La ventana y el filtro en vivo son los mismos con los que se entrenó el modelo
+                parametros_vivo = dict(PARAMETROS_VIVO)
+                modelo_info = getattr(self, 'modelo_info', {})
+                longitud = modelo_info.get('caracteristicas', {}).get('longitud')
+                if longitud:
+                    parametros_vivo['ventana'] = longitud
+                parametros_vivo['parametros_filtro'] = modelo_info.get('parametros_filtro')
+                reader.set_live_classifier(
+                    ClasificadorEnVivo(self.model, self.scaler, self.feature_columns, **parametros_vivo),
+                    self.label_clase_vivo
+                )
             reader.set_text_widget(self.text_widget)  # ¡Importante! Asignar el widget de texto
+            reader.set_status_label(self.label_estado_captura)
+            reader.on_finish = self._captura_finalizada
             reader.read_from_port(subject_id, movement_type)
+            self.reader = reader
+            self.boton_iniciar.config(state=tk.DISABLED)
+            self.boton_detener.config(state=tk.NORMAL)
+            self.boton_abortar.config(state=tk.NORMAL)
         except Exception as e:
             self.text_widget.insert(tk.END, f"Error al iniciar captura: {str(e)}\n", 'error')
             messagebox.showerror("Error", f"No se pudo iniciar la captura: {str(e)}")
-            
+
+    def detener_captura(self):
+        if self.reader and self.reader.capturing:
+            self.reader.stop()
+
+    def abortar_captura(self):
+        if self.reader and self.reader.capturing:
+            self.reader.abort()
+
+    def _captura_finalizada(self):
+        """Restablece los botones de la ventana de captura"""
+        if self.boton_iniciar.winfo_exists():
+            self.boton_iniciar.config(state=tk.NORMAL)
+            self.boton_detener.config(state=tk.DISABLED)
+            self.boton_abortar.config(state=tk.DISABLED)
+
+    def cerrar_ventana_captura(self, ventana_captura):
+        """Aborta cualquier captura en curso antes de cerrar la ventana"""
+        if self.reader and self.reader.capturing:
+            self.reader.on_finish = None
+            self.reader.set_text_widget(None)
+            self.reader.set_status_label(None)
+            self.reader.set_live_classifier(None, None)
+            self.reader.abort()
+            self.reader.engine.esperar(1.0)
+        ventana_captura.destroy()
+
     def ver_senales(self):
+        import matplotlib.pyplot as plt
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+
         # Crear una nueva ventana
         ventana_senales = tk.Toplevel(self.root)
         ventana_senales.title("Visualización de Señales")
@@ -563,8 +1077,11 @@ class InterfazApp:
 
         # Selección de Sujeto
         tk.Label(frame_graficas, text="Seleccionar Sujeto:", font=("Arial", 12)).pack(pady=10)
-        sujetos = self.df['Sujeto'].astype(str).unique()  # Convertir a cadenas de texto
-        sujetos = [s.replace("['", "").replace("']", "") for s in sujetos]  # Eliminar corchetes y comillas
+        # Texto mostrado (sin corchetes ni comillas) -> valor original del sujeto en el índice
+        self.sujetos_por_texto = {
+            str(s).replace("['", "").replace("']", ""): s for s in self.indice.sujetos_unicos()
+        }
+        sujetos = list(self.sujetos_por_texto)
         self.combo_sujeto = ttk.Combobox(frame_graficas, values=sujetos, font=("Arial", 12))
         self.combo_sujeto.pack(pady=10)
 
@@ -587,35 +1104,44 @@ class InterfazApp:
         for ax in axs.flat:
             ax.clear()
 
-        # Gráficas de amplitud
-        self.def_amplitud(axs, sujeto_seleccionado)
+        with etapa('graficos.senales'):
+            # Gráficas de amplitud
+            self.def_amplitud(axs, sujeto_seleccionado)
 
-        # Gráficas de Fourier
-        self.def_fourier(axs, sujeto_seleccionado)
+            # Gráficas de Fourier
+            self.def_fourier(axs, sujeto_seleccionado)
 
-        # Actualizar la figura
-        fig.suptitle(f"Análisis de Señales ({sujeto_seleccionado})", fontsize=14)
-        self.canvas_senales.draw()
+            # Actualizar la figura
+            fig.suptitle(f"Análisis de Señales ({sujeto_seleccionado})", fontsize=14)
+            self.canvas_senales.draw()
+
+    def _vistas_sujeto(self, sujeto_seleccionado, movimiento_id, *columnas):
+        """Vistas sin copia de las columnas pedidas para un registro del sujeto"""
+        sujeto = self.sujetos_por_texto.get(sujeto_seleccionado, sujeto_seleccionado)
+        return [self.indice.vista(self.df[c].to_numpy(), sujeto, movimiento_id) for c in columnas]
 
     def def_amplitud(self, axs, sujeto_seleccionado):
+        import scipy.signal as signal
+        from scipy.ndimage import gaussian_filter1d
+
         # Gráfica 1: Flexión para el sujeto seleccionado
-        flexion_df = self.df[(self.df['Movimiento_ID'] == 13) & (self.df['Sujeto'] == sujeto_seleccionado)]
-        envolvente_flexion = np.abs(signal.hilbert(flexion_df['Señal Filtrada'].to_numpy()))
+        flexion, tiempo_flexion = self._vistas_sujeto(sujeto_seleccionado, 13, 'Señal Filtrada', 'Tiempo (s)')
+        envolvente_flexion = np.abs(signal.hilbert(flexion))
         envolvente_flexion_suave = gaussian_filter1d(envolvente_flexion, sigma=20)
-        axs[0, 0].plot(flexion_df['Tiempo (s)'], envolvente_flexion_suave, color='red', label='Flexión')
+        axs[0, 0].plot(tiempo_flexion, envolvente_flexion_suave, color='red', label='Flexión')
         axs[0, 0].set_title('Amplitud de la señal', fontsize=10)
         axs[0, 0].set_ylabel('Valor Lectura', fontsize=10)
         axs[0, 0].legend()
         axs[0, 0].grid(True)
 
         # Gráfica 2: Extensión para el sujeto seleccionado
-        extension_df = self.df[(self.df['Movimiento_ID'] == 14) & (self.df['Sujeto'] == sujeto_seleccionado)]
-        envolvente_extension = np.abs(signal.hilbert(extension_df['Señal Filtrada'].to_numpy()))
+        extension, tiempo_extension = self._vistas_sujeto(sujeto_seleccionado, 14, 'Señal Filtrada', 'Tiempo (s)')
+        envolvente_extension = np.abs(signal.hilbert(extension))
         envolvente_extension_suave = gaussian_filter1d(envolvente_extension, sigma=20)
 
         # Recortar a las primeras 4950 muestras
         envolvente_recortada = envolvente_extension_suave[:4950]
-        tiempo_recortado = extension_df['Tiempo (s)'].to_numpy()[:4950]
+        tiempo_recortado = tiempo_extension[:4950]
 
         axs[1, 0].plot(tiempo_recortado, envolvente_recortada, color='blue', label='Extensión')
         axs[1, 0].set_title('Amplitud de la señal', fontsize=10)
@@ -629,8 +1155,8 @@ class InterfazApp:
         Ts = 1 / Fs  # Periodo de muestreo
 
         # Gráfica 3: Espectro de Fourier para flexión
-        flexion_df = self.df[(self.df['Movimiento_ID'] == 13) & (self.df['Sujeto'] == sujeto_seleccionado)]
-        freqs_flex, espectro_flex_db = self.calcular_fft(flexion_df['Señal Filtrada'], Ts)
+        flexion, = self._vistas_sujeto(sujeto_seleccionado, 13, 'Señal Filtrada')
+        freqs_flex, espectro_flex_db = self.calcular_fft(flexion, Ts)
         axs[0, 1].plot(freqs_flex, espectro_flex_db, label="Flexión", color='r')
         axs[0, 1].set_title('Flexión: Espectro de Fourier ', fontsize=10)
         axs[0, 1].set_ylabel("Magnitud (dB/Hz)", fontsize=10)
@@ -638,8 +1164,8 @@ class InterfazApp:
         axs[0, 1].grid(True)
 
         # Gráfica 4: Espectro de Fourier para extensión
-        extension_df = self.df[(self.df['Movimiento_ID'] == 14) & (self.df['Sujeto'] == sujeto_seleccionado)]
-        freqs_ext, espectro_ext_db = self.calcular_fft(extension_df['Señal Filtrada'], Ts)
+        extension, = self._vistas_sujeto(sujeto_seleccionado, 14, 'Señal Filtrada')
+        freqs_ext, espectro_ext_db = self.calcular_fft(extension, Ts)
         axs[1, 1].plot(freqs_ext, espectro_ext_db, label="Extensión", color='b')
         axs[1, 1].set_title('Extensión: Espectro de Fourier ', fontsize=10)
         axs[1, 1].set_xlabel('Frecuencia (Hz)', fontsize=10)
@@ -648,7 +1174,9 @@ class InterfazApp:
         axs[1, 1].grid(True)
 
     def calcular_fft(self, senal, Ts):
-        senal_np = senal.to_numpy()
+        from scipy.fft import fft
+
+        senal_np = np.asarray(senal)
         N = len(senal_np)  # Longitud de la señal
         yf = fft(senal_np) 
         frecuencias = np.linspace(0.0, 1.0 / (2.0 * Ts), N // 2)  # Eje de frecuencias
@@ -657,184 +1185,14 @@ class InterfazApp:
     
     def prueba(self):
         if hasattr(self, 'df'):
-            # Funciones auxiliares internas
-            def limpiar_id_sujeto(sujeto_id):
-                """Limpia y normaliza el ID del sujeto"""
-                if isinstance(sujeto_id, str):
-                    import re
-                    match = re.search(r'\d+', str(sujeto_id))
-                    if match:
-                        return int(match.group())
-                    else:
-                        return sujeto_id
-                return sujeto_id
-
-            def suavizar_wavelet(signal, wavelet='db4', level=4):
-                """Aplica suavizado wavelet a la señal"""
-                coeffs = pywt.wavedec(signal, wavelet, level=level)
-                coeffs_suavizados = [coeffs[0]] + [np.zeros_like(c) for c in coeffs[1:]]
-                return pywt.waverec(coeffs_suavizados, wavelet)[:len(signal)]
-
-            def extraer_caracteristicas_avanzadas(senal, fs=1000, wavelet='db4'):
-                """Extrae características avanzadas para ML"""
-                
-                # 1. Características temporales
-                rms = np.sqrt(np.mean(np.square(senal)))
-                var = np.var(senal)
-                mean_abs = np.mean(np.abs(senal))
-                skewness = np.mean(((senal - np.mean(senal)) / np.std(senal)) ** 3)
-                kurtosis = np.mean(((senal - np.mean(senal)) / np.std(senal)) ** 4)
-                
-                # 2. Características de frecuencia (FFT)
-                fft_vals = np.fft.fft(senal)
-                freqs = np.fft.fftfreq(len(senal), 1/fs)
-                magnitudes = np.abs(fft_vals)
-                
-                # Potencia en bandas de frecuencia
-                banda_baja = np.sum(magnitudes[(freqs >= 20) & (freqs <= 80)])
-                banda_media = np.sum(magnitudes[(freqs >= 80) & (freqs <= 150)])
-                banda_alta = np.sum(magnitudes[(freqs >= 150) & (freqs <= 250)])
-                
-                freq_mediana = np.median(freqs[magnitudes > np.max(magnitudes)*0.1])
-                
-                # 3. Características wavelet
-                coeffs = pywt.wavedec(senal, wavelet, level=4)
-                energia_total = sum([np.sum(c**2) for c in coeffs])
-                
-                caracteristicas_wavelet = []
-                for i, c in enumerate(coeffs):
-                    energia_nivel = np.sum(c**2) / energia_total if energia_total > 0 else 0
-                    caracteristicas_wavelet.extend([
-                        energia_nivel,
-                        np.std(c),
-                        np.mean(np.abs(c))
-                    ])
-                
-                # 4. Características de la envolvente
-                envolvente = np.abs(hilbert(senal))
-                rms_envolvente = np.sqrt(np.mean(envolvente**2))
-                var_envolvente = np.var(envolvente)
-                
-                # Compilar todas las características
-                features = {
-                    # Temporales básicas
-                    #'rms': rms,
-                    #'varianza': var,
-                    #'mean_abs': mean_abs,
-                    'skewness': skewness,
-                    'kurtosis': kurtosis,
-                    #'banda_baja': banda_baja,
-                    #'banda_media': banda_media,
-                    #'banda_alta': banda_alta,
-                    #'freq_mediana': freq_mediana,
-                    #'rms_envolvente': rms_envolvente,
-                    #'var_envolvente': var_envolvente,
-                    # Entropía
-                    'entropia': entropy(np.histogram(senal, bins=50)[0])
-                }
-                
-                # Agregar características wavelet
-                for i, val in enumerate(caracteristicas_wavelet):
-                    features[f'wavelet_{i}'] = val
-                
-                return features
+            import matplotlib.pyplot as plt
+            from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+            from sklearn.metrics import accuracy_score
+            from sklearn.tree import plot_tree
 
-            def crear_dataset_ml(df):
-                """Crea dataset para machine learning usando todos los sujetos disponibles"""
-                caracteristicas_lista = []
-                
-                # Crear copia con IDs limpios
-                df_limpio = df.copy()
-                df_limpio['Sujeto_Limpio'] = df_limpio['Sujeto'].apply(limpiar_id_sujeto)
-                
-                # Procesar todos los sujetos disponibles para movimientos 13 y 14
-                for movimiento_id in [13, 14]:  # Flexión y Extensión
-                    df_mov = df_limpio[df_limpio['Movimiento_ID'] == movimiento_id]
-                    
-                    for sujeto in df_mov['Sujeto_Limpio'].unique():
-                        df_sujeto = df_mov[df_mov['Sujeto_Limpio'] == sujeto]
-                        if not df_sujeto.empty:
-                            senal = df_sujeto['Señal Filtrada'].values
-                            senal_suave = suavizar_wavelet(senal)
-                            
-                            features = extraer_caracteristicas_avanzadas(senal_suave)
-                            features.update({
-                                'Sujeto': sujeto,
-                                'Movimiento_ID': movimiento_id,
-                                'Clase': 'Flexion' if movimiento_id == 13 else 'Extension'
-                            })
-                            caracteristicas_lista.append(features)
-                
-                return pd.DataFrame(caracteristicas_lista)
-
-            def dividir_datos_manual(df_ml, sujetos_test=None, usar_automatico=True, test_size=0.2, random_state=42):
-                """
-                Divide los datos de forma manual o automática
-                
-                Parámetros:
-                - df_ml: DataFrame con las características
-                - sujetos_test: Lista de sujetos para test (si None, se usa división automática)
-                - usar_automatico: Si True, usa división automática; si False, usa sujetos_test
-                - test_size: Proporción para test en división automática
-                - random_state: Semilla para reproducibilidad
-                
-                Retorna:
-                - Tupla con (X_train, X_test, y_train, y_test, suj_train, suj_test)
-                """
-                
-                # Preparar características y etiquetas
-                feature_columns = [col for col in df_ml.columns 
-                                if col not in ['Sujeto', 'Movimiento_ID', 'Clase']]
-                
-                X = df_ml[feature_columns].values
-                y = df_ml['Clase'].values
-                sujetos = df_ml['Sujeto'].values
-                
-                if usar_automatico or sujetos_test is None:
-                    # División automática
-                    print("🔄 Usando división automática de datos...")
-                    X_train, X_test, y_train, y_test, suj_train, suj_test = train_test_split(
-                        X, y, sujetos, test_size=test_size, random_state=random_state, stratify=y
-                    )
-                else:
-                    # División manual
-                    print(f"✋ Usando división manual de datos...")
-                    print(f"Sujetos seleccionados para test: {sujetos_test}")
-                    
-                    # Validar que los sujetos existen
-                    sujetos_disponibles = set(df_ml['Sujeto'].unique())
-                    sujetos_test_set = set(sujetos_test)
-                    
-                    if not sujetos_test_set.issubset(sujetos_disponibles):
-                        sujetos_invalidos = sujetos_test_set - sujetos_disponibles
-                        raise ValueError(f"Los siguientes sujetos no están disponibles: {sujetos_invalidos}")
-                    
-                    # Crear máscaras para separar datos
-                    mask_test = df_ml['Sujeto'].isin(sujetos_test)
-                    mask_train = ~mask_test
-                    
-                    # Separar datos
-                    X_train = df_ml.loc[mask_train, feature_columns].values
-                    X_test = df_ml.loc[mask_test, feature_columns].values
-                    y_train = df_ml.loc[mask_train, 'Clase'].values
-                    y_test = df_ml.loc[mask_test, 'Clase'].values
-                    suj_train = df_ml.loc[mask_train, 'Sujeto'].values
-                    suj_test = df_ml.loc[mask_test, 'Sujeto'].values
-                    
-                    # Verificar distribución
-                    test_classes = pd.Series(y_test).value_counts()
-                    train_classes = pd.Series(y_train).value_counts()
-                    
-                    print(f"📊 Distribución en entrenamiento: {dict(train_classes)}")
-                    print(f"📊 Distribución en test: {dict(test_classes)}")
-                    
-                    if len(test_classes) < 2:
-                        print("⚠️  ADVERTENCIA: El conjunto de test no tiene ambas clases!")
-                
-                print(f"📈 Datos de entrenamiento: {len(X_train)} muestras")
-                print(f"🧪 Datos de prueba: {len(X_test)} muestras")
-                
-                return X_train, X_test, y_train, y_test, suj_train, suj_test, feature_columns
+            config_busqueda = self._elegir_modo_busqueda()
+            if config_busqueda is None:
+                return
 
             try:
                 # Crear una nueva ventana
@@ -866,14 +1224,18 @@ class InterfazApp:
 
                 print("🔬 Creando dataset con características avanzadas...")
                 # Crear dataset con características avanzadas
-                df_ml = crear_dataset_ml(self.df)
+                self.cache_caracteristicas.reiniciar_estadisticas()
+                with etapa('dataset_ml'):
+                    df_ml = crear_dataset_ml(self.df, self.indice, cache=self.cache_caracteristicas)
+                print(f"🗃️  Caché de características: {self.cache_caracteristicas.aciertos} aciertos,"
+                      f" {self.cache_caracteristicas.fallos} calculadas")
                 
                 print(f"📊 Dataset creado con {len(df_ml)} muestras y {len(df_ml.columns)-3} características")
                 print(f"🎯 Clases disponibles: {df_ml['Clase'].value_counts().to_dict()}")
                 print(f"👥 Sujetos disponibles: {sorted(df_ml['Sujeto'].unique())}")
 
                 # Dividir datos (puedes cambiar usar_automatico=False y especificar sujetos_test para división manual)
-                X_train, X_test, y_train, y_test, suj_train, suj_test, feature_columns = dividir_datos_manual(
+                X_train, X_test, y_train, y_test, suj_train, suj_test, feature_columns = dividir_datos(
                     df_ml, 
                     usar_automatico=True,  # Cambiar a False para división manual
                     # sujetos_test=[1, 2],  # Especificar sujetos para test si usar_automatico=False
@@ -881,34 +1243,20 @@ class InterfazApp:
                     random_state=42
                 )
 
-                # Normalizar características
-                print("🔧 Normalizando características...")
-                scaler = StandardScaler()
-                X_train_scaled = scaler.fit_transform(X_train)
+                # Normalizar características y buscar el mejor árbol (misma lógica que el pipeline sin interfaz)
+                print("🚀 Normalizando características y entrenando modelo...")
+                with etapa('entrenamiento'):
+                    scaler, grid_search = entrenar_arbol(
+                        X_train, y_train, almacen=self._almacen_busqueda(), config_busqueda=config_busqueda,
+                        grupos=suj_train
+                    )
+                X_train_scaled = scaler.transform(X_train)
                 X_test_scaled = scaler.transform(X_test)
-                
+
                 # Guardar el escalador para uso posterior
                 self.scaler = scaler
-
-                # Configurar y entrenar modelo con GridSearch
-                print("🚀 Entrenando modelo con GridSearch...")
-                param_grid = {
-                    'criterion': ['gini', 'entropy'],
-                    'max_depth': [3, 5, 7, 10, 15],
-                    'min_samples_split': [2, 3, 5, 7, 10],
-                    'min_samples_leaf': [1, 2, 3, 5, 7],
-                    'max_features': ['sqrt', 'log2', None]
-                }
-
-                grid_search = GridSearchCV(
-                    DecisionTreeClassifier(random_state=42), 
-                    param_grid, 
-                    cv=5,  # Reducido para mayor velocidad
-                    scoring=make_scorer(accuracy_score),
-                    n_jobs=1
-                )
-                
-                grid_search.fit(X_train_scaled, y_train)
+                print(f"🗃️  Puntos evaluados: {grid_search.evaluados} | reutilizados: {grid_search.reutilizados}")
+                print(f"🔎 Búsqueda {grid_search.modo}: {grid_search.ajustes} ajustes")
                 self.model = grid_search.best_estimator_
                 
                 # Guardar datos para uso posterior
@@ -916,6 +1264,7 @@ class InterfazApp:
                 self.X_test = X_test_scaled
                 self.y_train = y_train
                 self.y_test = y_test
+                self.suj_train = suj_train  # Pliegues por sujeto en la comparación de modelos
                 self.feature_columns = feature_columns
 
                 # Evaluar modelo
@@ -926,21 +1275,35 @@ class InterfazApp:
                 print(f"🎯 Mejor precisión en validación cruzada: {grid_search.best_score_:.3f}")
                 print(f"🎯 Precisión en test: {accuracy:.3f}")
                 print(f"⚙️  Mejores parámetros: {grid_search.best_params_}")
+                desfase = desfase_vivo(self.model, self.scaler, feature_columns, self.df, self.indice, suj_test)
+
+                # Guardar escalador + modelo para cargarlos al iniciar la aplicación
+                try:
+                    self.modelo_info = guardar_modelo(
+                        MODELO_PATH, self.model, self.scaler, feature_columns,
+                        huella=huella_dataset(self.df),
+                        metricas={'cv': float(grid_search.best_score_), 'test': float(accuracy),
+                                  'parametros': grid_search.best_params_, 'desfase_vivo': desfase}
+                    )
+                    print(f"💾 Modelo guardado en: {MODELO_PATH}")
+                except Exception as e:
+                    print(f"⚠️  No se pudo guardar el modelo: {e}")
 
                 # Graficar el árbol de decisión con tamaño dinámico
-                fig, ax = plt.subplots(figsize=(14, 8))
-                plot_tree(
-                    self.model, 
-                    feature_names=[f"F{i}" for i in range(len(feature_columns))],  # Nombres cortos
-                    filled=True, 
-                    class_names=['Extensión', 'Flexión'],
-                    max_depth=3,  # Limitar profundidad para mejor visualización
-                    fontsize=8
-                )
-                plt.title(f"Árbol de Decisión - Precisión: {accuracy:.3f}", fontsize=12, fontweight='bold')
-                
-                canvas = FigureCanvasTkAgg(fig, master=frame_grafico)
-                canvas.draw()
+                with etapa('graficos.arbol'):
+                    fig, ax = plt.subplots(figsize=(14, 8))
+                    plot_tree(
+                        self.model, 
+                        feature_names=[f"F{i}" for i in range(len(feature_columns))],  # Nombres cortos
+                        filled=True, 
+                        class_names=['Extensión', 'Flexión'],
+                        max_depth=3,  # Limitar profundidad para mejor visualización
+                        fontsize=8
+                    )
+                    plt.title(f"Árbol de Decisión - Precisión: {accuracy:.3f}", fontsize=12, fontweight='bold')
+
+                    canvas = FigureCanvasTkAgg(fig, master=frame_grafico)
+                    canvas.draw()
                 canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
 
                 # Mostrar datos de test en un cuadro de texto
@@ -954,6 +1317,8 @@ class InterfazApp:
                 text_test.configure(yscrollcommand=scrollbar_test_vertical.set, xscrollcommand=scrollbar_test_horizontal.set)
                 
                 # Crear DataFrame para mostrar
+                import pandas as pd
+
                 df_test_display = pd.DataFrame(X_test_scaled, columns=[f"F{i}" for i in range(len(feature_columns))])
                 df_test_display["Clase_Real"] = y_test
                 df_test_display["Clase_Pred"] = y_pred
@@ -989,7 +1354,10 @@ class InterfazApp:
                     f"Precisión en test: {accuracy:.3f}\n"
                     f"Características utilizadas: {len(feature_columns)}\n"
                     f"Muestras de entrenamiento: {len(X_train)}\n"
-                    f"Muestras de test: {len(X_test)}\n\n"
+                    f"Muestras de test: {len(X_test)}\n"
+                    f"Búsqueda: {MODOS_BUSQUEDA[grid_search.modo]} ({grid_search.ajustes} ajustes)\n"
+                    f"Caché de características: {self.cache_caracteristicas.aciertos} aciertos,"
+                    f" {self.cache_caracteristicas.fallos} calculadas\n\n"
                     f"Mejores parámetros:\n{grid_search.best_params_}"
                 )
                 
@@ -1005,77 +1373,82 @@ class InterfazApp:
     
     def resultados(self):
         if hasattr(self, 'df') and hasattr(self, 'model') and hasattr(self, 'X_test') and hasattr(self, 'y_test'):
+            import matplotlib.pyplot as plt
+            from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+            import seaborn as sns
+            from sklearn.metrics import (
+                classification_report,
+                confusion_matrix,
+                accuracy_score,
+                precision_score,
+                recall_score,
+                f1_score
+            )
             
             # ==================== FUNCIÓN INTERNA: EVALUAR MÚLTIPLES MODELOS ====================
-            def evaluar_modelos_internos():
-                """Evalúa múltiples modelos de ML con búsqueda de hiperparámetros"""
-                from sklearn.tree import DecisionTreeClassifier
-                from sklearn.svm import SVC
-                from sklearn.neural_network import MLPClassifier
-                from sklearn.model_selection import GridSearchCV
+            def evaluar_modelos_internos(config_busqueda):
+                """Evalúa múltiples modelos de ML con búsqueda de hiperparámetros
+
+                Las búsquedas corren a la vez en un pool de procesos; esta ventana solo
+                muestra su avance. Devuelve None si el usuario cancela.
+                """
                 from sklearn.metrics import accuracy_score
 
-                modelos = {
-                    'Decision Tree': {
-                        'modelo': DecisionTreeClassifier(random_state=42),
-                        'param_grid': {
-                            'criterion': ['gini'],
-                            'max_depth': [3, 5, 7, 10, 12, 15, 20],
-                            'min_samples_split': [2, 5, 10],
-                            'min_samples_leaf': [1, 2, 4],
-                            'max_features': ['sqrt', 'log2'],
-                            'class_weight': [None, 'balanced'],
-                            'splitter': ['best']  
-                        }
-                    },
-                    'SVM': {
-                        'modelo': SVC(random_state=42),
-                        'param_grid': {
-                            'C': [0.1, 1, 10],
-                            'kernel': ['linear', 'rbf', 'poly'],
-                            'gamma': ['scale', 'auto']
-                        }
-                    },
-                    'Neural Network': {
-                        'modelo': MLPClassifier(max_iter=1000, random_state=42),
-                        'param_grid': {
-                            'hidden_layer_sizes': [(50,), (100,), (100, 50)],
-                            'activation': ['relu', 'tanh'],
-                            'solver': ['adam', 'sgd'],
-                            'alpha': [0.0001, 0.001, 0.01]
-                        }
-                    }
-                }
+                modelos = modelos_comparacion(early_stopping_mlp=config_busqueda['early_stopping_mlp'])
+                comparacion = ComparacionEnSegundoPlano(
+                    modelos, self.X_train, self.y_train, cv=5, ruta_almacen=BUSQUEDAS_PATH,
+                    procesos=config_busqueda['procesos'], n_jobs=config_busqueda['n_jobs'],
+                    opciones=opciones_busqueda(config_busqueda), grupos=getattr(self, 'suj_train', None)
+                )
 
-                resultados = {}
-                
                 # Crear ventana de progreso
                 ventana_progreso = tk.Toplevel(self.root)
                 ventana_progreso.title("Evaluando Modelos...")
-                ventana_progreso.geometry("400x200")
+                ventana_progreso.geometry("450x260")
                 ventana_progreso.configure(bg="#e6e6e6")
                 
-                label_progreso = tk.Label(ventana_progreso, text="Iniciando evaluación...", 
+                label_progreso = tk.Label(ventana_progreso, 
+                                        text=f"{comparacion.procesos} búsquedas simultáneas, n_jobs={comparacion.n_jobs} por búsqueda", 
                                         font=("Arial", 10), bg="#e6e6e6")
-                label_progreso.pack(pady=20)
-                
-                progress_bar = ttk.Progressbar(ventana_progreso, length=300, mode='determinate')
-                progress_bar.pack(pady=10)
-                progress_bar['maximum'] = len(modelos)
+                label_progreso.pack(pady=10)
+
+                # Una barra por estimador (combinaciones evaluadas / total)
+                barras = {}
+                for nombre in modelos:
+                    tk.Label(ventana_progreso, text=nombre, font=("Arial", 9), bg="#e6e6e6").pack()
+                    barra = ttk.Progressbar(ventana_progreso, length=300, mode='determinate')
+                    barra.pack(pady=(0, 5))
+                    barras[nombre] = barra
+
+                def cancelar():
+                    label_progreso.config(text="Cancelando...")
+                    comparacion.cancelar()
+
+                tk.Button(ventana_progreso, text="Cancelar", command=cancelar, bg="#c0392b", fg="white").pack(pady=5)
+                ventana_progreso.protocol("WM_DELETE_WINDOW", cancelar)
+
+                def sondear():
+                    for nombre, (hechos, total) in comparacion.progreso().items():
+                        barras[nombre]['maximum'] = max(total, 1)
+                        barras[nombre]['value'] = hechos
+                    if comparacion.terminada():
+                        ventana_progreso.destroy()
+                    else:
+                        ventana_progreso.after(100, sondear)
 
-                for i, (nombre, config) in enumerate(modelos.items()):
-                    label_progreso.config(text=f"Evaluando {nombre}...")
-                    ventana_progreso.update()
-                    
-                    grid = GridSearchCV(
-                        estimator=config['modelo'],
-                        param_grid=config['param_grid'],
-                        cv=5,
-                        scoring=make_scorer(accuracy_score),
-                        n_jobs=1
-                    )
-                    grid.fit(self.X_train, self.y_train)
+                # wait_window mantiene activo el bucle de eventos de Tk mientras se busca
+                comparacion.iniciar()
+                try:
+                    ventana_progreso.after(100, sondear)
+                    self.root.wait_window(ventana_progreso)
+                    if comparacion.cancelada:
+                        return None
+                    busquedas = comparacion.resultados()
+                finally:
+                    comparacion.cerrar()
 
+                resultados = {}
+                for nombre, grid in busquedas.items():
                     mejor_modelo = grid.best_estimator_
                     y_pred = mejor_modelo.predict(self.X_test)
                     accuracy = accuracy_score(self.y_test, y_pred)
@@ -1088,13 +1461,10 @@ class InterfazApp:
                         'cv_mean': grid.best_score_,
                         'cv_std': cv_std[grid.best_index_],
                         'y_pred': y_pred,
-                        'mejores_params': grid.best_params_
+                        'mejores_params': grid.best_params_,
+                        'modo': grid.modo,
+                        'ajustes': grid.ajustes
                     }
-                    
-                    progress_bar['value'] = i + 1
-                    ventana_progreso.update()
-
-                ventana_progreso.destroy()
 
                 # Seleccionar el mejor modelo
                 mejor_modelo = max(
@@ -1146,9 +1516,26 @@ class InterfazApp:
             mejor_modelo_nombre = None
             
             if evaluar_multiples:
-                # Evaluar múltiples modelos
-                messagebox.showinfo("Información", "Se evaluarán múltiples modelos. Esto puede tomar unos minutos...")
-                resultados_modelos, mejor_modelo_nombre = evaluar_modelos_internos()
+                config_busqueda = self._elegir_modo_busqueda()
+                if config_busqueda is None:
+                    return
+                # Reabrir los resultados con los mismos datos y el mismo modo no vuelve a evaluar nada
+                suj_train = getattr(self, 'suj_train', None)
+                clave_comparacion = (huella_matriz(self.X_train, self.y_train), huella_matriz(self.X_test, self.y_test),
+                                     None if suj_train is None else tuple(map(str, suj_train)),
+                                     tuple(sorted(config_busqueda.items())))
+                comparacion = getattr(self, '_comparacion_modelos', None)
+                if comparacion is not None and comparacion[0] == clave_comparacion:
+                    resultados_modelos, mejor_modelo_nombre = comparacion[1]
+                else:
+                    # Evaluar múltiples modelos
+                    with etapa('comparacion'):
+                        evaluacion = evaluar_modelos_internos(config_busqueda)
+                    if evaluacion is None:
+                        messagebox.showinfo("Información", "Evaluación de modelos cancelada.")
+                        return
+                    resultados_modelos, mejor_modelo_nombre = evaluacion
+                    self._comparacion_modelos = (clave_comparacion, evaluacion)
             else:
                 messagebox.showwarning("Advertencia", "No se encontraron datos de entrenamiento. Solo se mostrará el modelo actual.")
                 return
@@ -1193,6 +1580,7 @@ class InterfazApp:
                 text_comparacion.insert(tk.END, f"Precisión en Test: {resultado['accuracy']:.4f}\n")
                 text_comparacion.insert(tk.END, f"Validación Cruzada: {resultado['cv_mean']:.4f} ± {resultado['cv_std']:.4f}\n")
                 text_comparacion.insert(tk.END, f"Mejores Parámetros: {resultado['mejores_params']}\n")
+                text_comparacion.insert(tk.END, f"Búsqueda: {MODOS_BUSQUEDA[resultado['modo']]} ({resultado['ajustes']} ajustes)\n")
                 
                 # Agregar reporte de clasificación para cada modelo
                 text_comparacion.insert(tk.END, "\nReporte de Clasificación:\n")
@@ -1243,7 +1631,8 @@ class InterfazApp:
             
             plt.tight_layout()
             canvas_comp = FigureCanvasTkAgg(fig_comp, master=frame_graf_comp)
-            canvas_comp.draw()
+            with etapa('graficos.comparacion'):
+                canvas_comp.draw()
             canvas_comp.get_tk_widget().pack(fill=tk.BOTH, expand=True)
 
             # ==================== PESTAÑA 2: PREDICCIONES ====================
@@ -1369,7 +1758,8 @@ class InterfazApp:
                         ha='center', va='bottom', fontsize=12, color='black')
 
                 canvas_pred_fig = FigureCanvasTkAgg(fig_pred, master=frame_grafico_principal)
-                canvas_pred_fig.draw()
+                with etapa('graficos.predicciones'):
+                    canvas_pred_fig.draw()
                 canvas_pred_fig.get_tk_widget().pack(fill=tk.BOTH, expand=True)
 
 
@@ -1420,7 +1810,8 @@ class InterfazApp:
                 ax_matriz.set_ylabel('Valores Reales', fontsize=12)
 
                 canvas_matriz = FigureCanvasTkAgg(fig_matriz, master=frame_matriz)
-                canvas_matriz.draw()
+                with etapa('graficos.matriz_confusion'):
+                    canvas_matriz.draw()
                 canvas_matriz.get_tk_widget().pack(fill=tk.BOTH, expand=True)
 
             except Exception as e:
@@ -1443,13 +1834,91 @@ class InterfazApp:
                         font=("Arial", 11), 
                         bg="#f0f0f0").pack()
 
+            # ==================== PESTAÑA 3: RENDIMIENTO ====================
+            self._pestana_rendimiento(notebook)
 
         else:
             messagebox.showwarning("Advertencia", "Primero carga un archivo y ejecuta la prueba.")
 
+    def _pestana_rendimiento(self, notebook):
+        """Pestaña con el tiempo y la memoria de cada etapa medida en esta sesión"""
+        frame_rendimiento = ttk.Frame(notebook)
+        notebook.add(frame_rendimiento, text="Rendimiento")
+        self._panel_rendimiento(frame_rendimiento)
+
+    def mostrar_rendimiento(self):
+        """Ventana de rendimiento disponible en cualquier momento, sin entrenar antes"""
+        ventana_rendimiento = tk.Toplevel(self.root)
+        ventana_rendimiento.title("Rendimiento por etapa")
+        ventana_rendimiento.geometry("1000x500")
+        self._panel_rendimiento(ventana_rendimiento)
+
+    def _panel_rendimiento(self, frame_rendimiento):
+        """Tabla de REGISTRO.resumen() con exportación a JSON/CSV dentro de un contenedor"""
+        tk.Label(frame_rendimiento, text="Tiempo y memoria por etapa:",
+                 font=("Arial", 12, "bold")).pack(pady=(10, 5))
+
+        encabezados = {
+            'etapa': ("Etapa", 320, 'w'),
+            'llamadas': ("Llamadas", 90, 'e'),
+            'pared': ("Pared total (s)", 130, 'e'),
+            'cpu': ("CPU total (s)", 130, 'e'),
+            'maximo': ("Pared máx. (s)", 130, 'e'),
+            'pico': ("Pico memoria (MB)", 150, 'e'),
+        }
+        frame_tabla = tk.Frame(frame_rendimiento)
+        frame_tabla.pack(fill=tk.BOTH, expand=True, padx=10)
+        tabla = ttk.Treeview(frame_tabla, columns=list(encabezados), show='headings')
+        for columna, (texto, ancho, alineacion) in encabezados.items():
+            tabla.heading(columna, text=texto)
+            tabla.column(columna, width=ancho, anchor=alineacion)
+        tabla.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        scrollbar_tabla = ttk.Scrollbar(frame_tabla, orient="vertical", command=tabla.yview)
+        scrollbar_tabla.pack(side=tk.RIGHT, fill="y")
+        tabla.configure(yscrollcommand=scrollbar_tabla.set)
+
+        def actualizar():
+            tabla.delete(*tabla.get_children())
+            for fila in REGISTRO.resumen():
+                tabla.insert('', tk.END, values=(
+                    fila['etapa'], fila['llamadas'], f"{fila['pared_s']:.3f}", f"{fila['cpu_s']:.3f}",
+                    f"{fila['pared_max_s']:.3f}", f"{fila['pico_mb']:.2f}" if fila['pico_mb'] else "—"
+                ))
+
+        def exportar():
+            archivo = filedialog.asksaveasfilename(
+                defaultextension=".json",
+                filetypes=[("JSON", "*.json"), ("CSV", "*.csv")]
+            )
+            if not archivo:
+                return
+            try:
+                if archivo.lower().endswith(".csv"):
+                    REGISTRO.exportar_csv(archivo)
+                else:
+                    REGISTRO.exportar_json(archivo)
+                messagebox.showinfo("Éxito", f"Rendimiento exportado a {archivo}")
+            except Exception as e:
+                messagebox.showerror("Error", f"Error al exportar: {str(e)}")
+
+        def reiniciar():
+            REGISTRO.reiniciar()
+            actualizar()
+
+        frame_botones = tk.Frame(frame_rendimiento)
+        frame_botones.pack(pady=10)
+        var_memoria = tk.BooleanVar(value=INSTRUMENTACION['memoria'])
+        tk.Checkbutton(frame_botones, text="Medir memoria (tracemalloc, más lento)", variable=var_memoria,
+                       command=lambda: INSTRUMENTACION.update(memoria=var_memoria.get())).pack(side=tk.LEFT, padx=5)
+        tk.Button(frame_botones, text="Actualizar", command=actualizar).pack(side=tk.LEFT, padx=5)
+        tk.Button(frame_botones, text="Exportar JSON/CSV", command=exportar, bg="#3498db", fg="white").pack(side=tk.LEFT, padx=5)
+        tk.Button(frame_botones, text="Reiniciar", command=reiniciar).pack(side=tk.LEFT, padx=5)
+        actualizar()
+
 
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()  # Necesario para los procesos del preprocesamiento en ejecutables de Windows
     root = tk.Tk()
     app = InterfazApp(root)
     root.mainloop()
@@ -0,0 +1,928 @@
+# ====================
+# BIBLIOTECAS ESTÁNDAR
+# ====================
+import hashlib
+import json
+import math
+import os
+import sqlite3
+import time
+from collections import deque
+from datetime import datetime
+
+# ====================
+# MANEJO DE DATOS
+# ====================
+import numpy as np
+
+# ====================
+# PROCESAMIENTO Y CARACTERÍSTICAS
+# ====================
+from procesamiento import FiltroStreaming, NOTCH_STREAMING, PARAMETROS_FILTRO, filtrar_causal, preprocesar_lote
+from caracteristicas import (
+    SEGMENTACION, GRAFO, MOVIMIENTOS_ML, caracteristicas_lote, configuracion_caracteristicas, limpiar_id_sujeto,
+    segmentar, vector_caracteristicas
+)
+
+# ====================
+# INSTRUMENTACIÓN
+# ====================
+from instrumentacion import INSTRUMENTACION, REGISTRO, etapa
+
+
+# Parámetros de la clasificación en vivo (en muestras a la frecuencia de PARAMETROS_FILTRO)
+PARAMETROS_VIVO = {
+    'ventana': SEGMENTACION['longitud'] or 1000,  # Muestras por decisión: la ventana del entrenamiento
+    'salto': 100,  # Una decisión cada 100 muestras (0.2 s a 500 Hz)
+    'presupuesto_ms': 50.0,  # Latencia máxima de la muestra a la decisión
+    'tolerancia_fs': 0.05,  # Desvío relativo de la tasa medida que obliga a rediseñar el filtro
+}
+
+
+class ClasificadorEnVivo:
+    """Clasificación flexión/extensión sobre una ventana deslizante del flujo serie
+
+    Las muestras crudas pasan por el filtro causal, se acumulan en una ventana y
+    cada `salto` muestras se calculan las características de las columnas del
+    modelo, se normalizan con el escalador guardado y se predice la clase.
+    Si en un bloque se completan varios saltos solo se decide el más reciente,
+    así la latencia no crece cuando el sondeo se retrasa.
+
+    El filtro causal no es idéntico al del entrenamiento (pasabanda de fase cero y
+    notch en los picos detectados en cada registro): usa los mismos parámetros
+    (parametros_filtro del artefacto) pero notch fijos en la red eléctrica y
+    tiene desfase. medir_desfase_vivo() cuantifica la diferencia en las predicciones.
+    """
+
+    def __init__(self, modelo, scaler, columnas, ventana=1000, salto=100, presupuesto_ms=50.0,
+                 filtro=None, historial=200, parametros_filtro=None, tolerancia_fs=0.05):
+        if ventana <= 0 or salto <= 0:
+            raise ValueError("La ventana y el salto deben ser mayores que cero.")
+        self.modelo = modelo
+        self.scaler = scaler
+        self.columnas = list(columnas)
+        self.ventana = ventana
+        self.salto = salto
+        self.presupuesto_ms = presupuesto_ms
+        self.parametros_filtro = dict(parametros_filtro or PARAMETROS_FILTRO)
+        self.tolerancia_fs = tolerancia_fs
+        self.fs_medida = None
+        self.filtro = filtro if filtro is not None else FiltroStreaming(self.parametros_filtro)
+        self.latencias_ms = deque(maxlen=historial)
+        self.reiniciar()
+
+    def ajustar_frecuencia(self, fs_medida):
+        """Rediseña el filtro para la tasa real del dispositivo si se aleja de la nominal
+
+        Las frecuencias de corte y de los notch están en Hz: con otra tasa de
+        muestreo el filtro diseñado para la nominal las desplaza. Con una tasa
+        baja el corte superior y los notch se limitan a 0.9 veces Nyquist; si la
+        banda no cabe se conserva el filtro actual. Devuelve True si hubo
+        rediseño (la ventana acumulada se descarta).
+        """
+        self.fs_medida = fs_medida
+        fs = self.parametros_filtro['fs']
+        if fs_medida <= 0 or abs(fs_medida - fs) <= self.tolerancia_fs * fs:
+            return False
+        parametros = dict(self.parametros_filtro, fs=round(fs_medida))
+        limite = 0.45 * parametros['fs']
+        parametros['high_cutoff'] = min(parametros['high_cutoff'], limite)
+        if parametros['low_cutoff'] >= parametros['high_cutoff']:
+            return False
+        self.parametros_filtro = parametros
+        self.filtro = FiltroStreaming(parametros, tuple(f for f in NOTCH_STREAMING if f < limite))
+        self.reiniciar()
+        return True
+
+    def reiniciar(self):
+        """Descarta la ventana y las estadísticas para una captura nueva"""
+        self.filtro.reiniciar()
+        self._senal = np.empty(0)
+        self._pendientes = 0
+        self._t_primera = None
+        self.clase = None
+        self.decisiones = 0
+        self.omitidas = 0
+        self.excedidos = 0
+        self.latencia_maxima_ms = 0.0
+        self.latencias_ms.clear()
+
+    def agregar(self, valores, tiempos_ns):
+        """Agrega muestras nuevas; devuelve la clase si en este bloque hubo decisión, si no None"""
+        if len(valores) == 0:
+            return None
+        filtradas = self.filtro.procesar(valores)
+        # Solo se conservan las muestras que pueden formar parte de la próxima ventana
+        self._senal = np.concatenate((self._senal, filtradas))[-(self.ventana + self.salto):]
+
+        self._pendientes += len(filtradas)
+        saltos = self._pendientes // self.salto
+        if saltos == 0:
+            return None
+        self._pendientes %= self.salto
+        if len(self._senal) < self.ventana + self._pendientes:
+            return None
+        self.omitidas += saltos - 1
+
+        # La ventana termina en la última muestra que completó un salto
+        fin = len(self._senal) - self._pendientes
+        ventana = self._senal[fin - self.ventana:fin]
+        X = vector_caracteristicas(ventana, self.columnas)[None, :]
+        self.clase = self.modelo.predict(self.scaler.transform(X))[0]
+
+        ahora = time.perf_counter_ns()
+        latencia = (ahora - int(tiempos_ns[len(tiempos_ns) - 1 - self._pendientes])) / 1e6
+        self.latencias_ms.append(latencia)
+        self.latencia_maxima_ms = max(self.latencia_maxima_ms, latencia)
+        self.excedidos += latencia > self.presupuesto_ms
+        self.decisiones += 1
+        if self._t_primera is None:
+            self._t_primera = ahora
+        return self.clase
+
+    @property
+    def latencia_media_ms(self):
+        return float(np.mean(self.latencias_ms)) if self.latencias_ms else 0.0
+
+    @property
+    def decisiones_por_segundo(self):
+        """Decisiones emitidas por segundo desde la primera"""
+        if self._t_primera is None or self.decisiones < 2:
+            return 0.0
+        return (self.decisiones - 1) / max((time.perf_counter_ns() - self._t_primera) / 1e9, 1e-9)
+
+
+def medir_desfase_vivo(modelo, scaler, columnas, df, indice, sujetos=None, parametros_filtro=PARAMETROS_FILTRO,
+                       longitud=SEGMENTACION['longitud'], solapamiento=SEGMENTACION['solapamiento']):
+    """Diferencia entre el filtrado del entrenamiento y el causal de la clasificación en vivo
+
+    Filtra los registros crudos ('Valor lectura') de los sujetos indicados (IDs
+    limpios; None = todos) de las dos formas, corta las mismas ventanas y
+    compara: 'acuerdo' es la fracción de ventanas con la misma predicción,
+    'exactitud_entrenamiento' y 'exactitud_vivo' la exactitud de cada cadena y
+    'desvio_caracteristicas' la mediana de |diferencia| en desviaciones del
+    escalador, por columna.
+    """
+    crudo = df['Valor lectura'].to_numpy(dtype=np.float64)
+    sujetos = None if sujetos is None else {str(s) for s in sujetos}
+    registros = []
+    for movimiento_id, clase in MOVIMIENTOS_ML.items():
+        for sujeto, rebanada in indice.registros_de_movimiento(movimiento_id):
+            senal = crudo[rebanada]
+            if sujetos is not None and str(limpiar_id_sujeto(sujeto)) not in sujetos:
+                continue
+            if len(senal) >= (longitud or 0) and not np.isnan(senal).any():
+                registros.append((senal, clase))
+    if not registros:
+        raise ValueError("No hay registros crudos para medir el desfase de la clasificación en vivo.")
+
+    entrenamiento = preprocesar_lote([senal for senal, _ in registros], parametros_filtro)
+    X_entrenamiento, X_vivo, y = [], [], []
+    for (senal, clase), fuera_de_linea in zip(registros, entrenamiento):
+        causal = filtrar_causal(senal, parametros_filtro)
+        for filtrada, destino in ((fuera_de_linea, X_entrenamiento), (causal, X_vivo)):
+            ventanas = filtrada[None, :] if longitud is None else segmentar(filtrada, longitud, solapamiento)
+            destino.append(caracteristicas_lote(ventanas, columnas))
+        y.extend([clase] * len(X_vivo[-1]))
+    X_entrenamiento = scaler.transform(np.vstack(X_entrenamiento))
+    X_vivo = scaler.transform(np.vstack(X_vivo))
+    y = np.array(y)
+
+    pred_entrenamiento = modelo.predict(X_entrenamiento)
+    pred_vivo = modelo.predict(X_vivo)
+    return {
+        'ventanas': int(len(y)),
+        'acuerdo': float(np.mean(pred_entrenamiento == pred_vivo)),
+        'exactitud_entrenamiento': float(np.mean(pred_entrenamiento == y)),
+        'exactitud_vivo': float(np.mean(pred_vivo == y)),
+        'desvio_caracteristicas': dict(zip(columnas, np.median(np.abs(X_vivo - X_entrenamiento), axis=0).tolist())),
+    }
+
+
+# ====================
+# ARTEFACTO DEL MODELO
+# ====================
+VERSION_ARTEFACTO = 1
+
+
+def huella_dataset(df, columna='Señal Filtrada'):
+    """Hash corto del contenido del dataset (señal filtrada y etiquetas de registro)"""
+    h = hashlib.blake2b(digest_size=16)
+    for nombre in ('Sujeto', 'Movimiento_ID'):
+        h.update(df[nombre].astype(str).str.cat(sep='\x1f').encode('utf-8'))
+    h.update(np.ascontiguousarray(df[columna].to_numpy(dtype=np.float64)).tobytes())
+    return h.hexdigest()
+
+
+def guardar_modelo(ruta, modelo, scaler, columnas, huella=None, segmentacion=SEGMENTACION,
+                   parametros_filtro=PARAMETROS_FILTRO, metricas=None):
+    """Guarda escalador, modelo y configuración en un único artefacto versionado"""
+    import joblib
+    import sklearn
+
+    artefacto = {
+        'version': VERSION_ARTEFACTO,
+        'creado': datetime.now().isoformat(timespec='seconds'),
+        'sklearn': sklearn.__version__,
+        'modelo': modelo,
+        'scaler': scaler,
+        'columnas': list(columnas),
+        'parametros_filtro': dict(parametros_filtro),
+        'caracteristicas': configuracion_caracteristicas(columnas, segmentacion['longitud'],
+                                                         segmentacion['solapamiento']),
+        'huella_dataset': huella,
+        'metricas': metricas or {},
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(ruta)), exist_ok=True)
+    temporal = ruta + '.tmp'
+    joblib.dump(artefacto, temporal)
+    os.replace(temporal, ruta)
+    return artefacto
+
+
+def cargar_modelo(ruta, parametros_filtro=PARAMETROS_FILTRO, segmentacion=SEGMENTACION):
+    """Carga un artefacto guardado con guardar_modelo y verifica que sea compatible
+
+    El filtro y la segmentación guardados deben coincidir con los actuales: con
+    otros parámetros las características de los datos nuevos no son las que vio
+    el modelo y sus predicciones no valen.
+    """
+    import joblib
+
+    artefacto = joblib.load(ruta)
+    if not isinstance(artefacto, dict) or artefacto.get('version') != VERSION_ARTEFACTO:
+        raise ValueError(f"Versión de modelo no compatible: {ruta}")
+
+    diferencias = {clave: (valor, parametros_filtro.get(clave))
+                   for clave, valor in artefacto['parametros_filtro'].items()
+                   if parametros_filtro.get(clave) != valor}
+    if diferencias:
+        detalle = ", ".join(f"{clave}: {guardado} → {actual}" for clave, (guardado, actual) in diferencias.items())
+        raise ValueError(f"El modelo se entrenó con otros parámetros de filtro ({detalle}); vuelva a entrenarlo.")
+
+    # La configuración de características debe coincidir con la del código actual
+    guardada = artefacto['caracteristicas']
+    if (guardada['longitud'], guardada['solapamiento']) != (segmentacion['longitud'], segmentacion['solapamiento']):
+        raise ValueError(
+            f"El modelo se entrenó con ventanas de {guardada['longitud']} muestras y solapamiento"
+            f" {guardada['solapamiento']}, no {segmentacion['longitud']} y {segmentacion['solapamiento']};"
+            " vuelva a entrenarlo."
+        )
+    actual = configuracion_caracteristicas(artefacto['columnas'], guardada['longitud'], guardada['solapamiento'])
+    if guardada != actual:
+        raise ValueError("El modelo se entrenó con otra configuración de características; vuelva a entrenarlo.")
+    faltantes = [c for c in artefacto['columnas'] if c not in GRAFO.disponibles]
+    if faltantes:
+        raise ValueError(f"El modelo usa características no disponibles: {faltantes}")
+    return artefacto
+
+
+# ====================
+# BÚSQUEDA DE HIPERPARÁMETROS MEMOIZADA
+# ====================
+def huella_matriz(X, y):
+    """Hash del conjunto de entrenamiento exacto (características y etiquetas)"""
+    h = hashlib.blake2b(digest_size=16)
+    X = np.ascontiguousarray(X, dtype=np.float64)
+    h.update(str(X.shape).encode('ascii'))
+    h.update(X.tobytes())
+    h.update('\x1f'.join(map(str, y)).encode('utf-8'))
+    return h.hexdigest()
+
+
+def _clave_punto(parametros):
+    return json.dumps(parametros, sort_keys=True, default=repr)
+
+
+def divisor_cv(cv, y, grupos=None):
+    """Divisor de validación cruzada para clasificación
+
+    Con grupos (el sujeto de cada ventana) se usa StratifiedGroupKFold: las
+    ventanas solapadas de un mismo sujeto nunca quedan a la vez en entrenamiento
+    y validación. Si hay menos sujetos que pliegues se usa un pliegue por sujeto.
+    """
+    from sklearn.model_selection import StratifiedGroupKFold, check_cv
+
+    if grupos is None or not isinstance(cv, int):
+        return check_cv(cv, y, classifier=True)
+    n_grupos = len(np.unique(grupos))
+    if n_grupos < 2:
+        raise ValueError("La validación cruzada por sujeto necesita al menos dos sujetos en entrenamiento.")
+    return StratifiedGroupKFold(n_splits=min(cv, n_grupos))
+
+
+def _clave_cv(divisor, grupos=None):
+    """Clave del divisor en el almacén; con grupos incluye la asignación de sujetos"""
+    if grupos is None:
+        return repr(divisor)
+    h = hashlib.blake2b(digest_size=16)
+    h.update('\x1f'.join(map(str, grupos)).encode('utf-8'))
+    return f"{divisor!r}|grupos={h.hexdigest()}"
+
+
+class AlmacenBusqueda:
+    """Puntajes por pliegue de cada punto evaluado, persistidos en SQLite
+
+    La clave es (huella del dataset, estimador base, punto de parámetros,
+    divisor de validación cruzada y sus grupos), así que ampliar una grilla solo evalúa
+    los puntos nuevos y repetir una búsqueda no entrena nada.
+    """
+
+    def __init__(self, ruta):
+        os.makedirs(os.path.dirname(os.path.abspath(ruta)), exist_ok=True)
+        self.ruta = ruta
+        self._conexion = sqlite3.connect(ruta, timeout=30)  # Varios procesos pueden escribir a la vez
+        self._conexion.execute(
+            "CREATE TABLE IF NOT EXISTS puntajes ("
+            " huella TEXT, estimador TEXT, punto TEXT, cv TEXT, puntajes TEXT,"
+            " PRIMARY KEY (huella, estimador, punto, cv))"
+        )
+        self._conexion.commit()
+
+    def obtener(self, huella, estimador, punto, cv):
+        fila = self._conexion.execute(
+            "SELECT puntajes FROM puntajes WHERE huella=? AND estimador=? AND punto=? AND cv=?",
+            (huella, estimador, punto, cv)
+        ).fetchone()
+        return None if fila is None else json.loads(fila[0])
+
+    def guardar(self, huella, estimador, punto, cv, puntajes):
+        self._conexion.execute(
+            "INSERT OR REPLACE INTO puntajes VALUES (?, ?, ?, ?, ?)",
+            (huella, estimador, punto, cv, json.dumps([None if np.isnan(p) else p for p in puntajes]))
+        )
+        self._conexion.commit()
+
+    def cerrar(self):
+        self._conexion.close()
+
+
+class ResultadoBusqueda:
+    """Mismos atributos que usa la aplicación de un GridSearchCV ajustado"""
+
+    def __init__(self, best_estimator_, best_index_, cv_results_, evaluados, reutilizados,
+                 modo='exhaustiva', ajustes=None):
+        self.best_estimator_ = best_estimator_
+        self.best_index_ = best_index_
+        self.cv_results_ = cv_results_
+        self.best_params_ = cv_results_['params'][best_index_]
+        self.best_score_ = cv_results_['mean_test_score'][best_index_]
+        self.evaluados = evaluados  # Puntos entrenados en esta búsqueda
+        self.reutilizados = reutilizados  # Puntos leídos del almacén
+        self.modo = modo  # Estrategia de búsqueda usada
+        self.rendimiento = None  # Resumen de etapas cuando la búsqueda corre en otro proceso
+        self.ajustes = ajustes  # Entrenamientos realizados (pliegues + reajuste final)
+
+
+def _evaluar_punto(estimador, parametros, X, y, divisiones):
+    """Exactitud de cada pliegue; NaN si el ajuste falla (como error_score de GridSearchCV)"""
+    from sklearn.base import clone
+    from sklearn.metrics import accuracy_score
+
+    puntajes = []
+    for entrenamiento, prueba in divisiones:
+        try:
+            modelo = clone(estimador).set_params(**parametros).fit(X[entrenamiento], y[entrenamiento])
+            puntajes.append(float(accuracy_score(y[prueba], modelo.predict(X[prueba]))))
+        except Exception as e:
+            print(f"⚠️  Ajuste fallido con {parametros}: {e}")
+            puntajes.append(np.nan)
+    return puntajes
+
+
+class BusquedaCancelada(Exception):
+    """La búsqueda se detuvo a pedido del usuario"""
+
+
+def _evaluar_puntos(estimador, puntos, X, y, divisor, almacen=None, huella=None, progreso=None, n_jobs=1,
+                    max_segundos=None, grupos=None):
+    """Puntajes por pliegue de cada punto, leyendo del almacén los ya evaluados
+
+    Devuelve (puntajes, evaluados). Si se agota max_segundos, los puntos que
+    no llegaron a evaluarse quedan con puntaje None.
+    """
+    divisiones = list(divisor.split(X, y, grupos))
+    clave_estimador = repr(estimador)
+    clave_cv = _clave_cv(divisor, grupos)
+    if almacen is not None and huella is None:
+        huella = huella_matriz(X, y)
+
+    # Primero se recuperan los puntos ya evaluados; solo el resto se entrena
+    puntajes = [None] * len(puntos)
+    pendientes = []
+    for i, parametros in enumerate(puntos):
+        guardados = None
+        if almacen is not None:
+            guardados = almacen.obtener(huella, clave_estimador, _clave_punto(parametros), clave_cv)
+        if guardados is not None:
+            puntajes[i] = [np.nan if p is None else p for p in guardados]
+        else:
+            pendientes.append(i)
+    hechos = len(puntos) - len(pendientes)
+    if progreso is not None:
+        progreso(hechos, len(puntos))
+
+    if n_jobs == 1:
+        evaluaciones = (_evaluar_punto(estimador, puntos[i], X, y, divisiones) for i in pendientes)
+    else:
+        from joblib import Parallel, delayed
+        evaluaciones = Parallel(n_jobs=n_jobs, return_as='generator')(
+            delayed(_evaluar_punto)(estimador, puntos[i], X, y, divisiones) for i in pendientes
+        )
+    inicio = time.perf_counter()
+    evaluados = 0
+    for i, resultado in zip(pendientes, evaluaciones):
+        puntajes[i] = resultado
+        evaluados += 1
+        if almacen is not None:
+            almacen.guardar(huella, clave_estimador, _clave_punto(puntos[i]), clave_cv, resultado)
+        hechos += 1
+        if progreso is not None:
+            progreso(hechos, len(puntos))
+        if max_segundos is not None and time.perf_counter() - inicio > max_segundos:
+            break
+    return puntajes, evaluados
+
+
+def _resultado_busqueda(estimador, puntos, puntajes, X, y, evaluados, n_pliegues, modo):
+    """Elige el mejor punto como GridSearchCV y reajusta con todos los datos"""
+    from sklearn.base import clone
+
+    puntajes = np.array(puntajes, dtype=np.float64)
+    medias = np.average(puntajes, axis=1)
+    desviaciones = np.sqrt(np.average((puntajes - medias[:, None]) ** 2, axis=1))
+    # Los NaN quedan al final del ranking, como en GridSearchCV
+    mejor = int(np.argmax(np.where(np.isnan(medias), -np.inf, medias)))
+
+    mejor_estimador = clone(estimador).set_params(**puntos[mejor]).fit(X, y)
+    cv_results = {'params': puntos, 'mean_test_score': medias, 'std_test_score': desviaciones}
+    return ResultadoBusqueda(mejor_estimador, mejor, cv_results, evaluados, len(puntos) - evaluados,
+                             modo=modo, ajustes=evaluados * n_pliegues + 1)
+
+
+def buscar_hiperparametros(estimador, param_grid, X, y, cv=5, almacen=None, huella=None, progreso=None, n_jobs=1,
+                           grupos=None):
+    """Equivalente a GridSearchCV(estimador, param_grid, cv, scoring=exactitud) reutilizando puntos evaluados
+
+    Recorre los puntos en el mismo orden que ParameterGrid, usa las mismas
+    divisiones estratificadas y elige el primer punto de mayor media, igual que
+    GridSearchCV; luego reajusta el mejor estimador con todos los datos. Con
+    grupos los pliegues se forman por grupo (ver divisor_cv). Con n_jobs != 1
+    los puntos pendientes se evalúan en paralelo con joblib.
+    progreso(hechos, total) se llama tras cada punto y puede lanzar
+    BusquedaCancelada para detener la búsqueda.
+    """
+    from sklearn.model_selection import ParameterGrid
+
+    X = np.asarray(X)
+    y = np.asarray(y)
+    grupos = None if grupos is None else np.asarray(grupos).astype(str)
+    divisor = divisor_cv(cv, y, grupos)
+    puntos = list(ParameterGrid(param_grid))
+    puntajes, evaluados = _evaluar_puntos(estimador, puntos, X, y, divisor, almacen, huella, progreso, n_jobs,
+                                          grupos=grupos)
+    return _resultado_busqueda(estimador, puntos, puntajes, X, y, evaluados, divisor.get_n_splits(), 'exhaustiva')
+
+
+def _busqueda_aleatoria(estimador, param_grid, X, y, cv, almacen, huella, progreso, n_jobs, max_ajustes,
+                        max_segundos, semilla, grupos=None):
+    """Puntos de la grilla en orden aleatorio hasta agotar el presupuesto de ajustes o de tiempo"""
+    from sklearn.model_selection import ParameterGrid
+
+    divisor = divisor_cv(cv, y, grupos)
+    n_pliegues = divisor.get_n_splits()
+    todos = list(ParameterGrid(param_grid))
+    orden = np.random.default_rng(semilla).permutation(len(todos))
+    n_puntos = len(todos) if max_ajustes is None else max(1, min(len(todos), (max_ajustes - 1) // n_pliegues))
+    puntos = [todos[i] for i in orden[:n_puntos]]
+
+    puntajes, evaluados = _evaluar_puntos(estimador, puntos, X, y, divisor, almacen, huella, progreso, n_jobs,
+                                          max_segundos=max_segundos, grupos=grupos)
+    # Con presupuesto de tiempo pueden quedar puntos sin evaluar: se descartan
+    completos = [i for i, p in enumerate(puntajes) if p is not None]
+    return _resultado_busqueda(estimador, [puntos[i] for i in completos], [puntajes[i] for i in completos],
+                               X, y, evaluados, n_pliegues, 'aleatoria')
+
+
+class _DivisorPorRondas:
+    """Divisor de validación que informa el avance de successive halving
+
+    La búsqueda de scikit-learn pide las divisiones al comenzar cada ronda, en el
+    proceso principal: ahí se llama progreso(ronda, rondas), que puede lanzar
+    BusquedaCancelada para detener la búsqueda entre rondas.
+    """
+
+    def __init__(self, divisor, progreso, candidatos):
+        self.divisor = divisor
+        self.progreso = progreso
+        self.candidatos = candidatos
+        self.busqueda = None  # Se asigna al crear la búsqueda (da min_resources_ y max_resources_)
+        self.ronda = 0
+
+    def rondas(self):
+        """Número de rondas con la misma fórmula que BaseSuccessiveHalving (sin eliminación agresiva)"""
+        b = self.busqueda
+        requeridas = 1 + math.floor(math.log(self.candidatos, b.factor))
+        posibles = 1 + math.floor(math.log(b.max_resources_ // b.min_resources_, b.factor))
+        return min(requeridas, posibles)
+
+    def split(self, X, y=None, groups=None):
+        if self.progreso is not None:
+            self.progreso(self.ronda, self.rondas())
+        self.ronda += 1
+        return self.divisor.split(X, y, groups)
+
+    def get_n_splits(self, X=None, y=None, groups=None):
+        return self.divisor.get_n_splits(X, y, groups)
+
+
+def _busqueda_halving(estimador, param_grid, X, y, cv, progreso, n_jobs, max_ajustes, semilla, grupos=None):
+    """Successive halving: descarta los peores puntos entrenando con pocos datos al principio
+
+    Con factor 3 cada ronda deja un tercio de los candidatos, así que el total de
+    ajustes ronda 1,5 × candidatos × pliegues. Si la grilla completa supera
+    max_ajustes se parte de una muestra aleatoria de la grilla que quepa en él.
+    progreso(ronda, rondas) se llama al comenzar cada ronda y puede cancelarla.
+    """
+    from sklearn.experimental import enable_halving_search_cv  # noqa: F401
+    from sklearn.model_selection import HalvingGridSearchCV, HalvingRandomSearchCV, ParameterGrid
+
+    divisor = divisor_cv(cv, y, grupos)
+    n_pliegues = divisor.get_n_splits()
+    comunes = dict(scoring='accuracy', factor=3, random_state=semilla, n_jobs=n_jobs, error_score=np.nan)
+    candidatos = len(ParameterGrid(param_grid))
+    if max_ajustes is not None:
+        candidatos = min(candidatos, max(1, int(max_ajustes / (1.5 * n_pliegues))))
+    por_rondas = _DivisorPorRondas(divisor, progreso, candidatos)
+    if candidatos < len(ParameterGrid(param_grid)):
+        busqueda = HalvingRandomSearchCV(estimador, param_grid, n_candidates=candidatos, cv=por_rondas, **comunes)
+    else:
+        busqueda = HalvingGridSearchCV(estimador, param_grid, cv=por_rondas, **comunes)
+    por_rondas.busqueda = busqueda
+
+    busqueda.fit(X, y, groups=grupos)
+    if progreso is not None:
+        progreso(busqueda.n_iterations_, busqueda.n_iterations_)
+
+    resultados = busqueda.cv_results_
+    cv_results = {'params': resultados['params'], 'mean_test_score': resultados['mean_test_score'],
+                  'std_test_score': resultados['std_test_score']}
+    return ResultadoBusqueda(busqueda.best_estimator_, int(busqueda.best_index_), cv_results,
+                             len(resultados['params']), 0, modo='halving',
+                             ajustes=int(sum(busqueda.n_candidates_)) * busqueda.n_splits_ + 1)
+
+
+MODOS_BUSQUEDA = {
+    'exhaustiva': 'Grilla completa (memoizada)',
+    'halving': 'Successive halving',
+    'aleatoria': 'Aleatoria con presupuesto',
+}
+
+
+def _validar_limite_tiempo(modo, max_segundos):
+    """Rechaza max_segundos fuera del modo aleatorio en lugar de ignorarlo en silencio
+
+    scikit-learn no permite cortar successive halving entre rondas conservando
+    los resultados, y la grilla exhaustiva siempre se recorre completa.
+    """
+    if max_segundos is not None and modo != 'aleatoria':
+        raise ValueError(f"El límite de tiempo (max_segundos) solo se aplica al modo 'aleatoria', no a '{modo}'; "
+                         f"el modo halving se acota con max_ajustes.")
+
+
+def buscar_con_presupuesto(estimador, param_grid, X, y, cv=5, modo='exhaustiva', almacen=None, huella=None,
+                           progreso=None, n_jobs=1, max_ajustes=None, max_segundos=None, semilla=42, grupos=None):
+    """Búsqueda de hiperparámetros con la estrategia elegida; informa modo y ajustes usados
+
+    grupos (el sujeto de cada fila) hace que los pliegues de validación
+    separen sujetos en todas las estrategias.
+
+    exhaustiva: grilla completa memoizada (buscar_hiperparametros).
+    aleatoria: puntos de la grilla en orden aleatorio hasta max_ajustes o
+    max_segundos, también memoizados.
+    halving: successive halving de scikit-learn, acotado por max_ajustes; su
+    mejor puntaje corresponde a la última ronda (un subconjunto de los datos).
+    Solo la aleatoria admite max_segundos; en los otros modos es un error.
+    """
+    X = np.asarray(X)
+    y = np.asarray(y)
+    grupos = None if grupos is None else np.asarray(grupos).astype(str)
+    if modo not in MODOS_BUSQUEDA:
+        raise ValueError(f"Modo de búsqueda desconocido: {modo}")
+    _validar_limite_tiempo(modo, max_segundos)
+    with etapa(f'busqueda.{type(estimador).__name__}'):
+        if modo == 'exhaustiva':
+            return buscar_hiperparametros(estimador, param_grid, X, y, cv, almacen, huella, progreso, n_jobs, grupos)
+        if modo == 'aleatoria':
+            return _busqueda_aleatoria(estimador, param_grid, X, y, cv, almacen, huella, progreso, n_jobs,
+                                       max_ajustes, max_segundos, semilla, grupos)
+        return _busqueda_halving(estimador, param_grid, X, y, cv, progreso, n_jobs, max_ajustes, semilla, grupos)
+
+
+# ====================
+# COMPARACIÓN DE MODELOS EN SEGUNDO PLANO
+# ====================
+# 'procesos': búsquedas simultáneas (None = una por estimador, hasta el número de núcleos)
+# 'n_jobs': procesos de joblib dentro de cada búsqueda (None = reparte los núcleos restantes)
+# 'modo': estrategia de búsqueda (ver MODOS_BUSQUEDA)
+# 'max_ajustes': presupuesto de ajustes por estimador (modos aleatoria y halving)
+# 'max_segundos': límite de tiempo por estimador, solo en el modo aleatoria
+# 'early_stopping_mlp': la red neuronal reserva un 10 % de validación y corta al estancarse
+CONFIG_BUSQUEDA = {
+    'procesos': None,
+    'n_jobs': None,
+    'modo': 'exhaustiva',
+    'max_ajustes': 200,
+    'max_segundos': None,
+    'early_stopping_mlp': False,
+}
+
+
+def opciones_busqueda(config=None):
+    """Argumentos de buscar_con_presupuesto tomados de una configuración de búsqueda"""
+    config = {**CONFIG_BUSQUEDA, **(config or {})}
+    if config['modo'] not in MODOS_BUSQUEDA:
+        raise ValueError(f"Modo de búsqueda desconocido: {config['modo']}")
+    _validar_limite_tiempo(config['modo'], config['max_segundos'])
+    return {'modo': config['modo'], 'max_ajustes': config['max_ajustes'], 'max_segundos': config['max_segundos']}
+
+
+def modelos_comparacion(early_stopping_mlp=False):
+    """Estimadores y grillas que se comparan en la pestaña de resultados"""
+    from sklearn.tree import DecisionTreeClassifier
+    from sklearn.svm import SVC
+    from sklearn.neural_network import MLPClassifier
+
+    return {
+        'Decision Tree': {
+            'modelo': DecisionTreeClassifier(random_state=42),
+            'param_grid': {
+                'criterion': ['gini'],
+                'max_depth': [3, 5, 7, 10, 12, 15, 20],
+                'min_samples_split': [2, 5, 10],
+                'min_samples_leaf': [1, 2, 4],
+                'max_features': ['sqrt', 'log2'],
+                'class_weight': [None, 'balanced'],
+                'splitter': ['best']
+            }
+        },
+        'SVM': {
+            'modelo': SVC(random_state=42),
+            'param_grid': {
+                'C': [0.1, 1, 10],
+                'kernel': ['linear', 'rbf', 'poly'],
+                'gamma': ['scale', 'auto']
+            }
+        },
+        'Neural Network': {
+            'modelo': MLPClassifier(max_iter=1000, random_state=42, early_stopping=early_stopping_mlp),
+            'param_grid': {
+                'hidden_layer_sizes': [(50,), (100,), (100, 50)],
+                'activation': ['relu', 'tanh'],
+                'solver': ['adam', 'sgd'],
+                'alpha': [0.0001, 0.001, 0.01]
+            }
+        }
+    }
+
+
+def _buscar_en_proceso(nombre, estimador, param_grid, X, y, cv, ruta_almacen, huella, n_jobs, opciones, cola,
+                       cancelar, instrumentacion, grupos=None):
+    """Trabajo de un proceso: una búsqueda completa que informa su avance por la cola
+
+    El resultado lleva en `rendimiento` el resumen de etapas medidas en este proceso.
+    """
+    almacen = AlmacenBusqueda(ruta_almacen) if ruta_almacen else None
+    # Con spawn el proceso no hereda la configuración del padre; además puede venir de otra búsqueda
+    INSTRUMENTACION.update(instrumentacion)
+    REGISTRO.reiniciar()
+
+    def progreso(hechos, total):
+        cola.put((nombre, hechos, total))
+        if cancelar.is_set():
+            raise BusquedaCancelada(nombre)
+
+    try:
+        resultado = buscar_con_presupuesto(estimador, param_grid, X, y, cv=cv, almacen=almacen, huella=huella,
+                                           progreso=progreso, n_jobs=n_jobs, grupos=grupos, **opciones)
+        resultado.rendimiento = REGISTRO.resumen()
+        return resultado
+    finally:
+        if almacen is not None:
+            almacen.cerrar()
+
+
+class ComparacionEnSegundoPlano:
+    """Búsqueda simultánea de varios estimadores en un pool de procesos
+
+    No bloquea a quien la inicia: el avance se consulta con progreso() (una
+    cola compartida con los procesos), terminada() indica el final y
+    cancelar() detiene las búsquedas en el siguiente punto evaluado.
+    """
+
+    def __init__(self, modelos, X, y, cv=5, ruta_almacen=None, procesos=None, n_jobs=None, opciones=None,
+                 grupos=None):
+        self.modelos = modelos
+        self.opciones = opciones or {}  # modo y presupuesto para buscar_con_presupuesto
+        self.X = np.asarray(X)
+        self.y = np.asarray(y)
+        self.grupos = None if grupos is None else np.asarray(grupos)  # Sujeto de cada fila (pliegues por sujeto)
+        self.cv = cv
+        self.ruta_almacen = ruta_almacen
+        nucleos = os.cpu_count() or 1
+        self.procesos = procesos or max(1, min(len(modelos), nucleos))
+        self.n_jobs = n_jobs or max(1, nucleos // self.procesos)
+        self.avance = {nombre: (0, 0) for nombre in modelos}
+        self.cancelada = False
+        self._futuros = {}
+        self._fusionados = set()  # Búsquedas cuyo rendimiento ya se sumó al registro global
+
+    def iniciar(self):
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+
+        self._manager = multiprocessing.Manager()
+        self._cola = self._manager.Queue()
+        self._cancelar = self._manager.Event()
+        self._pool = ProcessPoolExecutor(max_workers=self.procesos)
+        huella = huella_matriz(self.X, self.y)
+        for nombre, config in self.modelos.items():
+            self._futuros[nombre] = self._pool.submit(
+                _buscar_en_proceso, nombre, config['modelo'], config['param_grid'], self.X, self.y, self.cv,
+                self.ruta_almacen, huella, self.n_jobs, self.opciones, self._cola, self._cancelar, dict(INSTRUMENTACION),
+                self.grupos
+            )
+        return self
+
+    def progreso(self):
+        """Vacía la cola de avance y devuelve {nombre: (hechos, total)}"""
+        import queue
+
+        while True:
+            try:
+                nombre, hechos, total = self._cola.get_nowait()
+            except queue.Empty:
+                break
+            self.avance[nombre] = (hechos, total)
+        return self.avance
+
+    def terminada(self):
+        return all(f.done() for f in self._futuros.values())
+
+    def cancelar(self):
+        self.cancelada = True
+        self._cancelar.set()
+        for futuro in self._futuros.values():
+            futuro.cancel()
+
+    def resultados(self):
+        """{nombre: ResultadoBusqueda} de las búsquedas completas; propaga errores reales"""
+        resultados = {}
+        for nombre, futuro in self._futuros.items():
+            if futuro.cancelled():
+                continue
+            try:
+                resultados[nombre] = futuro.result()
+            except BusquedaCancelada:
+                continue
+            if nombre not in self._fusionados:
+                REGISTRO.fusionar(getattr(resultados[nombre], 'rendimiento', None) or [], prefijo=f'{nombre}: ')
+                self._fusionados.add(nombre)
+        return resultados
+
+    def cerrar(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        self._manager.shutdown()
+
+
+# ====================
+# DIVISIÓN Y ENTRENAMIENTO
+# ====================
+# Grilla del árbol de decisión que se entrena en "Prueba" y en el pipeline sin interfaz
+PARAM_GRID_ARBOL = {
+    'criterion': ['gini', 'entropy'],
+    'max_depth': [3, 5, 7, 10, 15],
+    'min_samples_split': [2, 3, 5, 7, 10],
+    'min_samples_leaf': [1, 2, 3, 5, 7],
+    'max_features': ['sqrt', 'log2', None]
+}
+INTENTOS_DIVISION = 20  # Divisiones por sujeto que se prueban hasta tener todas las clases en test
+
+
+def dividir_datos(df_ml, sujetos_test=None, usar_automatico=True, test_size=0.2, random_state=42):
+    """
+    Divide los datos de forma manual o automática
+
+    Parámetros:
+    - df_ml: DataFrame con las características
+    - sujetos_test: Lista de sujetos para test (si None, se usa división automática)
+    - usar_automatico: Si True, usa división automática; si False, usa sujetos_test
+    - test_size: Proporción para test en división automática
+    - random_state: Semilla para reproducibilidad
+
+    Retorna:
+    - Tupla con (X_train, X_test, y_train, y_test, suj_train, suj_test, feature_columns)
+    """
+    import pandas as pd
+    from sklearn.model_selection import train_test_split, GroupShuffleSplit
+
+    # Preparar características y etiquetas
+    feature_columns = [col for col in df_ml.columns
+                       if col not in ['Sujeto', 'Movimiento_ID', 'Clase']]
+
+    X = df_ml[feature_columns].values
+    y = df_ml['Clase'].values
+    sujetos = df_ml['Sujeto'].values
+
+    if (usar_automatico or sujetos_test is None) and df_ml.duplicated(['Sujeto', 'Clase']).any():
+        # Varias ventanas por sujeto: dividir por sujeto para que las ventanas
+        # solapadas de un mismo registro no queden en entrenamiento y test a la vez
+        print("🔄 Usando división automática por sujeto (datos en ventanas)...")
+        # GroupShuffleSplit no estratifica: se toma la primera división que deja
+        # todas las clases en entrenamiento y en test
+        clases = np.unique(y)
+        divisor = GroupShuffleSplit(n_splits=INTENTOS_DIVISION, test_size=test_size, random_state=random_state)
+        for intento, (idx_train, idx_test) in enumerate(divisor.split(X, y, groups=sujetos.astype(str))):
+            if len(np.unique(y[idx_train])) == len(clases) and len(np.unique(y[idx_test])) == len(clases):
+                break
+        else:
+            raise ValueError("No se encontró una división por sujeto con todas las clases en entrenamiento y test.")
+        if intento:
+            print(f"🔁 División por sujeto número {intento + 1} (las anteriores dejaban una clase fuera)")
+        X_train, X_test = X[idx_train], X[idx_test]
+        y_train, y_test = y[idx_train], y[idx_test]
+        suj_train, suj_test = sujetos[idx_train], sujetos[idx_test]
+    elif usar_automatico or sujetos_test is None:
+        # División automática
+        print("🔄 Usando división automática de datos...")
+        X_train, X_test, y_train, y_test, suj_train, suj_test = train_test_split(
+            X, y, sujetos, test_size=test_size, random_state=random_state, stratify=y
+        )
+    else:
+        # División manual
+        print(f"✋ Usando división manual de datos...")
+        print(f"Sujetos seleccionados para test: {sujetos_test}")
+
+        # Validar que los sujetos existen
+        sujetos_disponibles = set(df_ml['Sujeto'].unique())
+        sujetos_test_set = set(sujetos_test)
+
+        if not sujetos_test_set.issubset(sujetos_disponibles):
+            sujetos_invalidos = sujetos_test_set - sujetos_disponibles
+            raise ValueError(f"Los siguientes sujetos no están disponibles: {sujetos_invalidos}")
+
+        # Crear máscaras para separar datos
+        mask_test = df_ml['Sujeto'].isin(sujetos_test)
+        mask_train = ~mask_test
+
+        # Separar datos
+        X_train = df_ml.loc[mask_train, feature_columns].values
+        X_test = df_ml.loc[mask_test, feature_columns].values
+        y_train = df_ml.loc[mask_train, 'Clase'].values
+        y_test = df_ml.loc[mask_test, 'Clase'].values
+        suj_train = df_ml.loc[mask_train, 'Sujeto'].values
+        suj_test = df_ml.loc[mask_test, 'Sujeto'].values
+
+        # Verificar distribución
+        test_classes = pd.Series(y_test).value_counts()
+        train_classes = pd.Series(y_train).value_counts()
+
+        print(f"📊 Distribución en entrenamiento: {dict(train_classes)}")
+        print(f"📊 Distribución en test: {dict(test_classes)}")
+
+        if len(test_classes) < 2:
+            print("⚠️  ADVERTENCIA: El conjunto de test no tiene ambas clases!")
+
+    print(f"📈 Datos de entrenamiento: {len(X_train)} muestras")
+    print(f"🧪 Datos de prueba: {len(X_test)} muestras")
+
+    return X_train, X_test, y_train, y_test, suj_train, suj_test, feature_columns
+
+
+def entrenar_arbol(X_train, y_train, almacen=None, config_busqueda=None, cv=5, grupos=None):
+    """Normaliza y busca el mejor árbol de decisión; devuelve (scaler, ResultadoBusqueda)
+
+    grupos es el sujeto de cada fila de entrenamiento: con ventanas solapadas
+    la validación cruzada debe separar sujetos o su puntaje sale inflado.
+    """
+    from sklearn.preprocessing import StandardScaler
+    from sklearn.tree import DecisionTreeClassifier
+
+    config = {**CONFIG_BUSQUEDA, **(config_busqueda or {})}
+    scaler = StandardScaler()
+    with etapa('escalado'):
+        X_train_scaled = scaler.fit_transform(X_train)
+
+    # En modo exhaustivo equivale a GridSearchCV(cv=5, exactitud) con pliegues por
+    # sujeto; los puntos ya evaluados con estos mismos datos se leen del almacén
+    busqueda = buscar_con_presupuesto(
+        DecisionTreeClassifier(random_state=42),
+        PARAM_GRID_ARBOL,
+        X_train_scaled, y_train,
+        cv=cv,
+        almacen=almacen,
+        n_jobs=config['n_jobs'] or -1,
+        grupos=grupos,
+        **opciones_busqueda(config)
+    )
+    return scaler, busqueda
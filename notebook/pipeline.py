@@ -0,0 +1,322 @@
+# ====================
+# BIBLIOTECAS ESTÁNDAR
+# ====================
+import argparse
+import json
+import os
+import time
+
+# ====================
+# MANEJO DE DATOS
+# ====================
+import numpy as np
+
+# ====================
+# ALMACÉN Y PROCESAMIENTO
+# ====================
+from almacen import abrir_almacen, NOMBRE_INDICE
+from procesamiento import IndiceRegistros, PARAMETROS_FILTRO, MUESTRAS_MINIMAS, PARALELISMO, preprocesar_registros
+
+# ====================
+# CARACTERÍSTICAS Y MODELOS
+# ====================
+from caracteristicas import SEGMENTACION, CacheCaracteristicas, crear_dataset_ml
+from instrumentacion import INSTRUMENTACION, REGISTRO, etapa
+from modelos import (
+    CONFIG_BUSQUEDA,
+    MODOS_BUSQUEDA,
+    AlmacenBusqueda,
+    ComparacionEnSegundoPlano,
+    dividir_datos,
+    entrenar_arbol,
+    guardar_modelo,
+    huella_dataset,
+    medir_desfase_vivo,
+    modelos_comparacion,
+    opciones_busqueda,
+)
+
+
+# Cargar → filtrar → características → entrenar → evaluar sin interfaz gráfica.
+# Este módulo no importa tkinter, matplotlib ni seaborn: sirve para reentrenar
+# en servidores sin pantalla (python -m pipeline run --input datos.xlsx --out salida)
+COLUMNAS_CARGA = ["Tiempo (s)", "Muestra", "Valor lectura"]  # Columnas que usa la aplicación
+NOMBRE_MODELO = "modelo_emg.joblib"
+NOMBRE_METRICAS = "metricas.json"
+NOMBRE_RENDIMIENTO = "rendimiento"  # rendimiento.json (resumen y mediciones) y rendimiento.csv
+
+
+def cargar_datos(rutas):
+    """DataFrame de uno o varios archivos: Excel, almacén EMG o grabaciones (manifest.json)
+
+    Devuelve (df, almacen); almacen es None para grabaciones.
+    """
+    if isinstance(rutas, str):
+        rutas = [rutas]
+    es_grabacion = all(r.endswith(".json") and os.path.basename(r) != NOMBRE_INDICE for r in rutas)
+    almacen = None
+    if es_grabacion:
+        # La adquisición (pyserial) solo se importa si hay grabaciones que leer
+        import pandas as pd
+        from adquisicion import cargar_grabacion
+        df = pd.concat([cargar_grabacion(r) for r in rutas], ignore_index=True)
+    elif len(rutas) > 1:
+        raise ValueError("Seleccione un único archivo Excel o almacén, o solo grabaciones (manifest.json).")
+    else:
+        # Abrir el almacén columnar (un Excel se convierte solo la primera vez)
+        almacen = abrir_almacen(rutas[0])
+        df = almacen.leer_dataframe([c for c in COLUMNAS_CARGA if c in almacen.columnas])
+
+    # Verificar que las columnas necesarias existen
+    if 'Valor lectura' not in df.columns or 'Sujeto' not in df.columns or 'Movimiento_ID' not in df.columns:
+        raise ValueError("El archivo no contiene las columnas necesarias: 'Valor lectura', 'Sujeto' o 'Movimiento_ID'.")
+    return df, almacen
+
+
+def filtrar_datos(df, almacen=None, parametros_filtro=None, avisar=print, paralelismo=None):
+    """Agrega 'Señal Filtrada' y devuelve (df ordenado, IndiceRegistros, reutilizada)
+
+    Si el almacén ya tiene la señal filtrada con los mismos parámetros se lee de
+    ahí; si no, se filtra y se guarda la columna en el almacén. avisar(texto)
+    recibe los avisos para el usuario (registros demasiado cortos, etc.).
+    paralelismo ({'procesos', 'registros_por_tarea'}) reemplaza a PARALELISMO.
+    """
+    parametros_filtro = dict(PARAMETROS_FILTRO if parametros_filtro is None else parametros_filtro)
+
+    reutilizar_filtrada = almacen is not None and almacen.parametros('Señal Filtrada') == parametros_filtro
+    if reutilizar_filtrada:
+        # La señal ya se filtró con los mismos parámetros: leer solo esa columna
+        df['Señal Filtrada'] = np.concatenate(list(almacen.leer_columna('Señal Filtrada').values()))
+        avisar("Señal filtrada leída del almacén (mismos parámetros).")
+
+    # Ordenar una sola vez por (Sujeto, Movimiento_ID) y guardar los desplazamientos de cada registro
+    df, indice = IndiceRegistros.construir(df)
+
+    if not reutilizar_filtrada:
+        valores = df['Valor lectura'].to_numpy(dtype=float)
+
+        # Separar los registros demasiado cortos para el filtrado de fase cero
+        registros = []
+        for sujeto, movimiento, rebanada in indice:
+            n = rebanada.stop - rebanada.start
+            if n < MUESTRAS_MINIMAS:
+                avisar(f"Sujeto {sujeto}, Movimiento {movimiento}: señal demasiado corta ({n} muestras), se omite el filtrado.")
+                continue  # Saltar esta señal
+            registros.append(rebanada)
+
+        # Pasabanda en una sola pasada y banco de notch (una pasada SOS por registro);
+        # con 'procesos' > 1 los registros se reparten entre procesos
+        filtrada = preprocesar_registros(valores, registros, parametros_filtro,
+                                         **{**PARALELISMO, **(paralelismo or {})})
+        df['Señal Filtrada'] = filtrada
+
+        # Guardar solo la columna filtrada en el almacén (sin reescribir el resto)
+        if almacen is not None:
+            almacen.escribir_columna(
+                'Señal Filtrada',
+                [indice.vista(filtrada, r['sujeto'], r['movimiento_id']) for r in almacen.registros],
+                parametros=parametros_filtro
+            )
+    return df, indice, reutilizar_filtrada
+
+
+def _metricas_prueba(modelo, X_test, y_test):
+    """Exactitud, reporte por clase y matriz de confusión en formato serializable"""
+    from sklearn.metrics import accuracy_score, classification_report, confusion_matrix
+
+    y_pred = modelo.predict(X_test)
+    clases = sorted(set(y_test) | set(y_pred))
+    return {
+        'accuracy': float(accuracy_score(y_test, y_pred)),
+        'reporte': classification_report(y_test, y_pred, output_dict=True, zero_division=0),
+        'clases': [str(c) for c in clases],
+        'matriz_confusion': confusion_matrix(y_test, y_pred, labels=clases).tolist(),
+    }
+
+
+def _comparar_modelos(X_train, y_train, X_test, y_test, config, ruta_almacen, grupos=None):
+    """Comparación de modelos de la pestaña de resultados, informando el avance por consola"""
+    comparacion = ComparacionEnSegundoPlano(
+        modelos_comparacion(early_stopping_mlp=config['early_stopping_mlp']), X_train, y_train, cv=5,
+        ruta_almacen=ruta_almacen, procesos=config['procesos'], n_jobs=config['n_jobs'],
+        opciones=opciones_busqueda(config), grupos=grupos
+    ).iniciar()
+    try:
+        mostrado = {}
+        while not comparacion.terminada():
+            for nombre, avance in comparacion.progreso().items():
+                if avance != mostrado.get(nombre) and avance[1]:
+                    print(f"⏳ {nombre}: {avance[0]}/{avance[1]}")
+                    mostrado[nombre] = avance
+            time.sleep(0.5)
+        busquedas = comparacion.resultados()
+    finally:
+        comparacion.cerrar()
+
+    resultados = {}
+    for nombre, busqueda in busquedas.items():
+        resultados[nombre] = {
+            'cv_mean': float(busqueda.best_score_),
+            'cv_std': float(busqueda.cv_results_['std_test_score'][busqueda.best_index_]),
+            'mejores_params': {k: repr(v) for k, v in busqueda.best_params_.items()},
+            'modo': busqueda.modo,
+            'ajustes': busqueda.ajustes,
+            **_metricas_prueba(busqueda.best_estimator_, X_test, y_test),
+        }
+    return resultados
+
+
+def desfase_vivo(modelo, scaler, columnas, df, indice, sujetos_test, avisar=print):
+    """medir_desfase_vivo sobre los sujetos de test, informando el resultado; None si no se puede medir"""
+    try:
+        with etapa('desfase_vivo'):
+            desfase = medir_desfase_vivo(modelo, scaler, columnas, df, indice, sujetos_test)
+    except ValueError as e:
+        avisar(f"⚠️  No se pudo medir el desfase en vivo: {e}")
+        return None
+    avisar(f"📡 Filtro causal en vivo: misma predicción en {desfase['acuerdo']:.1%} de {desfase['ventanas']} ventanas"
+           f" (exactitud {desfase['exactitud_entrenamiento']:.3f} → {desfase['exactitud_vivo']:.3f})")
+    return desfase
+
+
+def ejecutar(entradas, salida, config_busqueda=None, comparar=False, test_size=0.3, random_state=42,
+             ruta_cache=None, ruta_busquedas=None, paralelismo=None):
+    """Ejecuta el pipeline completo y escribe el modelo y las métricas en el directorio de salida"""
+    config = {**CONFIG_BUSQUEDA, **(config_busqueda or {})}
+    os.makedirs(salida, exist_ok=True)
+    ruta_cache = ruta_cache or os.path.join(salida, "cache_caracteristicas")
+    ruta_busquedas = ruta_busquedas or os.path.join(salida, "busquedas.sqlite")
+    REGISTRO.reiniciar()
+
+    with etapa('carga'):
+        df, almacen = cargar_datos(entradas)
+    print(f"📂 Datos cargados: {len(df)} muestras")
+
+    with etapa('filtrado'):
+        df, indice, reutilizada = filtrar_datos(df, almacen, avisar=lambda texto: print(f"⚠️  {texto}"),
+                                                paralelismo=paralelismo)
+    print(f"🔧 Señal filtrada ({len(indice)} registros{', leída del almacén' if reutilizada else ''})")
+
+    cache = CacheCaracteristicas(ruta_cache)
+    with etapa('dataset_ml'):
+        df_ml = crear_dataset_ml(df, indice, cache=cache)
+    print(f"📊 Dataset creado con {len(df_ml)} muestras y {len(df_ml.columns)-3} características"
+          f" (caché: {cache.aciertos} aciertos, {cache.fallos} calculadas)")
+    if df_ml.empty:
+        raise ValueError("No hay registros de los movimientos 13 y 14 suficientemente largos para entrenar.")
+
+    X_train, X_test, y_train, y_test, suj_train, suj_test, feature_columns = dividir_datos(
+        df_ml, usar_automatico=True, test_size=test_size, random_state=random_state
+    )
+
+    almacen_busqueda = AlmacenBusqueda(ruta_busquedas)
+    try:
+        with etapa('entrenamiento'):
+            scaler, busqueda = entrenar_arbol(X_train, y_train, almacen=almacen_busqueda, config_busqueda=config,
+                                              grupos=suj_train)
+    finally:
+        almacen_busqueda.cerrar()
+    X_test_scaled = scaler.transform(X_test)
+    prueba = _metricas_prueba(busqueda.best_estimator_, X_test_scaled, y_test)
+    print(f"🔎 Búsqueda {busqueda.modo}: {busqueda.ajustes} ajustes")
+    print(f"🎯 Validación cruzada: {busqueda.best_score_:.3f} | test: {prueba['accuracy']:.3f}")
+    desfase = desfase_vivo(busqueda.best_estimator_, scaler, feature_columns, df, indice, suj_test)
+
+    ruta_modelo = os.path.join(salida, NOMBRE_MODELO)
+    guardar_modelo(
+        ruta_modelo, busqueda.best_estimator_, scaler, feature_columns,
+        huella=huella_dataset(df),
+        metricas={'cv': float(busqueda.best_score_), 'test': prueba['accuracy'],
+                  'parametros': busqueda.best_params_, 'desfase_vivo': desfase}
+    )
+    print(f"💾 Modelo guardado en: {ruta_modelo}")
+
+    metricas = {
+        'entradas': [os.path.abspath(e) for e in entradas],
+        'modelo': ruta_modelo,
+        'segmentacion': dict(SEGMENTACION),
+        'busqueda': {'modo': busqueda.modo, 'ajustes': busqueda.ajustes, 'evaluados': busqueda.evaluados,
+                     'reutilizados': busqueda.reutilizados},
+        'muestras': {'entrenamiento': int(len(X_train)), 'test': int(len(X_test))},
+        'sujetos_test': sorted(str(s) for s in set(suj_test)),
+        'caracteristicas': list(feature_columns),
+        'cv': float(busqueda.best_score_),
+        'mejores_params': {k: repr(v) for k, v in busqueda.best_params_.items()},
+        'test': prueba,
+        'desfase_vivo': desfase,
+        'cache_caracteristicas': {'aciertos': cache.aciertos, 'calculadas': cache.fallos},
+    }
+
+    if comparar:
+        with etapa('comparacion'):
+            metricas['comparacion'] = _comparar_modelos(
+                scaler.transform(X_train), y_train, X_test_scaled, y_test, config, ruta_busquedas, grupos=suj_train
+            )
+        for nombre, resultado in metricas['comparacion'].items():
+            print(f"🏁 {nombre}: CV {resultado['cv_mean']:.3f} | test {resultado['accuracy']:.3f}"
+                  f" ({resultado['modo']}, {resultado['ajustes']} ajustes)")
+
+    # Tiempos y memoria por etapa (también en rendimiento.json / rendimiento.csv)
+    metricas['rendimiento'] = REGISTRO.resumen()
+    REGISTRO.exportar_json(os.path.join(salida, NOMBRE_RENDIMIENTO + ".json"))
+    REGISTRO.exportar_csv(os.path.join(salida, NOMBRE_RENDIMIENTO + ".csv"))
+    ruta_metricas = os.path.join(salida, NOMBRE_METRICAS)
+    temporal = ruta_metricas + ".tmp"
+    with open(temporal, "w", encoding="utf-8") as f:
+        json.dump(metricas, f, indent=2, ensure_ascii=False)
+    os.replace(temporal, ruta_metricas)
+    print(f"📝 Métricas guardadas en: {ruta_metricas}")
+    return metricas
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pipeline de reconocimiento EMG sin interfaz gráfica")
+    subparsers = parser.add_subparsers(dest="comando", required=True)
+    run = subparsers.add_parser("run", help="Carga, filtra, extrae características, entrena y evalúa")
+    run.add_argument("--input", nargs="+", required=True,
+                     help="Archivo Excel, almacén .emg (o su indice.json) o grabaciones (manifest.json)")
+    run.add_argument("--out", required=True, help="Directorio donde se escriben el modelo y las métricas")
+    run.add_argument("--modo", choices=list(MODOS_BUSQUEDA), default=CONFIG_BUSQUEDA['modo'],
+                     help="Estrategia de búsqueda de hiperparámetros")
+    run.add_argument("--max-ajustes", type=int, default=CONFIG_BUSQUEDA['max_ajustes'],
+                     help="Presupuesto de ajustes por modelo (modos aleatoria y halving)")
+    run.add_argument("--max-segundos", type=float, default=CONFIG_BUSQUEDA['max_segundos'],
+                     help="Presupuesto de tiempo por modelo (solo modo aleatoria)")
+    run.add_argument("--early-stopping-mlp", action="store_true", help="Early stopping en la red neuronal")
+    run.add_argument("--comparar", action="store_true", help="Compara también árbol, SVM y red neuronal")
+    run.add_argument("--test-size", type=float, default=0.3, help="Proporción de datos para test")
+    run.add_argument("--cache", default=None, help="Directorio de la caché de características")
+    run.add_argument("--busquedas", default=None, help="Base sqlite de búsquedas memoizadas")
+    run.add_argument("--procesos", type=int, default=PARALELISMO['procesos'],
+                     help="Procesos para el preprocesamiento (1 = sin paralelismo, 0 = todos los núcleos;"
+                          " por defecto EMG_PROCESOS o 1)")
+    run.add_argument("--registros-por-tarea", type=int, default=PARALELISMO['registros_por_tarea'],
+                     help="Registros enviados a cada proceso por tarea (por defecto EMG_REGISTROS_POR_TAREA u 8)")
+    run.add_argument("--memoria", action="store_true",
+                     help="Mide el pico de memoria de cada etapa con tracemalloc (más lento)")
+    args = parser.parse_args(argv)
+    INSTRUMENTACION['memoria'] = args.memoria
+    if args.procesos is not None and args.procesos < 0:
+        parser.error("--procesos no puede ser negativo")
+    if args.registros_por_tarea < 1:
+        parser.error("--registros-por-tarea debe ser al menos 1")
+
+    config = {
+        'modo': args.modo,
+        'max_ajustes': args.max_ajustes,
+        'max_segundos': args.max_segundos,
+        'early_stopping_mlp': args.early_stopping_mlp,
+    }
+    try:
+        opciones_busqueda(config)
+    except ValueError as e:
+        parser.error(str(e))
+    ejecutar(args.input, args.out, config_busqueda=config, comparar=args.comparar, test_size=args.test_size,
+             ruta_cache=args.cache, ruta_busquedas=args.busquedas,
+             paralelismo={'procesos': args.procesos or None, 'registros_por_tarea': args.registros_por_tarea})
+
+
+if __name__ == "__main__":
+    import multiprocessing
+    multiprocessing.freeze_support()
+    main()
@@ -0,0 +1,430 @@
+# ====================
+# BIBLIOTECAS ESTÁNDAR
+# ====================
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from multiprocessing import shared_memory
+
+# ====================
+# MANEJO DE DATOS
+# ====================
+import numpy as np
+
+# ====================
+# INSTRUMENTACIÓN
+# ====================
+from instrumentacion import etapa
+
+# scipy.signal, scipy.fft y pandas se importan dentro de cada función: importarlos
+# cuesta más de un segundo y la interfaz no los necesita hasta filtrar la primera señal
+
+
+# Parámetros del filtro
+PARAMETROS_FILTRO = {
+    'fs': 500,  # Frecuencia de muestreo (Hz)
+    'low_cutoff': 20,  # Frecuencia de corte inferior (Hz)
+    'high_cutoff': 200,  # Frecuencia de corte superior (Hz)
+    'orden': 5,  # Orden del Butterworth pasabanda
+    'Q': 20.0,  # Factor de calidad del notch
+    'num_ruidos': 4,  # Frecuencias de ruido a eliminar con notch
+}
+
+
+def _entero_entorno(nombre, por_defecto):
+    """Entero positivo de una variable de entorno; 0 se interpreta como None (todos los núcleos)"""
+    valor = os.environ.get(nombre, "").strip()
+    if not valor:
+        return por_defecto
+    try:
+        numero = int(valor)
+    except ValueError:
+        raise ValueError(f"{nombre} debe ser un número entero (valor actual: {valor!r}).")
+    if numero < 0:
+        raise ValueError(f"{nombre} no puede ser negativo.")
+    return numero or None
+
+
+# Preprocesamiento en paralelo (opcional): con 'procesos' = 1 todo corre en el proceso actual;
+# None usa todos los núcleos. 'registros_por_tarea' es el tamaño de cada lote enviado a un proceso.
+# Se eligen sin editar el código con EMG_PROCESOS (0 = todos los núcleos) y EMG_REGISTROS_POR_TAREA,
+# o con --procesos / --registros-por-tarea en pipeline.py
+PARALELISMO = {
+    'procesos': _entero_entorno('EMG_PROCESOS', 1),
+    'registros_por_tarea': _entero_entorno('EMG_REGISTROS_POR_TAREA', 8) or 8,
+}
+# Agrupación de registros en sosfiltfilt_lote: longitud máxima relativa dentro de
+# un grupo y tamaño máximo de la matriz de un grupo (2**23 float64 = 64 MB)
+LOTE_FILTRADO = {
+    'razon_longitud': 1.25,
+    'max_elementos': 2 ** 23,
+}
+# El filtrado de fase cero necesita más muestras que su padlen (33)
+MUESTRAS_MINIMAS = 34
+# En vivo no se dispone del espectro completo para detectar ruidos: el notch usa
+# frecuencias fijas (red eléctrica de 60 Hz y sus armónicos dentro de la banda)
+NOTCH_STREAMING = (60.0, 120.0, 180.0)
+
+
+class IndiceRegistros:
+    """Desplazamientos [inicio, fin) de cada registro (Sujeto, Movimiento_ID) en un DataFrame ordenado"""
+
+    def __init__(self, sujetos, movimientos, inicios, fines, primera_fila):
+        self.sujetos = list(sujetos)
+        self.movimientos = list(movimientos)
+        self.inicios = np.asarray(inicios, dtype=np.int64)
+        self.fines = np.asarray(fines, dtype=np.int64)
+        # Fila donde apareció por primera vez cada registro en el DataFrame original;
+        # permite recorrer los registros en el mismo orden que las máscaras booleanas
+        self.primera_fila = np.asarray(primera_fila, dtype=np.int64)
+        self._posiciones = {(s, m): i for i, (s, m) in enumerate(zip(self.sujetos, self.movimientos))}
+
+    @classmethod
+    def construir(cls, df):
+        """Ordena df por (Sujeto, Movimiento_ID) una sola vez y devuelve (df_ordenado, indice)"""
+        import pandas as pd
+
+        # factorize evita comparar sujetos de tipos mezclados (int y str) al ordenar
+        codigos_sujeto, _ = pd.factorize(df['Sujeto'])
+        codigos_mov, movs_unicos = pd.factorize(df['Movimiento_ID'])
+        claves = codigos_sujeto.astype(np.int64) * len(movs_unicos) + codigos_mov
+        orden = np.argsort(claves, kind='stable')
+
+        if not np.array_equal(orden, np.arange(len(orden))):
+            df = df.iloc[orden].reset_index(drop=True)
+        claves = claves[orden]
+
+        inicios = np.flatnonzero(np.r_[True, claves[1:] != claves[:-1]]) if len(claves) else claves
+        fines = np.append(inicios[1:], len(claves))
+        sujetos = df['Sujeto'].to_numpy()[inicios]
+        movimientos = df['Movimiento_ID'].to_numpy()[inicios]
+        return df, cls(sujetos, movimientos, inicios, fines, orden[inicios])
+
+    def __len__(self):
+        return len(self.inicios)
+
+    def __iter__(self):
+        for s, m, inicio, fin in zip(self.sujetos, self.movimientos, self.inicios, self.fines):
+            yield s, m, slice(inicio, fin)
+
+    def rebanada(self, sujeto, movimiento):
+        """Slice del registro en O(1); None si no existe"""
+        i = self._posiciones.get((sujeto, movimiento))
+        if i is None:
+            return None
+        return slice(self.inicios[i], self.fines[i])
+
+    def vista(self, columna, sujeto, movimiento):
+        """Vista sin copia de un registro sobre un arreglo de columna"""
+        rebanada = self.rebanada(sujeto, movimiento)
+        if rebanada is None:
+            return columna[:0]
+        return columna[rebanada]
+
+    def registros_de_movimiento(self, movimiento):
+        """(sujeto, slice) de un movimiento en orden de primera aparición"""
+        posiciones = [i for i, m in enumerate(self.movimientos) if m == movimiento]
+        posiciones.sort(key=lambda i: self.primera_fila[i])
+        for i in posiciones:
+            yield self.sujetos[i], slice(self.inicios[i], self.fines[i])
+
+    def sujetos_unicos(self):
+        return list(dict.fromkeys(self.sujetos))
+
+
+@lru_cache(maxsize=None)
+def disenar_pasabanda(lowcut, highcut, fs, orden=5):
+    """Butterworth pasabanda en secciones de segundo orden (se diseña una sola vez)"""
+    from scipy.signal import butter
+
+    nyquist = 0.5 * fs
+    sos = butter(orden, [lowcut / nyquist, highcut / nyquist], btype='band', output='sos')
+    return sos
+
+
+def _padlen(sos):
+    """Mismo padlen por defecto que scipy.signal.sosfiltfilt"""
+    ntaps = 2 * len(sos) + 1
+    ntaps -= min((sos[:, 2] == 0).sum(), (sos[:, 5] == 0).sum())
+    return 3 * ntaps
+
+
+def _grupos_por_longitud(longitudes, p, razon=1.25, max_elementos=2 ** 23):
+    """Posiciones de los registros agrupadas por longitud parecida
+
+    En cada grupo el registro más largo mide como mucho `razon` veces el más
+    corto (el relleno desperdicia menos del 25 %) y la matriz del grupo no pasa
+    de max_elementos valores; un registro que por sí solo la supera se filtra solo.
+    """
+    grupos = []
+    actual = []
+    for i in np.argsort(longitudes, kind='stable'):
+        ancho = longitudes[i] + 2 * p
+        if actual and (longitudes[i] > razon * longitudes[actual[0]] or (len(actual) + 1) * ancho > max_elementos):
+            grupos.append(actual)
+            actual = []
+        actual.append(int(i))
+    if actual:
+        grupos.append(actual)
+    return grupos
+
+
+def sosfiltfilt_lote(sos, senales, razon=None, max_elementos=None):
+    """Equivalente a sosfiltfilt para registros de distinta longitud, en pasadas 2-D por grupos
+
+    Los registros se agrupan por longitud parecida (ver LOTE_FILTRADO) y cada
+    grupo se empaqueta en una matriz con relleno a la derecha, así un registro
+    continuo muy largo no obliga a rellenar todos los demás hasta su longitud.
+    La extensión impar de cada fila se arma con índices por fila y la pasada
+    hacia atrás arranca en el último valor válido de cada registro, por lo que
+    el relleno nunca influye en las muestras útiles.
+    """
+    longitudes = np.array([len(x) for x in senales], dtype=np.int64)
+    if len(longitudes) == 0:
+        return []
+    p = _padlen(sos)
+    if longitudes.min() <= p:
+        raise ValueError(f"Cada registro debe tener más de {p} muestras para el filtrado de fase cero.")
+
+    salida = [None] * len(senales)
+    grupos = _grupos_por_longitud(
+        longitudes, p,
+        LOTE_FILTRADO['razon_longitud'] if razon is None else razon,
+        LOTE_FILTRADO['max_elementos'] if max_elementos is None else max_elementos,
+    )
+    for grupo in grupos:
+        filtradas = _sosfiltfilt_matriz(sos, [senales[i] for i in grupo], longitudes[grupo], p)
+        for i, filtrada in zip(grupo, filtradas):
+            salida[i] = filtrada
+    return salida
+
+
+def _sosfiltfilt_matriz(sos, senales, longitudes, p):
+    """sosfiltfilt de un grupo de registros empaquetados en una sola matriz"""
+    filas = len(senales)
+    n_max = longitudes.max()
+    ancho = n_max + 2 * p
+    extendida = np.zeros((filas, ancho))
+    for i, senal in enumerate(senales):
+        extendida[i, p:p + len(senal)] = senal
+
+    # Extensión impar por fila: el inicio está alineado en todas las filas y el
+    # final se arma con índices por fila (solo p columnas por registro)
+    x = extendida[:, p:p + n_max]
+    extendida[:, :p] = 2 * x[:, :1] - x[:, p:0:-1]
+    filas_idx = np.arange(filas)[:, None]
+    k = np.arange(p)[None, :]
+    n = longitudes[:, None]
+    ultimo = x[filas_idx, n - 1]
+    extendida[filas_idx, p + n + k] = 2 * ultimo - x[filas_idx, n - 2 - k]
+
+    from scipy.signal import sosfilt, sosfilt_zi
+
+    zi = sosfilt_zi(sos)[:, None, :]
+    y, _ = sosfilt(sos, extendida, axis=-1, zi=zi * extendida[None, :, :1])
+
+    # Pasada hacia atrás: cada fila se invierte desde su último valor válido (m - 1)
+    m = n + 2 * p
+    base = (np.arange(filas) * ancho)[:, None]
+    j = np.arange(ancho)[None, :]
+    invertida = y.ravel()[base + np.maximum(m - 1 - j, 0)]
+    y, _ = sosfilt(sos, invertida, axis=-1, zi=zi * invertida[None, :, :1])
+
+    salida = y.ravel()[base + np.maximum(m - 1 - p - j[:, :n_max], 0)]
+    return [salida[i, :longitudes[i]] for i in range(filas)]
+
+
+def filtrar_pasabanda_lote(senales, parametros=PARAMETROS_FILTRO):
+    """Filtro pasabanda de fase cero aplicado a todos los registros a la vez"""
+    sos = disenar_pasabanda(parametros['low_cutoff'], parametros['high_cutoff'],
+                            parametros['fs'], parametros['orden'])
+    with etapa('filtrado.pasabanda'):
+        return sosfiltfilt_lote(sos, senales)
+
+
+@lru_cache(maxsize=1024)
+def _seccion_notch(f0, Q, fs):
+    """Coeficientes de un notch como una sección SOS [b0 b1 b2 a0 a1 a2]"""
+    from scipy.signal import iirnotch
+
+    b, a = iirnotch(f0, Q, fs)
+    return np.concatenate([b, a])
+
+
+def disenar_banco_notch(frecuencias, Q, fs):
+    """Cascada de notch en una sola matriz SOS, en el mismo orden que las frecuencias"""
+    return np.vstack([_seccion_notch(float(f0), Q, fs) for f0 in frecuencias])
+
+
+def identificar_ruidos_lote(senales, fs, num_ruidos=4):
+    """Frecuencias de ruido de cada registro con una rfft por grupo de igual longitud"""
+    from scipy.fft import rfft
+
+    frecuencias = [None] * len(senales)
+    grupos = {}
+    for i, senal in enumerate(senales):
+        grupos.setdefault(len(senal), []).append(i)
+
+    for N, posiciones in grupos.items():
+        # Misma escala de frecuencias que la versión original con fft completa
+        xf = np.linspace(0.0, fs / 2, N // 2)
+        magnitudes = np.abs(rfft(np.stack([senales[i] for i in posiciones]), axis=-1)[:, :N // 2])
+        # argpartition aísla los picos y solo ellos se ordenan (orden ascendente como argsort)
+        picos = np.argpartition(magnitudes, -num_ruidos, axis=-1)[:, -num_ruidos:]
+        orden = np.argsort(np.take_along_axis(magnitudes, picos, axis=-1), axis=-1)
+        indices_ruido = np.take_along_axis(picos, orden, axis=-1)
+        for i, indices in zip(posiciones, indices_ruido):
+            frecuencias[i] = xf[indices]
+    return frecuencias
+
+
+def filtrar_notch_lote(senales, parametros=PARAMETROS_FILTRO):
+    """Detecta y elimina las frecuencias de ruido de cada registro con una sola pasada SOS"""
+    from scipy.signal import sosfilt
+
+    fs, Q = parametros['fs'], parametros['Q']
+    with etapa('filtrado.deteccion_notch'):
+        frecuencias = identificar_ruidos_lote(senales, fs, parametros['num_ruidos'])
+    with etapa('filtrado.aplicacion_notch'):
+        return [sosfilt(disenar_banco_notch(f, Q, fs), senal) for senal, f in zip(senales, frecuencias)]
+
+
+def preprocesar_lote(senales, parametros=PARAMETROS_FILTRO):
+    """Pasabanda de fase cero seguido del banco de notch para una lista de registros"""
+    return filtrar_notch_lote(filtrar_pasabanda_lote(senales, parametros), parametros)
+
+
+def _preprocesar_tramos(nombre_entrada, nombre_salida, total, tramos, parametros):
+    """Trabajo de un proceso: lee sus registros y escribe el resultado en memoria compartida"""
+    entrada = shared_memory.SharedMemory(name=nombre_entrada)
+    salida = shared_memory.SharedMemory(name=nombre_salida)
+    try:
+        valores = np.ndarray((total,), dtype=np.float64, buffer=entrada.buf)
+        filtrada = np.ndarray((total,), dtype=np.float64, buffer=salida.buf)
+        senales = preprocesar_lote([valores[inicio:fin] for inicio, fin in tramos], parametros)
+        for (inicio, fin), senal in zip(tramos, senales):
+            filtrada[inicio:fin] = senal
+        # Liberar las vistas antes de cerrar los segmentos
+        del valores, filtrada, senales
+    finally:
+        entrada.close()
+        salida.close()
+    return len(tramos)
+
+
+def preprocesar_registros(valores, rebanadas, parametros=PARAMETROS_FILTRO, procesos=1, registros_por_tarea=8):
+    """Filtra los registros indicados de una columna; el resto queda en NaN
+
+    Con procesos > 1 (o None = todos los núcleos) los registros se reparten en
+    lotes de registros_por_tarea entre un ProcessPoolExecutor. La señal y el
+    resultado viajan por memoria compartida: cada proceso solo recibe nombres y
+    desplazamientos, nunca arreglos ni DataFrames serializados.
+    """
+    valores = np.ascontiguousarray(valores, dtype=np.float64)
+    tramos = [(r.start, r.stop) for r in rebanadas]
+    if procesos is None:
+        procesos = os.cpu_count() or 1
+    procesos = min(procesos, max(1, -(-len(tramos) // registros_por_tarea)))
+
+    if procesos <= 1:
+        filtrada = np.full(len(valores), np.nan)
+        senales = preprocesar_lote([valores[inicio:fin] for inicio, fin in tramos], parametros)
+        for (inicio, fin), senal in zip(tramos, senales):
+            filtrada[inicio:fin] = senal
+        return filtrada
+
+    total = len(valores)
+    tamano = max(valores.nbytes, 1)
+    entrada = shared_memory.SharedMemory(create=True, size=tamano)
+    salida = shared_memory.SharedMemory(create=True, size=tamano)
+    try:
+        np.ndarray((total,), dtype=np.float64, buffer=entrada.buf)[:] = valores
+        np.ndarray((total,), dtype=np.float64, buffer=salida.buf)[:] = np.nan
+
+        lotes = [tramos[i:i + registros_por_tarea] for i in range(0, len(tramos), registros_por_tarea)]
+        with ProcessPoolExecutor(max_workers=procesos) as pool:
+            futuros = [pool.submit(_preprocesar_tramos, entrada.name, salida.name, total, lote, dict(parametros))
+                       for lote in lotes]
+            for futuro in futuros:
+                futuro.result()  # Propaga la primera excepción de un proceso
+
+        return np.ndarray((total,), dtype=np.float64, buffer=salida.buf).copy()
+    finally:
+        entrada.close()
+        entrada.unlink()
+        salida.close()
+        salida.unlink()
+
+
+def disenar_cadena_causal(parametros=PARAMETROS_FILTRO, frecuencias_notch=NOTCH_STREAMING):
+    """Pasabanda y notch en una sola matriz SOS para filtrado causal"""
+    fs = parametros['fs']
+    secciones = [disenar_pasabanda(parametros['low_cutoff'], parametros['high_cutoff'], fs, parametros['orden'])]
+    if len(frecuencias_notch):
+        secciones.append(disenar_banco_notch(frecuencias_notch, parametros['Q'], fs))
+    return np.vstack(secciones)
+
+
+def filtrar_causal(senal, parametros=PARAMETROS_FILTRO, frecuencias_notch=NOTCH_STREAMING):
+    """Referencia fuera de línea: la misma cadena causal aplicada a la señal completa"""
+    from scipy.signal import sosfilt, sosfilt_zi
+
+    senal = np.asarray(senal, dtype=np.float64)
+    if len(senal) == 0:
+        return senal.copy()
+    sos = disenar_cadena_causal(parametros, frecuencias_notch)
+    # Estado inicial en régimen permanente para el primer valor (evita el transitorio del offset del ADC)
+    salida, _ = sosfilt(sos, senal, zi=sosfilt_zi(sos) * senal[0])
+    return salida
+
+
+class FiltroStreaming:
+    """Cadena causal pasabanda + notch que conserva el estado zi entre bloques
+
+    Aplicar procesar() bloque a bloque produce exactamente la misma salida que
+    filtrar_causal() sobre la señal completa. Cada llamada mide su latencia; los
+    bloques que superan presupuesto_ms se cuentan en `excedidos`.
+    """
+
+    def __init__(self, parametros=PARAMETROS_FILTRO, frecuencias_notch=NOTCH_STREAMING,
+                 presupuesto_ms=5.0, historial=1000):
+        self.sos = disenar_cadena_causal(parametros, frecuencias_notch)
+        self.presupuesto_ms = presupuesto_ms
+        self.latencias_ms = deque(maxlen=historial)
+        self.reiniciar()
+
+    def reiniciar(self):
+        """Descarta el estado para empezar una señal nueva"""
+        self.zi = None
+        self.muestras = 0
+        self.bloques = 0
+        self.excedidos = 0
+        self.latencia_maxima_ms = 0.0
+        self.latencias_ms.clear()
+
+    def procesar(self, bloque):
+        """Filtra un bloque de muestras nuevas y devuelve el bloque filtrado"""
+        from scipy.signal import sosfilt, sosfilt_zi
+
+        inicio = time.perf_counter()
+        x = np.asarray(bloque, dtype=np.float64)
+        if len(x) == 0:
+            return np.empty(0)
+        if self.zi is None:
+            self.zi = sosfilt_zi(self.sos) * x[0]
+        salida, self.zi = sosfilt(self.sos, x, zi=self.zi)
+
+        latencia = (time.perf_counter() - inicio) * 1e3
+        self.latencias_ms.append(latencia)
+        self.latencia_maxima_ms = max(self.latencia_maxima_ms, latencia)
+        self.excedidos += latencia > self.presupuesto_ms
+        self.muestras += len(x)
+        self.bloques += 1
+        return salida
+
+    @property
+    def latencia_media_ms(self):
+        """Latencia media de los últimos bloques"""
+        return float(np.mean(self.latencias_ms)) if self.latencias_ms else 0.0
@@ -0,0 +1,424 @@
+# ====================
+# BIBLIOTECAS ESTÁNDAR
+# ====================
+import argparse
+import multiprocessing
+import os
+import socket
+import sys
+import threading
+import time
+
+# ====================
+# MANEJO DE DATOS
+# ====================
+import numpy as np
+
+# ====================
+# ADQUISICIÓN
+# ====================
+from adquisicion import MUESTRAS_POR_TRAMA, TAMANO_TRAMA, MotorAdquisicion, codificar_tramas
+from procesamiento import PARAMETROS_FILTRO
+
+
+# Dispositivo serial simulado: reemplaza al Arduino para probar y medir la captura
+# sin hardware. Reproduce EMG grabado o sintético a una tasa dada, limitada por los
+# baudios, en protocolo de texto (una lectura por línea, como Serial.println) o en
+# tramas binarias, con jitter en el envío y muestras perdidas opcionales.
+#
+# El puerto que se escribe en la ventana de captura es:
+#   - pty (Linux/macOS): la ruta /dev/pts/N que imprime el simulador
+#   - tcp (cualquier sistema): la URL socket://127.0.0.1:PUERTO
+#
+#   python -m simulador_serial servir --pty --tasa 1000 --protocolo texto
+#   python -m simulador_serial servir --tcp 7000 --archivo datos.xlsx --jitter 2 --perdidas 0.01
+#   python -m simulador_serial medir --protocolo binario --baudios 1000000
+PARAMETROS_SIMULADOR = {
+    'tasa': PARAMETROS_FILTRO['fs'],  # Muestras por segundo a emitir
+    'baudios': 115200,
+    'protocolo': 'texto',
+    'jitter_ms': 0.0,  # Desviación del retardo entre bloques enviados
+    'perdidas': 0.0,  # Fracción de muestras (texto) o tramas (binario) que no se envían
+    'bloque_ms': 5.0,  # Periodo nominal entre escrituras al puerto
+}
+BITS_POR_BYTE = 10  # 8N1: bit de inicio + 8 de datos + bit de parada
+# Rampa de tasas (muestras/s) para medir la máxima tasa sostenida
+TASAS_MEDICION = [1000, 2000, 5000, 10000, 20000, 50000, 100000]
+
+
+def muestras_fuente(archivo=None, muestras=60000, semilla=0):
+    """Lecturas del ADC (uint16) a reproducir en bucle
+
+    Con archivo se usan las lecturas crudas de un Excel, almacén EMG o grabación
+    (manifest.json); si no, un registro sintético de flexión.
+    """
+    if archivo:
+        from pipeline import cargar_datos
+        df, _ = cargar_datos(archivo)
+        valores = df['Valor lectura'].to_numpy(dtype=np.float64)
+    else:
+        from sintetico import generar_registro
+        valores = generar_registro(muestras, 13, np.random.default_rng(semilla))
+    if len(valores) == 0:
+        raise ValueError("La fuente no contiene lecturas para reproducir.")
+    return np.clip(np.rint(valores), 0, np.iinfo(np.uint16).max).astype(np.uint16)
+
+
+# ====================
+# TRANSPORTES
+# ====================
+class TransportePty:
+    """Pseudo-terminal: el lector abre la ruta del extremo esclavo como un puerto serial"""
+
+    def __init__(self):
+        if not hasattr(os, 'openpty'):
+            raise ValueError("Este sistema no tiene pseudo-terminales; use el transporte tcp.")
+        import tty
+        self._maestro, self._esclavo = os.openpty()
+        # Sin eco ni traducción de fin de línea, como un puerto serial real
+        tty.setraw(self._esclavo)
+        os.set_blocking(self._maestro, False)
+        self.url = os.ttyname(self._esclavo)
+
+    def escribir(self, datos):
+        """Bytes aceptados; lo que no cabe en el buffer de la pty se pierde, igual que sin control de flujo"""
+        try:
+            return os.write(self._maestro, datos)
+        except (BlockingIOError, InterruptedError):
+            return 0
+
+    def cerrar(self):
+        for fd in (self._maestro, self._esclavo):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+
+class TransporteTcp:
+    """Servidor TCP para la URL socket:// de pyserial; atiende un cliente a la vez"""
+
+    def __init__(self, puerto=0, host="127.0.0.1"):
+        self._servidor = socket.create_server((host, puerto))
+        self._servidor.setblocking(False)
+        self._cliente = None
+        self.url = f"socket://{host}:{self._servidor.getsockname()[1]}"
+
+    def escribir(self, datos):
+        """Bytes aceptados; sin cliente conectado los datos se descartan"""
+        if self._cliente is None:
+            try:
+                self._cliente, _ = self._servidor.accept()
+            except BlockingIOError:
+                return 0
+            self._cliente.setblocking(False)
+            self._cliente.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        try:
+            return self._cliente.send(datos)
+        except BlockingIOError:
+            return 0
+        except OSError:
+            # El lector cerró el puerto: esperar al siguiente
+            self._cliente.close()
+            self._cliente = None
+            return 0
+
+    def cerrar(self):
+        if self._cliente is not None:
+            self._cliente.close()
+        self._servidor.close()
+
+
+TRANSPORTES = {'pty': TransportePty, 'tcp': TransporteTcp}
+
+
+# ====================
+# DISPOSITIVO
+# ====================
+class DispositivoSimulado:
+    """Emite las muestras de la fuente en bloques a la tasa pedida"""
+
+    def __init__(self, muestras, tasa=None, baudios=None, protocolo=None, jitter_ms=None, perdidas=None,
+                 bloque_ms=None, semilla=0):
+        def valor(nombre, dado):
+            return PARAMETROS_SIMULADOR[nombre] if dado is None else dado
+
+        self.muestras = np.asarray(muestras, dtype=np.uint16)
+        self.protocolo = valor('protocolo', protocolo)
+        if self.protocolo not in ("texto", "binario"):
+            raise ValueError(f"Protocolo desconocido: {self.protocolo}")
+        self.baudios = valor('baudios', baudios)
+        self.jitter_ms = valor('jitter_ms', jitter_ms)
+        self.perdidas = valor('perdidas', perdidas)
+        self.bloque_ms = valor('bloque_ms', bloque_ms)
+        self._rng = np.random.default_rng(semilla)
+
+        # Los baudios limitan la tasa: bytes por muestra según el formato de línea
+        if self.protocolo == "binario":
+            self.bytes_por_muestra = TAMANO_TRAMA / MUESTRAS_POR_TRAMA
+        else:
+            self.bytes_por_muestra = float(np.mean(np.char.str_len(self.muestras.astype(str)))) + 2  # "\r\n"
+        self.tasa_maxima = self.baudios / BITS_POR_BYTE / self.bytes_por_muestra
+        self.tasa_pedida = valor('tasa', tasa)
+        self.tasa = min(self.tasa_pedida, self.tasa_maxima)
+
+        self._posicion = 0
+        self._secuencia = 0
+        self.reiniciar_contadores()
+
+    def reiniciar_contadores(self):
+        self.generadas = 0  # Muestras producidas por el "ADC", incluidas las perdidas a propósito
+        self.omitidas = 0  # Muestras descartadas por la opción de pérdidas
+        self.bytes_enviados = 0
+        self.bytes_desbordados = 0  # Bytes que el puerto no aceptó (el lector no vació a tiempo)
+
+    def _siguientes(self, n):
+        """Las próximas n muestras de la fuente, volviendo al inicio al terminar"""
+        indices = (self._posicion + np.arange(n)) % len(self.muestras)
+        self._posicion = int((self._posicion + n) % len(self.muestras))
+        return self.muestras[indices]
+
+    def codificar(self, valores):
+        """Bytes a enviar por el puerto para `valores`, aplicando las pérdidas"""
+        if self.protocolo == "binario":
+            n = len(valores) // MUESTRAS_POR_TRAMA
+            tramas = np.frombuffer(codificar_tramas(valores, self._secuencia), dtype=np.uint8).reshape(n, TAMANO_TRAMA)
+            self._secuencia = (self._secuencia + n) & 0xFFFF
+            if self.perdidas > 0:
+                # La trama completa se pierde; el salto de secuencia lo detecta el decodificador
+                conservar = self._rng.random(n) >= self.perdidas
+                self.omitidas += int(n - np.count_nonzero(conservar)) * MUESTRAS_POR_TRAMA
+                tramas = tramas[conservar]
+            return tramas.tobytes()
+
+        if self.perdidas > 0:
+            conservar = self._rng.random(len(valores)) >= self.perdidas
+            self.omitidas += int(len(valores) - np.count_nonzero(conservar))
+            valores = valores[conservar]
+        if len(valores) == 0:
+            return b""
+        return ("\r\n".join(valores.astype(str)) + "\r\n").encode("ascii")
+
+    def servir(self, transporte, detener, duracion=None):
+        """Escribe en el transporte hasta que se active `detener` o pase `duracion` (s)
+
+        Cada ciclo envía las muestras que el ADC habría producido desde el inicio,
+        de modo que el jitter cambia el tamaño de los bloques pero no la tasa media.
+        """
+        multiplo = MUESTRAS_POR_TRAMA if self.protocolo == "binario" else 1
+        # Si el lector se atrasa no se acumula más de un segundo de datos en un bloque
+        maximo_bloque = max(multiplo, int(self.tasa) // multiplo * multiplo)
+        periodo = self.bloque_ms / 1e3
+        producidas = 0  # Independiente de los contadores, que pueden reiniciarse mientras se sirve
+        inicio = time.perf_counter()
+        while not detener.is_set():
+            transcurrido = time.perf_counter() - inicio
+            if duracion is not None and transcurrido >= duracion:
+                break
+            debidas = int(transcurrido * self.tasa) - producidas
+            if debidas > maximo_bloque:
+                # Lo que no se pudo emitir a tiempo se pierde, como en un ADC que no espera
+                producidas += debidas - maximo_bloque
+                self.generadas += debidas - maximo_bloque
+                debidas = maximo_bloque
+            n = debidas // multiplo * multiplo
+            if n > 0:
+                datos = self.codificar(self._siguientes(n))
+                producidas += n
+                self.generadas += n
+                enviados = transporte.escribir(datos) if datos else 0
+                self.bytes_enviados += enviados
+                self.bytes_desbordados += len(datos) - enviados
+
+            espera = periodo
+            if self.jitter_ms > 0:
+                espera += self._rng.normal(0.0, self.jitter_ms / 1e3)
+            time.sleep(max(espera, 0.0))
+
+    def estadisticas(self):
+        return {
+            'tasa_pedida': self.tasa_pedida,
+            'tasa': self.tasa,
+            'tasa_maxima_baudios': self.tasa_maxima,
+            'generadas': self.generadas,
+            'omitidas': self.omitidas,
+            'bytes_enviados': self.bytes_enviados,
+            'bytes_desbordados': self.bytes_desbordados,
+        }
+
+
+def _servir_en_proceso(muestras, opciones, transporte, conexion, detener):
+    """Proceso del simulador: publica la URL, sirve hasta `detener` y devuelve las estadísticas"""
+    try:
+        canal = TRANSPORTES[transporte]()
+        dispositivo = DispositivoSimulado(muestras, **opciones)
+    except Exception as e:
+        conexion.send(('error', str(e)))
+        return
+    conexion.send(('url', canal.url))
+    hilo = threading.Thread(target=dispositivo.servir, args=(canal, detener), daemon=True)
+    hilo.start()
+    # El proceso principal pide reiniciar los contadores cuando el lector ya abrió el puerto
+    while not detener.is_set():
+        if conexion.poll(0.05) and conexion.recv() == 'reiniciar':
+            dispositivo.reiniciar_contadores()
+    hilo.join()
+    conexion.send(('estadisticas', dispositivo.estadisticas()))
+    # Cerrar la pty antes de que el lector termine le daría un error de lectura
+    conexion.poll(10)
+    canal.cerrar()
+
+
+# ====================
+# MEDICIÓN
+# ====================
+def medir_tasa(muestras, tasa, protocolo="texto", baudios=1000000, duracion=3.0, transporte="pty",
+               jitter_ms=0.0, perdidas=0.0, intervalo_lectura_ms=33):
+    """Captura `duracion` segundos con MotorAdquisicion desde un simulador a `tasa`
+
+    El simulador corre en otro proceso para no competir por el GIL con el hilo de
+    adquisición. El consumidor vacía el buffer cada intervalo_lectura_ms, como la
+    vista en vivo de la ventana de captura. Es sostenible si llega al menos el 98 %
+    de lo enviado, sin desbordes del puerto ni pérdidas aparte de las inyectadas.
+    """
+    contexto = multiprocessing.get_context()
+    detener = contexto.Event()
+    conexion, conexion_hijo = contexto.Pipe()
+    opciones = {'tasa': tasa, 'baudios': baudios, 'protocolo': protocolo, 'jitter_ms': jitter_ms,
+                'perdidas': perdidas}
+    proceso = contexto.Process(target=_servir_en_proceso, name="simulador-serial", daemon=True,
+                               args=(muestras, opciones, transporte, conexion_hijo, detener))
+    proceso.start()
+    try:
+        tipo, valor = conexion.recv()
+        if tipo == 'error':
+            raise ValueError(valor)
+
+        motor = MotorAdquisicion(valor, baudios, protocolo=protocolo)
+        motor.iniciar()
+        conexion.send('reiniciar')
+        leidas = 0
+        fin = time.perf_counter() + duracion
+        while time.perf_counter() < fin and motor.activo:
+            time.sleep(intervalo_lectura_ms / 1e3)
+            leidas += len(motor.buffer.leer()[0])
+
+        # Dejar de emitir y dar tiempo al lector para vaciar lo que quedó en tránsito
+        detener.set()
+        tipo, estadisticas = conexion.recv()
+        recibidas = -1
+        while motor.activo and motor.muestras != recibidas:
+            recibidas = motor.muestras
+            time.sleep(0.2)
+            leidas += len(motor.buffer.leer()[0])
+        motor.detener()
+        motor.esperar()
+        conexion.send('cerrar')
+        if motor.error is not None:
+            raise motor.error
+        leidas += len(motor.buffer.leer()[0])
+    finally:
+        detener.set()
+        proceso.join(5)
+        if proceso.is_alive():
+            proceso.terminate()
+
+    enviadas = estadisticas['generadas'] - estadisticas['omitidas']
+    perdidas_lector = motor.buffer.descartadas
+    if protocolo == "binario":
+        # Las tramas omitidas a propósito también aparecen como saltos de secuencia
+        perdidas_lector += max(motor.decodificador.tramas_perdidas * MUESTRAS_POR_TRAMA
+                               - estadisticas['omitidas'], 0)
+        perdidas_lector += motor.decodificador.tramas_corruptas * MUESTRAS_POR_TRAMA
+    else:
+        perdidas_lector += motor.decodificador.lineas_invalidas
+    tasa_medida = motor.tasa_muestreo()
+    return {
+        **estadisticas,
+        'protocolo': protocolo,
+        'baudios': baudios,
+        'enviadas': enviadas,
+        'recibidas': motor.muestras,
+        'leidas': leidas,
+        'tasa_medida': tasa_medida,
+        'perdidas_lector': perdidas_lector,
+        'sostenible': (estadisticas['bytes_desbordados'] == 0 and perdidas_lector == 0
+                       and motor.muestras >= 0.98 * enviadas),
+    }
+
+
+def medir_tasa_maxima(muestras, tasas=None, protocolo="texto", baudios=1000000, duracion=3.0, transporte="pty",
+                      avisar=print):
+    """Recorre la rampa de tasas hasta la primera no sostenible; devuelve (tasa máxima, filas)"""
+    filas = []
+    maxima = 0.0
+    for tasa in tasas or TASAS_MEDICION:
+        fila = medir_tasa(muestras, tasa, protocolo, baudios, duracion, transporte)
+        filas.append(fila)
+        marca = "✅" if fila['sostenible'] else "❌"
+        avisar(f"{marca} {fila['tasa']:>10.0f} muestras/s → {fila['tasa_medida']:>10.0f} medidas, "
+               f"{fila['recibidas']}/{fila['enviadas']} recibidas, {fila['bytes_desbordados']} bytes desbordados")
+        if not fila['sostenible']:
+            break
+        maxima = fila['tasa_medida']
+        if fila['tasa'] < fila['tasa_pedida']:
+            avisar(f"⚠️ {baudios} baudios no permiten más de {fila['tasa_maxima_baudios']:.0f} muestras/s")
+            break
+    return maxima, filas
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Dispositivo serial simulado para probar la adquisición")
+    subparsers = parser.add_subparsers(dest="comando", required=True)
+
+    comunes = argparse.ArgumentParser(add_help=False)
+    comunes.add_argument("--archivo", default=None, help="Excel, almacén .emg o manifest.json a reproducir")
+    comunes.add_argument("--protocolo", choices=["texto", "binario"], default=PARAMETROS_SIMULADOR['protocolo'])
+    comunes.add_argument("--baudios", type=int, default=None)
+    comunes.add_argument("--semilla", type=int, default=0)
+
+    servir = subparsers.add_parser("servir", parents=[comunes], help="Emite datos hasta interrumpir con Ctrl+C")
+    destino = servir.add_mutually_exclusive_group()
+    destino.add_argument("--pty", action="store_true", help="Crear una pseudo-terminal (por defecto)")
+    destino.add_argument("--tcp", type=int, metavar="PUERTO", help="Servir en socket://127.0.0.1:PUERTO")
+    servir.add_argument("--tasa", type=float, default=PARAMETROS_SIMULADOR['tasa'], help="Muestras por segundo")
+    servir.add_argument("--jitter", type=float, default=0.0, help="Jitter del envío (ms)")
+    servir.add_argument("--perdidas", type=float, default=0.0, help="Fracción de muestras perdidas")
+    servir.add_argument("--duracion", type=float, default=None, help="Segundos a emitir (por defecto, sin límite)")
+
+    medir = subparsers.add_parser("medir", parents=[comunes], help="Mide la máxima tasa que sostiene el lector")
+    medir.add_argument("--transporte", choices=list(TRANSPORTES), default="pty" if hasattr(os, 'openpty') else "tcp")
+    medir.add_argument("--tasas", type=float, nargs="+", default=None, help="Rampa de tasas a probar")
+    medir.add_argument("--duracion", type=float, default=3.0, help="Segundos por tasa")
+    args = parser.parse_args(argv)
+
+    muestras = muestras_fuente(args.archivo, semilla=args.semilla)
+
+    if args.comando == "servir":
+        canal = TransporteTcp(args.tcp) if args.tcp is not None else TransportePty()
+        dispositivo = DispositivoSimulado(muestras, args.tasa, args.baudios, args.protocolo, args.jitter,
+                                          args.perdidas, semilla=args.semilla)
+        if dispositivo.tasa < dispositivo.tasa_pedida:
+            print(f"⚠️ {dispositivo.baudios} baudios limitan la tasa a {dispositivo.tasa:.0f} muestras/s")
+        print(f"🔌 Puerto del simulador: {canal.url} ({dispositivo.protocolo}, {dispositivo.baudios} baudios, "
+              f"{dispositivo.tasa:.0f} muestras/s)", flush=True)
+        try:
+            dispositivo.servir(canal, threading.Event(), args.duracion)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            canal.cerrar()
+        estadisticas = dispositivo.estadisticas()
+        print(f"📤 {estadisticas['generadas']} muestras generadas, {estadisticas['omitidas']} omitidas, "
+              f"{estadisticas['bytes_desbordados']} bytes desbordados")
+        return 0
+
+    baudios = args.baudios or max(PARAMETROS_SIMULADOR['baudios'], 1000000)
+    print(f"⏱️  Midiendo {args.protocolo} a {baudios} baudios por {args.transporte}...")
+    maxima, _ = medir_tasa_maxima(muestras, args.tasas, args.protocolo, baudios, args.duracion, args.transporte)
+    print(f"📈 Máxima tasa sostenida: {maxima:.0f} muestras/s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
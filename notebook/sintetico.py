@@ -0,0 +1,131 @@
+# ====================
+# BIBLIOTECAS ESTÁNDAR
+# ====================
+import argparse
+
+# ====================
+# MANEJO DE DATOS
+# ====================
+import numpy as np
+import pandas as pd
+
+# ====================
+# PROCESAMIENTO
+# ====================
+from procesamiento import PARAMETROS_FILTRO
+
+
+# Generador de EMG sintético con el mismo formato que los archivos de laboratorio
+# (Sujeto, Movimiento_ID, Tiempo (s), Muestra, Valor lectura). Sirve para medir
+# rendimiento y probar el pipeline sin hardware ni datos reales.
+#
+# Cada registro es ruido limitado en banda que se activa en ráfagas (contracciones),
+# montado sobre el offset del ADC, con interferencia de la red eléctrica y ruido
+# blanco. Flexión y extensión difieren en la banda y la amplitud de las ráfagas para
+# que el clasificador tenga algo que aprender.
+PARAMETROS_SINTETICO = {
+    'fs': PARAMETROS_FILTRO['fs'],  # Frecuencia de muestreo (Hz)
+    'offset': 512.0,  # Nivel medio del ADC de 10 bits
+    'red': 60.0,  # Frecuencia de la red eléctrica (Hz)
+    'armonicos': 3,  # Armónicos de la red presentes (60, 120, 180 Hz)
+    'amplitud_red': 15.0,  # Amplitud de la interferencia (cuentas del ADC)
+    'ruido': 5.0,  # Desviación del ruido blanco de fondo
+    'rafagas_por_segundo': 0.8,  # Contracciones por segundo
+    'duracion_rafaga': (0.3, 1.2),  # Duración de cada contracción (s)
+}
+# Banda (Hz) y amplitud de las ráfagas de cada movimiento
+MOVIMIENTOS_SINTETICOS = {
+    13: {'banda': (30.0, 120.0), 'amplitud': 120.0},  # Flexión
+    14: {'banda': (60.0, 180.0), 'amplitud': 90.0},  # Extensión
+}
+
+
+def ruido_en_banda(n, banda, fs, rng):
+    """Ruido gaussiano limitado a `banda` (Hz) por enmascarado en frecuencia, con varianza unitaria"""
+    espectro = np.fft.rfft(rng.standard_normal(n))
+    frecuencias = np.fft.rfftfreq(n, 1 / fs)
+    espectro[(frecuencias < banda[0]) | (frecuencias > banda[1])] = 0
+    ruido = np.fft.irfft(espectro, n)
+    desviacion = ruido.std()
+    return ruido / desviacion if desviacion > 0 else ruido
+
+
+def envolvente_rafagas(n, fs, rng, rafagas_por_segundo, duracion):
+    """Envolvente en [0, 1] con contracciones de forma Hann en posiciones aleatorias"""
+    envolvente = np.zeros(n)
+    for _ in range(max(1, rng.poisson(rafagas_por_segundo * n / fs))):
+        largo = min(n, max(2, int(rng.uniform(*duracion) * fs)))
+        inicio = rng.integers(0, n - largo + 1)
+        np.maximum(envolvente[inicio:inicio + largo], np.hanning(largo), out=envolvente[inicio:inicio + largo])
+    return envolvente
+
+
+def generar_registro(muestras, movimiento_id, rng, parametros=PARAMETROS_SINTETICO, ganancia=1.0):
+    """Valores crudos (cuentas del ADC) de un registro de `muestras` muestras"""
+    fs = parametros['fs']
+    movimiento = MOVIMIENTOS_SINTETICOS[movimiento_id]
+    t = np.arange(muestras) / fs
+
+    activacion = envolvente_rafagas(muestras, fs, rng, parametros['rafagas_por_segundo'],
+                                    parametros['duracion_rafaga'])
+    emg = ganancia * movimiento['amplitud'] * activacion * ruido_en_banda(muestras, movimiento['banda'], fs, rng)
+
+    # Interferencia de la red (fundamental y armónicos con amplitud decreciente y fase aleatoria)
+    red = np.zeros(muestras)
+    for k in range(1, parametros['armonicos'] + 1):
+        if k * parametros['red'] < fs / 2:
+            red += parametros['amplitud_red'] / k * np.sin(2 * np.pi * k * parametros['red'] * t + rng.uniform(0, 2 * np.pi))
+
+    return parametros['offset'] + emg + red + parametros['ruido'] * rng.standard_normal(muestras)
+
+
+def generar_dataset(n_sujetos=8, muestras=5000, movimientos=(13, 14), repeticiones=1, parametros=None, semilla=0):
+    """DataFrame sintético con el formato de los archivos de laboratorio
+
+    muestras puede ser un entero (todos los registros iguales) o un par
+    (mínimo, máximo) para longitudes aleatorias. Cada sujeto tiene una ganancia
+    propia (electrodos, tejido) para que la división por sujeto no sea trivial.
+    """
+    parametros = {**PARAMETROS_SINTETICO, **(parametros or {})}
+    rng = np.random.default_rng(semilla)
+    fs = parametros['fs']
+    bloques = []
+    for s in range(1, n_sujetos + 1):
+        ganancia = rng.uniform(0.7, 1.3)
+        for movimiento_id in movimientos:
+            for _ in range(repeticiones):
+                n = int(muestras) if np.isscalar(muestras) else int(rng.integers(muestras[0], muestras[1] + 1))
+                bloques.append(pd.DataFrame({
+                    'Sujeto': f"Sujeto {s}",
+                    'Movimiento_ID': movimiento_id,
+                    'Tiempo (s)': np.arange(n) / fs,
+                    'Muestra': np.arange(n),
+                    'Valor lectura': generar_registro(n, movimiento_id, rng, parametros, ganancia),
+                }))
+    return pd.concat(bloques, ignore_index=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generador de señales EMG sintéticas")
+    parser.add_argument("--sujetos", type=int, default=8, help="Número de sujetos")
+    parser.add_argument("--muestras", type=int, nargs="+", default=[5000],
+                        help="Muestras por registro (un valor) o rango mínimo máximo (dos valores)")
+    parser.add_argument("--repeticiones", type=int, default=1, help="Registros por sujeto y movimiento")
+    parser.add_argument("--red", type=float, default=PARAMETROS_SINTETICO['red'], help="Frecuencia de la red (Hz)")
+    parser.add_argument("--amplitud-red", type=float, default=PARAMETROS_SINTETICO['amplitud_red'],
+                        help="Amplitud de la interferencia de red (cuentas)")
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--out", required=True, help="Destino: .xlsx, .csv o directorio de almacén .emg")
+    args = parser.parse_args()
+
+    muestras = args.muestras[0] if len(args.muestras) == 1 else tuple(args.muestras[:2])
+    df = generar_dataset(args.sujetos, muestras, repeticiones=args.repeticiones, semilla=args.semilla,
+                         parametros={'red': args.red, 'amplitud_red': args.amplitud_red})
+    if args.out.endswith(".xlsx"):
+        df.to_excel(args.out, index=False)
+    elif args.out.endswith(".csv"):
+        df.to_csv(args.out, index=False)
+    else:
+        from almacen import AlmacenEMG
+        AlmacenEMG.crear(args.out, df, origen="sintetico")
+    print(f"{args.out}: {df['Sujeto'].nunique()} sujetos, {len(df)} muestras")
@@ -0,0 +1,151 @@
+# ====================
+# BIBLIOTECAS ESTÁNDAR
+# ====================
+import time
+
+import numpy as np
+
+# ====================
+# ADQUISICIÓN
+# ====================
+from adquisicion import (CABECERA_TRAMA, MUESTRAS_POR_TRAMA, TAMANO_TRAMA, BufferCircular,
+                         DecodificadorBinario, MotorAdquisicion, codificar_tramas)
+
+
+def _bloque(inicio, n):
+    valores = np.arange(inicio, inicio + n, dtype=np.uint16)
+    return valores, valores.astype(np.int64) * 1000
+
+
+# ====================
+# BUFFER CIRCULAR
+# ====================
+def test_buffer_circular_da_la_vuelta():
+    buffer = BufferCircular(8)
+    esperado = []
+    inicio = 0
+    # Bloques que cruzan el final del arreglo en distintas posiciones
+    for n in (5, 6, 3, 8, 1, 7):
+        valores, tiempos = _bloque(inicio, n)
+        assert buffer.escribir(valores, tiempos) == n
+        assert len(buffer) == n
+        leidos, leidos_t = buffer.leer()
+        np.testing.assert_array_equal(leidos, valores)
+        np.testing.assert_array_equal(leidos_t, tiempos)
+        esperado.append(leidos)
+        inicio += n
+    assert len(buffer) == 0
+    assert buffer.descartadas == 0
+    np.testing.assert_array_equal(np.concatenate(esperado), np.arange(inicio))
+
+
+def test_buffer_circular_lecturas_parciales_en_el_borde():
+    buffer = BufferCircular(8)
+    buffer.escribir(*_bloque(0, 6))
+    buffer.leer()
+    # Dos escrituras sin leer: la segunda queda partida entre el final y el inicio
+    buffer.escribir(*_bloque(6, 1))
+    buffer.escribir(*_bloque(7, 4))
+    valores, tiempos = buffer.leer()
+    np.testing.assert_array_equal(valores, np.arange(6, 11))
+    np.testing.assert_array_equal(tiempos, np.arange(6, 11) * 1000)
+    assert buffer.leer()[0].size == 0
+
+
+def test_buffer_circular_lleno_descarta_lo_que_no_cabe():
+    buffer = BufferCircular(8)
+    assert buffer.escribir(*_bloque(0, 5)) == 5
+    assert buffer.escribir(*_bloque(5, 6)) == 3
+    assert buffer.descartadas == 3
+    assert buffer.escribir(*_bloque(11, 2)) == 0
+    assert buffer.descartadas == 5
+    valores, _ = buffer.leer()
+    # Se conservan las muestras más antiguas, las nuevas que no caben se pierden
+    np.testing.assert_array_equal(valores, np.arange(8))
+    assert buffer.escribir(*_bloque(20, 4)) == 4
+    np.testing.assert_array_equal(buffer.leer()[0], np.arange(20, 24))
+
+
+# ====================
+# PROTOCOLO BINARIO
+# ====================
+def _muestras(tramas, inicio=0):
+    return (np.arange(tramas * MUESTRAS_POR_TRAMA) + inicio) % 1024
+
+
+def test_decodificador_bloques_de_cualquier_tamano():
+    muestras = _muestras(50)
+    datos = codificar_tramas(muestras, secuencia_inicial=65530)  # La secuencia da la vuelta
+    decodificador = DecodificadorBinario()
+    rng = np.random.default_rng(0)
+    partes = []
+    i = 0
+    while i < len(datos):
+        n = int(rng.integers(1, 3 * TAMANO_TRAMA))
+        partes.append(decodificador.alimentar(datos[i:i + n]))
+        i += n
+    np.testing.assert_array_equal(np.concatenate(partes), muestras)
+    assert decodificador.tramas == 50
+    assert decodificador.tramas_perdidas == 0
+    assert decodificador.tramas_corruptas == 0
+    assert decodificador.bytes_descartados == 0
+
+
+def test_decodificador_descarta_tramas_con_checksum_invalido():
+    muestras = _muestras(5)
+    datos = bytearray(codificar_tramas(muestras))
+    datos[2 * TAMANO_TRAMA + 6] ^= 0x01  # Un bit de una muestra de la tercera trama
+    decodificador = DecodificadorBinario()
+    salida = decodificador.alimentar(bytes(datos))
+    esperado = np.delete(muestras.reshape(5, MUESTRAS_POR_TRAMA), 2, axis=0).ravel()
+    np.testing.assert_array_equal(salida, esperado)
+    assert decodificador.tramas == 4
+    assert decodificador.tramas_corruptas == 1
+    # La trama corrupta también es un hueco en la secuencia
+    assert decodificador.tramas_perdidas == 1
+
+
+def test_decodificador_resincroniza_tras_basura():
+    primera = codificar_tramas(_muestras(3), secuencia_inicial=0)
+    segunda = codificar_tramas(_muestras(3, inicio=100), secuencia_inicial=3)
+    # Basura con una cabecera falsa y una trama truncada antes de las tramas buenas
+    basura = b"\x01\x02" + CABECERA_TRAMA + b"\x07\x00\x99" + primera[:TAMANO_TRAMA - 4]
+    decodificador = DecodificadorBinario()
+    salida = np.concatenate([
+        decodificador.alimentar(basura + primera[:10]),
+        decodificador.alimentar(primera[10:] + b"\xff" * 5),
+        decodificador.alimentar(segunda),
+    ])
+    np.testing.assert_array_equal(salida, np.concatenate((_muestras(3), _muestras(3, inicio=100))))
+    assert decodificador.tramas == 6
+    assert decodificador.tramas_perdidas == 0
+    assert decodificador.bytes_descartados >= 5
+
+
+def test_decodificador_cuenta_tramas_perdidas():
+    datos = (codificar_tramas(_muestras(2), secuencia_inicial=65534)
+             + codificar_tramas(_muestras(2), secuencia_inicial=3))  # Faltan 0, 1 y 2
+    decodificador = DecodificadorBinario()
+    assert len(decodificador.alimentar(datos)) == 4 * MUESTRAS_POR_TRAMA
+    assert decodificador.tramas_perdidas == 3
+
+
+# ====================
+# MOTOR DE ADQUISICIÓN
+# ====================
+def test_motor_no_cuenta_las_muestras_descartadas():
+    # loop:// devuelve lo escrito; sin consumidor el buffer de 16 muestras se llena
+    motor = MotorAdquisicion("loop://", 115200, capacidad=16, protocolo="binario")
+    motor.iniciar()
+    try:
+        motor._ser.write(codificar_tramas(_muestras(10)))
+        limite_espera = time.monotonic() + 5
+        while motor.buffer.descartadas + motor.muestras < 80 and time.monotonic() < limite_espera:
+            time.sleep(0.01)
+    finally:
+        motor.detener()
+        motor.esperar(2)
+    assert motor.error is None
+    assert motor.muestras == len(motor.buffer) == 16
+    assert motor.buffer.descartadas == 80 - 16
+    np.testing.assert_array_equal(motor.buffer.leer()[0], _muestras(2))
@@ -0,0 +1,184 @@
+# ====================
+# BIBLIOTECAS ESTÁNDAR
+# ====================
+import os
+
+import numpy as np
+import pytest
+import pywt
+from scipy.signal import hilbert
+from scipy.stats import entropy
+
+# ====================
+# CARACTERÍSTICAS
+# ====================
+from caracteristicas import GRAFO, CacheCaracteristicas, extraer_caracteristicas_lote
+
+
+def _referencia(senal, fs=1000, wavelet='db4'):
+    """Fórmulas originales por señal (extraer_caracteristicas_avanzadas de la versión inicial)"""
+    skewness = np.mean(((senal - np.mean(senal)) / np.std(senal)) ** 3)
+    kurtosis = np.mean(((senal - np.mean(senal)) / np.std(senal)) ** 4)
+
+    fft_vals = np.fft.fft(senal)
+    freqs = np.fft.fftfreq(len(senal), 1/fs)
+    magnitudes = np.abs(fft_vals)
+
+    coeffs = pywt.wavedec(senal, wavelet, level=4)
+    energia_total = sum([np.sum(c**2) for c in coeffs])
+    caracteristicas_wavelet = []
+    for c in coeffs:
+        energia_nivel = np.sum(c**2) / energia_total if energia_total > 0 else 0
+        caracteristicas_wavelet.extend([energia_nivel, np.std(c), np.mean(np.abs(c))])
+
+    envolvente = np.abs(hilbert(senal))
+    features = {
+        'rms': np.sqrt(np.mean(np.square(senal))),
+        'varianza': np.var(senal),
+        'mean_abs': np.mean(np.abs(senal)),
+        'skewness': skewness,
+        'kurtosis': kurtosis,
+        'banda_baja': np.sum(magnitudes[(freqs >= 20) & (freqs <= 80)]),
+        'banda_media': np.sum(magnitudes[(freqs >= 80) & (freqs <= 150)]),
+        'banda_alta': np.sum(magnitudes[(freqs >= 150) & (freqs <= 250)]),
+        'freq_mediana': np.median(freqs[magnitudes > np.max(magnitudes)*0.1]),
+        'rms_envolvente': np.sqrt(np.mean(envolvente**2)),
+        'var_envolvente': np.var(envolvente),
+        'entropia': entropy(np.histogram(senal, bins=50)[0]),
+    }
+    for i, val in enumerate(caracteristicas_wavelet):
+        features[f'wavelet_{i}'] = val
+    return features
+
+
+def _ventanas(longitud=256):
+    rng = np.random.default_rng(3)
+    t = np.arange(longitud) / 500
+    return np.stack([
+        rng.standard_normal(longitud),
+        40 * np.sin(2 * np.pi * 60 * t) + rng.standard_normal(longitud),
+        # Lecturas enteras del ADC: muchos empates y valores justo en los bordes del histograma
+        rng.integers(0, 51, longitud).astype(np.float64),
+        np.sort(np.resize([-1.0, 0.0, 0.0, 3.0], longitud)),  # Escalones con solo tres valores
+    ])
+
+
+def _tamano_en_disco(directorio):
+    return sum(e.stat().st_size for e in os.scandir(directorio) if e.name.endswith(".npy"))
+
+
+# ====================
+# EXTRACCIÓN EN LOTE
+# ====================
+def test_extraccion_en_lote_igual_a_formulas_por_senal():
+    ventanas = _ventanas()
+    columnas = GRAFO.disponibles
+    matriz = extraer_caracteristicas_lote(ventanas, columnas)
+    assert matriz.shape == (len(ventanas), len(columnas))
+    for fila, ventana in zip(matriz, ventanas):
+        referencia = _referencia(ventana)
+        esperado = np.array([referencia[c] for c in columnas])
+        np.testing.assert_allclose(fila, esperado, rtol=1e-9, atol=1e-12)
+
+
+@pytest.mark.parametrize("longitud", [100, 257, 1000])
+def test_histograma_con_empates_igual_a_np_histogram(longitud):
+    ventanas = _ventanas(longitud)
+    conteos = GRAFO._intermedios['histograma'][0](ventanas)
+    for fila, ventana in zip(conteos, ventanas):
+        np.testing.assert_array_equal(fila, np.histogram(ventana, bins=50)[0])
+
+
+# ====================
+# GRAFO DE CARACTERÍSTICAS
+# ====================
+@pytest.mark.parametrize("columnas", [
+    ['kurtosis'],
+    ['wavelet_7', 'skewness', 'wavelet_0'],
+    ['freq_mediana', 'banda_alta', 'entropia'],
+    ['var_envolvente', 'rms', 'kurtosis', 'kurtosis'],
+])
+def test_subconjunto_igual_a_columnas_de_la_extraccion_completa(columnas):
+    ventanas = _ventanas()
+    completa = extraer_caracteristicas_lote(ventanas, GRAFO.disponibles)
+    posiciones = [GRAFO.disponibles.index(c) for c in columnas]
+    np.testing.assert_array_equal(extraer_caracteristicas_lote(ventanas, columnas), completa[:, posiciones])
+
+
+def test_intermedios_compartidos_se_calculan_una_vez(monkeypatch):
+    llamadas = {}
+    for nombre, (funcion, dependencias) in list(GRAFO._intermedios.items()):
+        def contar(*argumentos, _nombre=nombre, _funcion=funcion):
+            llamadas[_nombre] = llamadas.get(_nombre, 0) + 1
+            return _funcion(*argumentos)
+        monkeypatch.setitem(GRAFO._intermedios, nombre, (contar, dependencias))
+
+    ventanas = _ventanas()
+    extraer_caracteristicas_lote(ventanas, GRAFO.disponibles)
+    assert llamadas == {nombre: 1 for nombre in GRAFO._intermedios}
+
+    # Solo se calculan los intermedios de las columnas pedidas
+    llamadas.clear()
+    extraer_caracteristicas_lote(ventanas, ['banda_baja', 'freq_mediana', 'skewness', 'kurtosis'])
+    assert llamadas == {'espectro': 1, 'centrada': 1, 'momentos': 1}
+
+
+def test_columna_no_registrada():
+    with pytest.raises(ValueError):
+        extraer_caracteristicas_lote(_ventanas(), ['rms', 'no_existe'])
+
+
+# ====================
+# CACHÉ DE CARACTERÍSTICAS
+# ====================
+def test_cache_ida_y_vuelta(tmp_path):
+    cache = CacheCaracteristicas(str(tmp_path))
+    senal = np.linspace(0.0, 1.0, 500)
+    configuracion = {'longitud': 100, 'columnas': ['rms', 'entropia']}
+    matriz = np.arange(12, dtype=np.float64).reshape(4, 3)
+    llamadas = []
+
+    def calcular():
+        llamadas.append(1)
+        return matriz
+
+    primera = cache.obtener_o_calcular(senal, configuracion, calcular)
+    segunda = cache.obtener_o_calcular(senal.copy(), configuracion, calcular)
+    np.testing.assert_array_equal(primera, matriz)
+    np.testing.assert_array_equal(segunda, matriz)
+    assert len(llamadas) == 1
+    assert (cache.aciertos, cache.fallos) == (1, 1)
+
+    # Otra señal u otra configuración no reutilizan la entrada
+    clave = cache.clave(senal, configuracion)
+    assert cache.clave(senal + 1e-12, configuracion) != clave
+    assert cache.clave(senal, dict(configuracion, longitud=200)) != clave
+    assert cache.clave(senal.astype(np.float32), configuracion) != clave
+
+
+def test_cache_sobrescribir_no_acumula_tamano(tmp_path):
+    cache = CacheCaracteristicas(str(tmp_path))
+    cache.guardar("a", np.zeros((2, 3)))
+    for filas in (10, 2, 50, 5):
+        cache.guardar("b", np.zeros((filas, 3)))
+        assert cache._tamano == _tamano_en_disco(tmp_path)
+    np.testing.assert_array_equal(cache.obtener("b"), np.zeros((5, 3)))
+
+
+def test_cache_desaloja_las_menos_usadas(tmp_path):
+    matriz = np.zeros((100, 3))
+    cache = CacheCaracteristicas(str(tmp_path))
+    cache.guardar("a", matriz)
+    tamano = _tamano_en_disco(tmp_path)
+    cache.max_bytes = 3 * tamano
+
+    cache.guardar("b", matriz)
+    cache.guardar("c", matriz)
+    # Fechas de uso explícitas: "b" es la más antigua y "a" la más reciente
+    for clave, marca in (("b", 1000), ("c", 2000), ("a", 3000)):
+        os.utime(tmp_path / (clave + ".npy"), (marca, marca))
+
+    cache.guardar("d", matriz)
+    assert sorted(p.stem for p in tmp_path.glob("*.npy")) == ["a", "c", "d"]
+    assert cache._tamano == _tamano_en_disco(tmp_path) <= cache.max_bytes
+    assert cache.obtener("b") is None
@@ -0,0 +1,115 @@
+# ====================
+# BIBLIOTECAS ESTÁNDAR
+# ====================
+import time
+
+import numpy as np
+import pytest
+
+# ====================
+# MODELOS
+# ====================
+from caracteristicas import COLUMNAS_CARACTERISTICAS, vector_caracteristicas
+from modelos import ClasificadorEnVivo, buscar_con_presupuesto, opciones_busqueda
+from procesamiento import PARAMETROS_FILTRO, filtrar_causal
+
+
+class _Identidad:
+    def transform(self, X):
+        return X
+
+
+class _ModeloRegistro:
+    """Modelo de prueba que guarda cada vector recibido y predice su número de orden"""
+
+    def __init__(self):
+        self.vectores = []
+
+    def predict(self, X):
+        self.vectores.append(X[0].copy())
+        return [len(self.vectores)]
+
+
+def _senal(n, semilla=0):
+    rng = np.random.default_rng(semilla)
+    return 512 + 60 * rng.standard_normal(n)
+
+
+# ====================
+# CLASIFICACIÓN EN VIVO
+# ====================
+def test_clasificador_en_vivo_igual_a_ventanas_fuera_de_linea():
+    ventana, salto = 300, 50
+    columnas = COLUMNAS_CARACTERISTICAS[:6]
+    senal = _senal(1200)
+    modelo = _ModeloRegistro()
+    clasificador = ClasificadorEnVivo(modelo, _Identidad(), columnas, ventana=ventana, salto=salto)
+
+    # Bloques de tamaño variable, algunos con varios saltos dentro
+    decisiones = []
+    inicio = 0
+    for n in (120, 7, 180, 50, 33, 260, 1, 99, 300, 150):
+        valores = senal[inicio:inicio + n]
+        tiempos = np.full(len(valores), time.perf_counter_ns(), dtype=np.int64)
+        if clasificador.agregar(valores, tiempos) is not None:
+            decisiones.append(inicio + n - (inicio + n) % salto)
+        inicio += n
+    assert inicio == len(senal)
+    assert clasificador.decisiones == len(decisiones) == len(modelo.vectores)
+
+    # Cada decisión usa la ventana que termina en el último salto completo del bloque
+    filtrada = filtrar_causal(senal, PARAMETROS_FILTRO)
+    for fin, vector in zip(decisiones, modelo.vectores):
+        np.testing.assert_allclose(vector, vector_caracteristicas(filtrada[fin - ventana:fin], columnas),
+                                   rtol=1e-9, atol=1e-9)
+
+
+def test_clasificador_en_vivo_ajusta_la_frecuencia_fuera_de_tolerancia():
+    fs = PARAMETROS_FILTRO['fs']
+    clasificador = ClasificadorEnVivo(_ModeloRegistro(), _Identidad(), COLUMNAS_CARACTERISTICAS[:2],
+                                      ventana=200, salto=50)
+    sos_nominal = clasificador.filtro.sos.copy()
+
+    assert not clasificador.ajustar_frecuencia(fs * 1.03)
+    np.testing.assert_array_equal(clasificador.filtro.sos, sos_nominal)
+
+    clasificador.agregar(_senal(100), np.zeros(100, dtype=np.int64))
+    assert clasificador.ajustar_frecuencia(fs * 1.2)
+    assert clasificador.parametros_filtro['fs'] == round(fs * 1.2)
+    assert not np.allclose(clasificador.filtro.sos, sos_nominal)
+    # El rediseño descarta lo acumulado con el filtro anterior
+    assert len(clasificador._senal) == 0
+    # Los parámetros globales no se modifican
+    assert PARAMETROS_FILTRO['fs'] == fs
+
+
+def test_clasificador_en_vivo_tasa_baja_limita_la_banda():
+    fs = PARAMETROS_FILTRO['fs']
+    clasificador = ClasificadorEnVivo(_ModeloRegistro(), _Identidad(), COLUMNAS_CARACTERISTICAS[:2],
+                                      ventana=200, salto=50)
+    # A 250 Hz el corte de 200 Hz y los notch de 120 y 180 Hz quedan sobre Nyquist
+    assert clasificador.ajustar_frecuencia(fs / 2)
+    assert clasificador.parametros_filtro['high_cutoff'] < fs / 4
+    assert clasificador.agregar(_senal(400), np.zeros(400, dtype=np.int64)) is not None
+
+    # Una tasa en la que la banda no cabe conserva el filtro anterior
+    sos = clasificador.filtro.sos
+    assert not clasificador.ajustar_frecuencia(30.0)
+    assert clasificador.filtro.sos is sos
+
+
+# ====================
+# BÚSQUEDA CON PRESUPUESTO
+# ====================
+@pytest.mark.parametrize("modo", ['halving', 'exhaustiva'])
+def test_limite_de_tiempo_solo_en_modo_aleatorio(modo):
+    from sklearn.tree import DecisionTreeClassifier
+
+    with pytest.raises(ValueError, match="aleatoria"):
+        opciones_busqueda({'modo': modo, 'max_segundos': 5.0})
+    X = np.random.default_rng(0).standard_normal((30, 2))
+    y = np.repeat([0, 1], 15)
+    with pytest.raises(ValueError, match="aleatoria"):
+        buscar_con_presupuesto(DecisionTreeClassifier(), {'max_depth': [1, 2]}, X, y, cv=3, modo=modo,
+                               max_segundos=5.0)
+    assert opciones_busqueda({'modo': 'aleatoria', 'max_segundos': 5.0})['max_segundos'] == 5.0
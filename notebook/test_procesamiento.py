@@ -0,0 +1,144 @@
+# ====================
+# BIBLIOTECAS ESTÁNDAR
+# ====================
+import numpy as np
+import pytest
+from scipy.fft import fft
+from scipy.signal import iirnotch, lfilter, sosfiltfilt
+
+# ====================
+# PROCESAMIENTO
+# ====================
+from procesamiento import (PARAMETROS_FILTRO, _entero_entorno, _grupos_por_longitud, _padlen, disenar_pasabanda,
+                           filtrar_notch_lote, identificar_ruidos_lote, preprocesar_lote, preprocesar_registros,
+                           sosfiltfilt_lote)
+
+
+def _sos():
+    p = PARAMETROS_FILTRO
+    return disenar_pasabanda(p['low_cutoff'], p['high_cutoff'], p['fs'], p['orden'])
+
+
+def _registros(longitudes, semilla=0):
+    rng = np.random.default_rng(semilla)
+    return [512 + 40 * rng.standard_normal(n) for n in longitudes]
+
+
+# ====================
+# FILTRADO EN LOTE
+# ====================
+@pytest.mark.parametrize("razon, max_elementos", [
+    (None, None),  # Valores de LOTE_FILTRADO
+    (1.0, 2 ** 23),  # Un grupo por longitud distinta
+    (100.0, 2 ** 23),  # Todos en un solo grupo con mucho relleno
+    (1.25, 2000),  # Grupos pequeños: registros que superan el límite se filtran solos
+])
+def test_sosfiltfilt_lote_igual_a_sosfiltfilt(razon, max_elementos):
+    sos = _sos()
+    longitudes = [_padlen(sos) + 1, 40, 97, 100, 120, 121, 500, 1000, 1003, 5000]
+    senales = _registros(longitudes)
+    filtradas = sosfiltfilt_lote(sos, senales, razon=razon, max_elementos=max_elementos)
+    assert len(filtradas) == len(senales)
+    for senal, filtrada in zip(senales, filtradas):
+        assert filtrada.shape == senal.shape
+        np.testing.assert_allclose(filtrada, sosfiltfilt(sos, senal), rtol=0, atol=1e-9)
+
+
+def test_sosfiltfilt_lote_vacio_y_registro_corto():
+    sos = _sos()
+    assert sosfiltfilt_lote(sos, []) == []
+    with pytest.raises(ValueError):
+        sosfiltfilt_lote(sos, _registros([100, _padlen(sos)]))
+
+
+def test_grupos_por_longitud_respeta_razon_y_tamano():
+    longitudes = np.array([1000, 50, 60, 1200, 61, 5000, 55])
+    p = 10
+    grupos = _grupos_por_longitud(longitudes, p, razon=1.25, max_elementos=3000)
+    # Cada registro aparece exactamente una vez
+    assert sorted(i for grupo in grupos for i in grupo) == list(range(len(longitudes)))
+    for grupo in grupos:
+        tramo = longitudes[grupo]
+        assert tramo.max() <= 1.25 * tramo.min()
+        assert len(grupo) == 1 or len(grupo) * (tramo.max() + 2 * p) <= 3000
+
+
+# ====================
+# BANCO DE NOTCH
+# ====================
+def _identificar_ruidos_referencia(senal, fs, num_ruidos=4):
+    """identificar_ruidos de la versión inicial: fft completa y argsort"""
+    N = len(senal)
+    yf = fft(senal)
+    xf = np.linspace(0.0, fs / 2, N // 2)
+    magnitudes = 2.0 / N * np.abs(yf[0:N // 2])
+    indices_ruido = np.argsort(magnitudes)[-num_ruidos:]
+    return xf[indices_ruido]
+
+
+def _notch_referencia(senal, fs, Q):
+    """Un iirnotch + lfilter por frecuencia detectada, en el mismo orden"""
+    for f0 in _identificar_ruidos_referencia(senal, fs):
+        b, a = iirnotch(f0, Q, fs)
+        senal = lfilter(b, a, senal)
+    return senal
+
+
+def test_banco_notch_igual_a_notch_secuenciales():
+    fs, Q = PARAMETROS_FILTRO['fs'], PARAMETROS_FILTRO['Q']
+    rng = np.random.default_rng(2)
+    # Longitudes repetidas (una rfft por grupo), pares e impares
+    longitudes = [400, 1000, 400, 777, 1000, 1000, 64, 777]
+    senales = []
+    for n in longitudes:
+        t = np.arange(n) / fs
+        tonos = sum(a * np.sin(2 * np.pi * f * t) for a, f in zip(rng.uniform(5, 20, 3), rng.uniform(30, 220, 3)))
+        senales.append(tonos + rng.standard_normal(n))
+
+    frecuencias = identificar_ruidos_lote(senales, fs, PARAMETROS_FILTRO['num_ruidos'])
+    for senal, f in zip(senales, frecuencias):
+        # Mismas frecuencias y en el mismo orden (ascendente por magnitud) que argsort
+        np.testing.assert_array_equal(f, _identificar_ruidos_referencia(senal, fs))
+
+    for senal, filtrada in zip(senales, filtrar_notch_lote(senales)):
+        np.testing.assert_allclose(filtrada, _notch_referencia(senal, fs, Q), rtol=0, atol=1e-10)
+
+
+# ====================
+# PREPROCESAMIENTO EN PARALELO
+# ====================
+def test_preprocesar_registros_paralelo_igual_a_serial():
+    longitudes = [300, 450, 450, 800, 120, 2000, 600]
+    senales = _registros(longitudes, semilla=1)
+    # Registros contiguos con un hueco sin filtrar entre el tercero y el cuarto
+    valores = np.concatenate(senales[:3] + [np.full(25, 512.0)] + senales[3:])
+    rebanadas = []
+    inicio = 0
+    for i, n in enumerate(longitudes):
+        if i == 3:
+            inicio += 25
+        rebanadas.append(slice(inicio, inicio + n))
+        inicio += n
+
+    serial = preprocesar_registros(valores, rebanadas, procesos=1)
+    paralelo = preprocesar_registros(valores, rebanadas, procesos=2, registros_por_tarea=2)
+    np.testing.assert_array_equal(np.isnan(serial), np.isnan(paralelo))
+    np.testing.assert_allclose(paralelo, serial, rtol=0, atol=1e-9, equal_nan=True)
+    assert np.isnan(serial[sum(longitudes[:3]):sum(longitudes[:3]) + 25]).all()
+
+    # El resultado coincide con el preprocesamiento directo de cada registro
+    for rebanada, esperada in zip(rebanadas, preprocesar_lote(senales)):
+        np.testing.assert_allclose(serial[rebanada], esperada, rtol=0, atol=1e-9)
+
+
+def test_paralelismo_desde_el_entorno(monkeypatch):
+    monkeypatch.delenv('EMG_PROCESOS', raising=False)
+    assert _entero_entorno('EMG_PROCESOS', 1) == 1
+    monkeypatch.setenv('EMG_PROCESOS', '4')
+    assert _entero_entorno('EMG_PROCESOS', 1) == 4
+    monkeypatch.setenv('EMG_PROCESOS', '0')  # Todos los núcleos
+    assert _entero_entorno('EMG_PROCESOS', 1) is None
+    for valor in ('dos', '-1'):
+        monkeypatch.setenv('EMG_PROCESOS', valor)
+        with pytest.raises(ValueError):
+            _entero_entorno('EMG_PROCESOS', 1)